@@ -1,13 +1,25 @@
 # Copyright (c) 2021, Ganga Manoj and contributors
 # For license information, please see license.txt
 
+import json
+
 import frappe
 from frappe import _
 from frappe.utils import cint, get_link_to_form, flt
 
-from assets.asset.doctype.asset_activity.asset_activity import create_asset_activity
+from assets.asset.doctype.asset_activity.asset_activity import queue_asset_activity
+from assets.asset.doctype.asset_position.asset_position import copy_positions
 from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_ import create_depreciation_schedules
-from assets.controllers.base_asset import BaseAsset
+from assets.asset.doctype.location_.location_ import clear_location_rollups
+from assets.controllers.base_asset import BaseAsset, clear_asset_row_cache
+from assets.controllers.bulk_operations import copy_docs_with_children, reserve_names
+from assets.controllers.cached_values import get_cwip_accounting_value
+
+# links to the documents the asset was bought or scrapped with, which the separated assets do not share
+FIELDS_NOT_COPIED_ON_SPLIT = [
+	"image", "journal_entry_for_scrap", "purchase_receipt", "purchase_invoice", "purchase_receipt_amount",
+	"booked_fixed_asset", "amended_from"
+]
 
 
 class Asset_(BaseAsset):
@@ -32,6 +44,21 @@ class Asset_(BaseAsset):
 
 			create_asset_serial_no_docs(self)
 
+	def on_update(self):
+		clear_asset_row_cache(self.name)
+
+	def on_submit(self):
+		clear_asset_row_cache(self.name)
+
+	def on_update_after_submit(self):
+		clear_asset_row_cache(self.name)
+
+	def on_cancel(self):
+		clear_asset_row_cache(self.name)
+
+	def on_trash(self):
+		clear_asset_row_cache(self.name)
+
 	def validate_purchase_document(self):
 		if self.is_existing_asset:
 			if self.purchase_invoice:
@@ -74,131 +101,144 @@ class Asset_(BaseAsset):
 			frappe.throw(_("Gross Purchase Amount is mandatory"), frappe.MandatoryError)
 
 def is_cwip_accounting_enabled(asset_category):
-	return cint(frappe.db.get_value("Asset Category", asset_category, "enable_cwip_accounting"))
+	return get_cwip_accounting_value(asset_category)
 
 @frappe.whitelist()
 def split_asset(asset, num_of_assets_to_be_separated):
-	if isinstance(asset, str):
-		asset = frappe.get_doc("Asset_", asset)
-
 	if isinstance(num_of_assets_to_be_separated, str):
 		num_of_assets_to_be_separated = int(num_of_assets_to_be_separated)
 
-	validate_num_of_assets_to_be_separated(asset, num_of_assets_to_be_separated)
+	return split_asset_into_groups(asset, [num_of_assets_to_be_separated])[0]
 
-	new_asset = create_new_asset(asset, num_of_assets_to_be_separated)
+@frappe.whitelist()
+def split_asset_into_groups(asset, group_sizes):
+	"""
+		Separates a new Asset from `asset` for each number in `group_sizes`, copying the rows of the Asset and
+		of its Depreciation Schedules directly instead of validating and submitting each copy again.
+	"""
+	if isinstance(asset, str):
+		asset = frappe.get_doc("Asset_", asset)
 
-	if new_asset.calculate_depreciation:
-		submit_copies_of_depreciation_schedules(new_asset.name, asset.name)
+	if isinstance(group_sizes, str):
+		group_sizes = json.loads(group_sizes)
 
-	update_existing_asset(asset, num_of_assets_to_be_separated)
+	group_sizes = [cint(size) for size in group_sizes]
 
-	record_asset_split(asset, new_asset, num_of_assets_to_be_separated)
-	display_message_on_successfully_splitting_asset(asset, new_asset)
+	# locks the Asset's row, so that a concurrent split has to wait and then sees the units separated by this one
+	asset.num_of_assets = frappe.db.get_value("Asset_", asset.name, "num_of_assets", for_update=True)
+	validate_asset_split(asset, group_sizes)
 
-def validate_num_of_assets_to_be_separated(asset, num_of_assets_to_be_separated):
-	if num_of_assets_to_be_separated >= asset.num_of_assets:
-		frappe.throw(_("Number of Assets to be Separated should be less than the total Number of Assets, which is {0}.")
-			.format(frappe.bold(asset.num_of_assets)), title=_("Invalid Number"))
+	new_assets = reserve_names(asset.naming_series, len(group_sizes))
+	create_copies_of_asset(asset, new_assets, group_sizes)
 
-def create_new_asset(asset, num_of_assets_to_be_separated):
-	new_asset = frappe.copy_doc(asset)
-	new_asset.num_of_assets = num_of_assets_to_be_separated
-	new_asset.flags.split_asset = True
-	new_asset.submit()
-	new_asset.flags.split_asset = False
+	if asset.calculate_depreciation:
+		create_copies_of_depreciation_schedules(asset.name, new_assets)
 
-	return new_asset
+	update_existing_asset(asset, sum(group_sizes))
 
-def submit_copies_of_depreciation_schedules(new_asset, original_asset):
-	new_schedules = frappe.get_all(
-		"Depreciation Schedule_",
-		filters = {
-			"asset": new_asset
-		},
-		fields = ["name", "finance_book"]
-	)
+	copy_positions(asset.name, new_assets)
+	clear_location_rollups([asset.location])
 
-	map_to_original_schedules = get_map_to_original_schedules(original_asset, new_schedules)
+	for new_asset, num_of_assets_separated in zip(new_assets, group_sizes):
+		record_asset_split(asset, new_asset, num_of_assets_separated)
 
-	for schedule in new_schedules:
-		ds = frappe.get_doc("Depreciation Schedule_", schedule["name"])
+	display_message_on_successfully_splitting_asset(asset, new_assets)
 
-		ds.notes = _("This is a copy of {0} created when Asset {1} was split to form Asset {2}.").format(
-			get_link_to_form("Depreciation Schedule_", map_to_original_schedules[ds.name]),
-			get_link_to_form("Asset_", original_asset),
-			get_link_to_form("Asset_", new_asset)
-		)
-		ds.submit()
+	return new_assets
 
-def get_map_to_original_schedules(original_asset, new_schedules):
-	"""
-		Returns dictionary in the form {new_ds1: original_ds1, new_ds2: original_ds2...}
-	"""
-	original_schedules = frappe.get_all(
-		"Depreciation Schedule_",
-		filters = {
-			"asset": original_asset
-		},
-		fields = ["name", "finance_book"]
-	)
+def validate_asset_split(asset, group_sizes):
+	# the copies are written directly, so the permissions checked on submitting them are checked here
+	asset.check_permission("write")
+	frappe.has_permission("Asset_", "submit", throw=True)
 
-	new_schedules_dict = turn_list_of_dicts_to_dicts(new_schedules)
-	original_schedules_dict = turn_list_of_dicts_to_dicts(original_schedules)
-	map_to_original_schedules = merge_dictionaries(new_schedules_dict, original_schedules_dict, new_schedules)
+	if asset.docstatus != 1:
+		frappe.throw(_("Only submitted Assets can be split."), title=_("Invalid Asset"))
 
-	return map_to_original_schedules
+	if asset.is_serialized_asset:
+		frappe.throw(_("Serialized Assets cannot be split, as each of their Serial Nos is tracked separately."),
+			title=_("Invalid Asset"))
 
-def turn_list_of_dicts_to_dicts(schedules):
-	"""
-		Converts [{"name": name1, "finance_book": fb1}, ...] into {fb1: name1, ...}
-	"""
-	schedules_dict = {}
-	for schedule in schedules:
-		schedules_dict.update({
-			schedule["finance_book"]: schedule["name"]
-		})
+	if not group_sizes or any(size <= 0 for size in group_sizes):
+		frappe.throw(_("Number of Assets to be Separated should be greater than zero."), title=_("Invalid Number"))
 
-	return schedules_dict
+	validate_num_of_assets_to_be_separated(asset, sum(group_sizes))
 
-def merge_dictionaries(new_schedules_dict, original_schedules_dict, new_schedules):
+def validate_num_of_assets_to_be_separated(asset, num_of_assets_to_be_separated):
+	if num_of_assets_to_be_separated >= asset.num_of_assets:
+		frappe.throw(_("Number of Assets to be Separated should be less than the total Number of Assets, which is {0}.")
+			.format(frappe.bold(asset.num_of_assets)), title=_("Invalid Number"))
+
+def create_copies_of_asset(asset, new_assets, group_sizes):
 	"""
-		Converts {fb1: name1, fb2: name2...} and {fb1: name3, fb2: name4...} into {name1: name3, name2: name4...}
+		The copies are identical to the submitted `asset` apart from their number of assets, so
+		the validations and schedule generation that ran when it was submitted are not repeated.
 	"""
-	finance_books = get_finance_books(new_schedules)
-
-	map_to_original_schedules = {}
-	for finance_book in finance_books:
-		map_to_original_schedules.update({
-			new_schedules_dict[finance_book]: original_schedules_dict[finance_book]
-		})
+	copy_docs_with_children(
+		"Asset_",
+		asset.name,
+		[
+			{"name": new_asset, "num_of_assets": size, "status": asset.status}
+			for new_asset, size in zip(new_assets, group_sizes)
+		],
+		reset_fields = FIELDS_NOT_COPIED_ON_SPLIT
+	)
 
-	return map_to_original_schedules
+def create_copies_of_depreciation_schedules(original_asset, new_assets):
+	original_schedules = frappe.get_all(
+		"Depreciation Schedule_",
+		filters = {
+			"asset": original_asset,
+			"docstatus": 1
+		},
+		fields = ["name", "naming_series"]
+	)
 
-def get_finance_books(new_schedules):
-	return [schedule["finance_book"] for schedule in new_schedules]
+	for schedule in original_schedules:
+		new_schedules = reserve_names(schedule.naming_series, len(new_assets))
+
+		copy_docs_with_children(
+			"Depreciation Schedule_",
+			schedule.name,
+			[
+				{
+					"name": new_schedule,
+					"asset": new_asset,
+					"notes": _("This is a copy of {0} created when Asset {1} was split to form Asset {2}.").format(
+						get_link_to_form("Depreciation Schedule_", schedule.name),
+						get_link_to_form("Asset_", original_asset),
+						get_link_to_form("Asset_", new_asset)
+					)
+				}
+				for new_schedule, new_asset in zip(new_schedules, new_assets)
+			],
+			# the entries already posted belong to the original asset
+			reset_fields = ["depreciation_entry"]
+		)
 
-def update_existing_asset(asset, num_of_assets_to_be_separated):
-	asset.flags.ignore_validate_update_after_submit = True
-	asset.num_of_assets -= num_of_assets_to_be_separated
-	asset.save()
+def update_existing_asset(asset, num_of_assets_separated):
+	asset.num_of_assets -= num_of_assets_separated
+	asset.db_set("num_of_assets", asset.num_of_assets)
+	clear_asset_row_cache(asset.name)
 
 def record_asset_split(asset, new_asset, num_of_assets_to_be_separated):
-	split_assets = [asset.name, new_asset.name]
+	split_assets = [asset.name, new_asset]
 	is_plural = "s" if num_of_assets_to_be_separated > 1 else ""
 
 	for split_asset in split_assets:
-		create_asset_activity(
+		queue_asset_activity(
 			asset = split_asset,
 			activity_type = "Split",
 			reference_doctype = asset.doctype,
 			reference_docname = asset.name,
 			notes = _("{0} asset{1} separated from {2} into {3}.")
-				.format(num_of_assets_to_be_separated, is_plural, asset.name, new_asset.name)
+				.format(num_of_assets_to_be_separated, is_plural, asset.name, new_asset)
 		)
 
-def display_message_on_successfully_splitting_asset(asset, new_asset):
-	new_asset_link = frappe.bold(get_link_to_form("Asset_", new_asset.name))
-	message = _("Asset {0} split successfully. New Asset doc: {1}").format(asset.name, new_asset_link)
+def display_message_on_successfully_splitting_asset(asset, new_assets):
+	new_asset_links = ", ".join(frappe.bold(get_link_to_form("Asset_", new_asset)) for new_asset in new_assets)
+	message = _("Asset {0} split successfully. New Asset doc: {1}").format(asset.name, new_asset_links)
+
+	frappe.msgprint(message, title="Sucess", indicator="green")
 
-	frappe.msgprint(message, title="Sucess", indicator="green")
\ No newline at end of file
+def on_doctype_update():
+	frappe.db.add_index("Asset_", ["location"])
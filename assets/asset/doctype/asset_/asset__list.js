@@ -35,20 +35,65 @@ frappe.listview_settings['Asset_'] = {
 
 	onload: function(me) {
 		me.page.add_action_item('Make Asset Movement', function() {
-			const assets = me.get_checked_items();
-			frappe.call({
-				method: "assets.controllers.base_asset.make_asset_movement",
-				freeze: true,
-				args:{
-					"assets": assets
-				},
-				callback: function (r) {
-					if (r.message) {
-						var doc = frappe.model.sync(r.message)[0];
-						frappe.set_route("Form", doc.doctype, doc.name);
-					}
-				}
+			make_asset_movement(me, {
+				"assets": me.get_checked_items(true)
+			});
+		});
+
+		me.page.add_menu_item(__('Make Asset Movement for All Filtered'), function() {
+			make_asset_movement(me, {
+				"filters": me.get_filters_for_args()
 			});
 		});
 	},
-}
\ No newline at end of file
+
+	refresh: function(me) {
+		show_maintenance_stats(me);
+	},
+}
+
+function make_asset_movement(me, args) {
+	frappe.call({
+		method: "assets.controllers.base_asset.make_asset_movement",
+		freeze: true,
+		args: Object.assign({"doctype": me.doctype}, args),
+		callback: function (r) {
+			if (r.message) {
+				var doc = frappe.model.sync(r.message)[0];
+				frappe.set_route("Form", doc.doctype, doc.name);
+			}
+		}
+	});
+}
+
+function show_maintenance_stats(me) {
+	if (!me.data || !me.data.length || !frappe.model.can_read("Asset Maintenance Log_")) {
+		return;
+	}
+
+	frappe.call({
+		method: "assets.asset.doctype.asset_maintenance_.asset_maintenance_.get_maintenance_stats",
+		args: {
+			"assets": me.data.map(doc => doc.name)
+		},
+		callback: function (r) {
+			var stats = r.message || {};
+
+			me.$result.find(".list-row-checkbox[data-name]").each(function() {
+				var $row = $(this).closest(".list-row");
+				var counts = stats[$(this).attr("data-name")] || {};
+
+				$row.find(".maintenance-stats").remove();
+
+				if (counts["Overdue"] || counts["Planned"]) {
+					$row.find(".level-right").prepend(`
+						<span class="maintenance-stats text-muted small" style="margin-right: 10px;">
+							<span class="text-danger">${__("Overdue")}: ${counts["Overdue"] || 0}</span>,
+							<span class="text-warning">${__("Planned")}: ${counts["Planned"] || 0}</span>
+						</span>
+					`);
+				}
+			});
+		}
+	});
+}
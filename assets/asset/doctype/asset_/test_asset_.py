@@ -6,7 +6,11 @@ import unittest
 import frappe
 from frappe.utils import getdate
 
-from assets.asset.doctype.asset_.asset_ import split_asset
+from assets.asset.doctype.asset_.asset_ import split_asset, split_asset_into_groups
+from assets.asset.doctype.asset_activity.asset_activity import flush_asset_activities
+from assets.asset.doctype.asset_position.asset_position import get_position
+from assets.controllers.base_asset import get_asset_row
+from assets.controllers.cached_values import ACCOUNTS_SETTINGS_CACHE_KEY, ASSET_CATEGORY_CWIP_CACHE_KEY
 from erpnext.stock.doctype.purchase_receipt.test_purchase_receipt import make_purchase_receipt
 
 class TestAsset_(unittest.TestCase):
@@ -339,6 +343,55 @@ class TestAsset_(unittest.TestCase):
 		self.assertTrue(schedule_linked_with_new_asset.notes)
 		self.assertNotEqual(schedule_linked_with_orginal_asset.name, schedule_linked_with_new_asset.name)
 
+	def test_asset_split_into_groups(self):
+		asset = create_asset(calculate_depreciation=1, is_serialized_asset=0, num_of_assets=10, submit=1)
+		new_assets = split_asset_into_groups(asset, [2, 3, 4])
+
+		self.assertEqual(asset.num_of_assets, 1)
+		self.assertEqual(frappe.db.get_value("Asset_", asset.name, "num_of_assets"), 1)
+		self.assertEqual(
+			[frappe.db.get_value("Asset_", new_asset, "num_of_assets") for new_asset in new_assets],
+			[2, 3, 4]
+		)
+
+		original_schedule = frappe.get_doc("Depreciation Schedule_", get_linked_depreciation_schedules(asset.name)[0].name)
+		for new_asset in new_assets:
+			new_schedule = frappe.get_doc("Depreciation Schedule_", get_linked_depreciation_schedules(new_asset)[0].name)
+
+			self.assertEqual(new_schedule.docstatus, 1)
+			self.assertEqual(
+				[row.depreciation_amount for row in new_schedule.depreciation_schedule],
+				[row.depreciation_amount for row in original_schedule.depreciation_schedule]
+			)
+			self.assertTrue(get_linked_asset_activity(new_asset, "Split"))
+
+		self.assertRaises(frappe.ValidationError, split_asset_into_groups, asset, [1])
+
+	def test_asset_split_uses_the_saved_num_of_assets(self):
+		asset = create_asset(is_serialized_asset=0, num_of_assets=5, submit=1)
+		split_asset(asset.name, 3)
+
+		# `asset` still says there are 5 assets, but only 2 are left
+		self.assertRaises(frappe.ValidationError, split_asset, asset, 3)
+		self.assertEqual(frappe.db.get_value("Asset_", asset.name, "num_of_assets"), 2)
+
+	def test_split_assets_get_the_position_of_the_original(self):
+		asset = create_asset(is_serialized_asset=0, num_of_assets=5, submit=1)
+		new_asset = split_asset(asset.name, 2)
+
+		position = get_position(new_asset)
+
+		self.assertEqual(position.location, get_position(asset.name).location)
+		self.assertEqual(position.location, asset.location)
+
+	def test_changes_to_asset_row_are_not_cached(self):
+		asset = create_asset(submit=1)
+
+		asset_row = get_asset_row(asset.name)
+		asset_row.asset_category = "_Changed Category"
+
+		self.assertEqual(get_asset_row(asset.name).asset_category, asset.asset_category)
+
 def get_linked_depreciation_schedules(asset_name, fields=["name"]):
 	return frappe.get_all(
 		"Depreciation Schedule_",
@@ -349,6 +402,9 @@ def get_linked_depreciation_schedules(asset_name, fields=["name"]):
 	)
 
 def get_linked_asset_activity(asset_name, activity_type):
+	# activities are written when the transaction commits, which tests never do
+	flush_asset_activities()
+
 	return frappe.get_value(
 		"Asset Activity",
 		filters = {
@@ -463,12 +519,15 @@ def create_depreciation_template(**args):
 
 def enable_cwip_accounting(asset_category, enable=1):
 	frappe.db.set_value("Asset Category_", asset_category, "enable_cwip_accounting", enable)
+	frappe.cache().hdel(ASSET_CATEGORY_CWIP_CACHE_KEY, asset_category)
 
 def enable_book_asset_depreciation_entry_automatically():
 	frappe.db.set_value("Accounts Settings", None, "book_asset_depreciation_entry_automatically", 1)
+	frappe.cache().delete_value(ACCOUNTS_SETTINGS_CACHE_KEY)
 
 def enable_finance_books(enable=1):
 	frappe.db.set_value("Accounts Settings", None, "enable_finance_books", enable)
+	frappe.cache().delete_value(ACCOUNTS_SETTINGS_CACHE_KEY)
 
 def create_asset(**args):
 	args = frappe._dict(args)
@@ -14,23 +14,79 @@ class AssetActivity(Document):
 		validate_serial_no(self)
 
 	def validate_activity_date(self):
-		purchase_date = frappe.db.get_value('Asset_', self.asset, 'purchase_date')
+		from assets.controllers.base_asset import get_asset_row
+
+		purchase_date = get_asset_row(self.asset).purchase_date
 
 		if getdate(self.activity_date) < purchase_date:
 			frappe.throw(_('Asset Activity cannot be performed before {0}').format(purchase_date))
 
-def create_asset_activity(asset, activity_type, reference_doctype, reference_docname, activity_date=None, asset_serial_no=None, notes=None):
-	if not activity_date:
-		activity_date = getdate()
-
-	asset_activity = frappe.get_doc({
-		'doctype': 'Asset Activity',
+def queue_asset_activity(asset, activity_type, reference_doctype, reference_docname, activity_date=None, asset_serial_no=None, notes=None):
+	"""
+		Validates an Asset Activity and buffers it, to be written along with the rest just before the
+		transaction is committed. Discarded if the transaction is rolled back instead.
+	"""
+	activity = frappe._dict({
 		'asset': asset,
 		'serial_no': asset_serial_no,
-		'activity_date': activity_date,
+		'activity_date': getdate(activity_date),
 		'activity_type': activity_type,
 		'reference_doctype': reference_doctype,
 		'reference_docname': reference_docname,
 		'notes': notes
 	})
-	asset_activity.submit()
+	validate_asset_activity(activity)
+
+	if not getattr(frappe.local, "asset_activity_buffer", None):
+		frappe.local.asset_activity_buffer = []
+		frappe.db.before_commit.add(flush_asset_activities)
+		frappe.db.after_rollback.add(clear_asset_activity_buffer)
+
+	frappe.local.asset_activity_buffer.append(activity)
+
+def validate_asset_activity(activity):
+	from assets.controllers.base_asset import get_asset_row
+
+	if not get_asset_row(activity.asset):
+		frappe.throw(_('Asset {0} does not exist').format(frappe.bold(activity.asset)), frappe.LinkValidationError)
+
+	frappe.get_doc(dict(activity, doctype='Asset Activity')).run_method('validate')
+
+def flush_asset_activities():
+	from assets.controllers.bulk_operations import bulk_insert_docs, reserve_series_values
+
+	activities = getattr(frappe.local, "asset_activity_buffer", None)
+	clear_asset_activity_buffer()
+
+	if not activities:
+		return
+
+	# the {###} in the autoname format:{asset}-{###} is drawn from a series with no prefix
+	current = reserve_series_values("", len(activities))
+
+	for i, activity in enumerate(activities, 1):
+		activity.name = "{0}-{1:03d}".format(activity.asset, current + i)
+
+	bulk_insert_docs(
+		"Asset Activity",
+		["asset", "serial_no", "activity_date", "activity_type", "reference_doctype", "reference_docname", "notes"],
+		activities,
+		docstatus = 1
+	)
+
+def get_asset_activity_buffer_length():
+	return len(getattr(frappe.local, "asset_activity_buffer", None) or [])
+
+def truncate_asset_activity_buffer(length):
+	"""
+		Drops the activities queued after the buffer was `length` long, for callers that roll back to a savepoint,
+		which doesn't run the after_rollback callbacks.
+	"""
+	if getattr(frappe.local, "asset_activity_buffer", None):
+		del frappe.local.asset_activity_buffer[length:]
+
+def clear_asset_activity_buffer():
+	frappe.local.asset_activity_buffer = []
+
+def on_doctype_update():
+	frappe.db.add_index("Asset Activity", ["asset", "serial_no", "activity_date"])
@@ -1,8 +1,35 @@
 # Copyright (c) 2021, Ganga Manoj and Contributors
 # See license.txt
 
-# import frappe
 import unittest
 
+import frappe
+
+from assets.asset.doctype.asset_.test_asset_ import create_asset, create_asset_data, create_company
+from assets.asset.doctype.asset_activity.asset_activity import flush_asset_activities, queue_asset_activity
+
 class TestAssetActivity(unittest.TestCase):
-	pass
+	@classmethod
+	def setUpClass(cls):
+		create_company()
+		create_asset_data()
+
+	def test_queued_activities_are_written_on_flush(self):
+		asset = create_asset(item_code="Macbook Pro", submit=1)
+
+		queue_asset_activity(asset.name, "Split", asset.doctype, asset.name, activity_date="2021-01-01", notes="Queued")
+		flush_asset_activities()
+
+		activity_dates = frappe.get_all(
+			"Asset Activity",
+			filters = {"asset": asset.name, "notes": "Queued", "docstatus": 1},
+			pluck = "activity_date"
+		)
+
+		self.assertEqual([str(date) for date in activity_dates], ["2021-01-01"])
+
+	def test_invalid_activities_are_not_queued(self):
+		asset = create_asset(item_code="Macbook Pro", submit=1)
+
+		self.assertRaises(frappe.ValidationError, queue_asset_activity,
+			asset.name, "Split", asset.doctype, asset.name, activity_date="2019-01-01")
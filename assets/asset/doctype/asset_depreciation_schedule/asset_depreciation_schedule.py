@@ -1,8 +1,14 @@
 # Copyright (c) 2021, Ganga Manoj and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 class AssetDepreciationSchedule(Document):
 	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Asset Depreciation Schedule", ["schedule_date", "depreciation_entry", "parent"])
+	# lets get_pages_of_schedules_that_need_posting walk the rows in schedule order and stop once a page is full
+	frappe.db.add_index("Asset Depreciation Schedule", ["parent", "schedule_date", "depreciation_entry"])
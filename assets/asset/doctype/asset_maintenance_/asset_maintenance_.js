@@ -105,7 +105,7 @@ frappe.ui.form.on('Asset Maintenance_', {
 							$(`<div class='row' style='margin-bottom: 10px;'>
 								<div class='col-sm-3 small'>
 									<a onclick="frappe.set_route('List', 'Asset Maintenance Log_',
-										{'asset_name': '${d.asset_name}','maintenance_status': '${d.maintenance_status}' });">
+										{'asset_name': '${frm.doc.asset}','maintenance_status': '${d.maintenance_status}' });">
 										${d.maintenance_status} <span class="badge">${d.count}</span>
 									</a>
 								</div>
@@ -1,14 +1,28 @@
 # Copyright (c) 2021, Ganga Manoj and contributors
 # For license information, please see license.txt
 
+import json
+from collections import Counter
+
 import frappe
 from frappe import _
 from frappe.desk.form import assign_to
 from frappe.model.document import Document
-from frappe.utils import getdate, add_days, add_months, add_years
+from frappe.utils import cint, cstr, getdate, add_days, add_months, add_years
 
 from assets.asset.doctype.asset_.asset_ import split_asset
 from assets.asset.doctype.asset_repair_.asset_repair_ import validate_serial_no, validate_num_of_assets
+from assets.asset.doctype.asset_maintenance_log_count.asset_maintenance_log_count import (
+	get_log_counts,
+	get_status_changes,
+	update_log_counts,
+)
+from assets.controllers.bulk_operations import bulk_insert_docs, reserve_names, update_fields_with_case
+
+# fields of the open Maintenance Logs that are kept in line with their tasks
+SYNCED_LOG_FIELDS = [
+	"assign_to_name", "has_certificate", "description", "periodicity", "maintenance_type", "due_date", "maintenance_status"
+]
 
 class AssetMaintenance_(Document):
 	def validate(self):
@@ -68,104 +82,135 @@ class AssetMaintenance_(Document):
 			task.next_due_date = calculate_next_due_date(task.periodicity, task.start_date)
 
 	def assign_tasks(self):
+		"""
+			Creates a ToDo for every assignee without an open one for this doc, for the first of their tasks.
+			The assignees' emails and their open ToDos are read with one query each.
+		"""
+		first_task_of_assignee = {}
 		for task in self.get("asset_maintenance_tasks"):
-			self.assign_task(task)
-
-	def assign_task(self, task):
-		team_member = frappe.db.get_value("User", task.assign_to, "email")
-
-		args = {
-			"doctype" : "Asset Maintenance_",
-			"assign_to" : [team_member],
-			"name" : self.name,
-			"description" : task.maintenance_task,
-			"date" : task.next_due_date
-		}
-
-		if not self.have_todos_already_been_created(args):
-			assign_to.add(args)
-
-	def have_todos_already_been_created(self, args):
-		todos = frappe.get_all(
+			if task.assign_to:
+				first_task_of_assignee.setdefault(task.assign_to, task)
+
+		if not first_task_of_assignee:
+			return
+
+		emails = dict(frappe.get_all(
+			"User",
+			filters = {"name": ["in", list(first_task_of_assignee)]},
+			fields = ["name", "email"],
+			as_list = 1
+		))
+		assignees_with_todos = set(frappe.get_all(
 			"ToDo",
 			filters = {
-				"reference_type": args["doctype"],
-				"reference_name": args["name"],
+				"reference_type": self.doctype,
+				"reference_name": self.name,
 				"status": "Open",
-				"allocated_to": args["assign_to"][0]
-			}
-		)
-
-		if todos:
-			return True
-		else:
-			return False
+				"allocated_to": ["in", list(emails.values())]
+			},
+			pluck = "allocated_to"
+		))
+
+		for assignee, task in first_task_of_assignee.items():
+			team_member = emails.get(assignee)
+
+			if team_member and team_member not in assignees_with_todos:
+				assign_to.add({
+					"doctype" : self.doctype,
+					"assign_to" : [team_member],
+					"name" : self.name,
+					"description" : task.maintenance_task,
+					"date" : task.next_due_date
+				})
 
 	def sync_maintenance_tasks(self):
-		tasks_names = []
+		"""
+			Brings the open Maintenance Logs of this doc in line with its tasks. The logs are read with one
+			query, and the new, changed and removed ones are written in bulk.
+		"""
+		open_logs = self.get_open_maintenance_logs()
+		new_logs, changed_logs, log_count_changes = [], {}, Counter()
+
 		for task in self.get("asset_maintenance_tasks"):
-			tasks_names.append(task.name)
-			self.update_maintenance_log(task)
+			values = get_maintenance_log_values(task)
+			log = open_logs.pop(task.name, None)
 
-		self.cancel_maintenance_logs_for_removed_tasks(tasks_names)
+			if not log:
+				new_logs.append(values)
+			elif any(cstr(log.get(fieldname)) != cstr(values[fieldname]) for fieldname in SYNCED_LOG_FIELDS):
+				changed_logs[log.name] = values
+				log_count_changes.update(get_status_changes([log], values.maintenance_status))
 
-	def update_maintenance_log(self, task):
-		asset_maintenance_log = self.get_maintenance_log(task)
+		self.insert_maintenance_logs(new_logs)
+		update_fields_with_case("Asset Maintenance Log_", SYNCED_LOG_FIELDS, changed_logs)
 
-		if not asset_maintenance_log:
-			self.create_new_maintenance_log(task)
-		else:
-			maintenance_log = frappe.get_doc("Asset Maintenance Log_", asset_maintenance_log)
-			maintenance_log.assign_to_name = task.assign_to_name
-			maintenance_log.has_certificate = task.certificate_required
-			maintenance_log.description = task.description
-			maintenance_log.periodicity = str(task.periodicity)
-			maintenance_log.maintenance_type = task.maintenance_type
-			maintenance_log.due_date = task.next_due_date
-			maintenance_log.save()
-
-	def get_maintenance_log(self, task):
-		return frappe.get_value(
+		# the logs left over belong to tasks that have been removed
+		self.cancel_maintenance_logs([log.name for log in open_logs.values()])
+		log_count_changes.update(get_status_changes(open_logs.values(), "Cancelled"))
+
+		for log in new_logs:
+			log_count_changes[(self.asset, log.maintenance_status)] += 1
+
+		update_log_counts(log_count_changes)
+
+	def get_open_maintenance_logs(self):
+		"""
+			Returns the Planned and Overdue logs of this doc, keyed by task.
+		"""
+		logs = frappe.get_all(
 			"Asset Maintenance Log_",
-			{
+			filters = {
 				"asset_maintenance": self.name,
-				"task": task.name,
-				"maintenance_status": ("in",["Planned","Overdue"])
-			}
+				"maintenance_status": ("in", ["Planned", "Overdue"]),
+				"docstatus": 0
+			},
+			fields = ["name", "task", "asset_name"] + SYNCED_LOG_FIELDS
 		)
 
-	def create_new_maintenance_log(self, task):
-		asset_maintenance_log = frappe.get_doc({
-			"doctype": "Asset Maintenance Log_",
-			"asset_maintenance": self.name,
-			"asset_name": self.asset,
-			"task": task.name,
-			"has_certificate": task.certificate_required,
-			"description": task.description,
-			"assign_to_name": task.assign_to_name,
-			"periodicity": str(task.periodicity),
-			"maintenance_type": task.maintenance_type,
-			"due_date": task.next_due_date
-		})
-		asset_maintenance_log.insert()
-
-	def cancel_maintenance_logs_for_removed_tasks(self, tasks_names):
-		asset_maintenance_logs = self.get_maintenance_logs_for_removed_tasks(tasks_names)
-
-		if asset_maintenance_logs:
-			for asset_maintenance_log in asset_maintenance_logs:
-				frappe.db.set_value("Asset Maintenance Log_", asset_maintenance_log.name, "maintenance_status", "Cancelled")
-
-	def get_maintenance_logs_for_removed_tasks(self, tasks_names):
-		return frappe.get_all(
-			"Asset Maintenance Log_",
-			fields = ["name"],
-			filters = {
+		return {log.task: log for log in logs}
+
+	def insert_maintenance_logs(self, logs):
+		if not logs:
+			return
+
+		naming_series = frappe.get_meta("Asset Maintenance Log_").get_field("naming_series").options.split("\n")[0]
+
+		for log, name in zip(logs, reserve_names(naming_series, len(logs))):
+			log.update({
+				"name": name,
+				"naming_series": naming_series,
 				"asset_maintenance": self.name,
-				"task": ("not in", tasks_names)
-			}
+				"asset_name": self.asset
+			})
+
+		bulk_insert_docs(
+			"Asset Maintenance Log_",
+			["naming_series", "asset_maintenance", "asset_name", "task", "task_name"] + SYNCED_LOG_FIELDS,
+			logs
 		)
 
+	def cancel_maintenance_logs(self, logs):
+		if logs:
+			frappe.db.set_value("Asset Maintenance Log_", {"name": ("in", logs)}, "maintenance_status", "Cancelled")
+
+def get_maintenance_log_values(task):
+	"""
+		Returns the values a Maintenance Log takes from `task`, including the status AssetMaintenanceLog_.validate would set.
+	"""
+	due_date = getdate(task.next_due_date) if task.next_due_date else None
+
+	return frappe._dict({
+		"task": task.name,
+		"task_name": task.maintenance_task,
+		"assign_to_name": task.assign_to_name,
+		"has_certificate": cint(task.certificate_required),
+		"description": task.description,
+		"periodicity": str(task.periodicity),
+		"maintenance_type": task.maintenance_type,
+		"due_date": due_date,
+		"maintenance_status": "Overdue" if due_date and due_date < getdate() else "Planned"
+	})
+
 @frappe.whitelist()
 def calculate_next_due_date(periodicity, start_date = None, end_date = None, last_completion_date = None, next_due_date = None):
 	start_date = get_start_date(start_date, last_completion_date)
@@ -208,12 +253,19 @@ def get_team_members(doctype, txt, searchfield, start, page_len, filters):
 
 @frappe.whitelist()
 def get_maintenance_log(asset_name):
-	return frappe.db.sql(
-		"""
-			select maintenance_status, count(asset_name) as count, asset_name
-			from `tabAsset Maintenance Log_`
-			where asset_name=%s group by maintenance_status
-		""",
-		(asset_name),
-		as_dict = 1
-	)
+	return [
+		{"maintenance_status": maintenance_status, "count": count}
+		for maintenance_status, count in get_log_counts([asset_name])[asset_name].items()
+	]
+
+@frappe.whitelist()
+def get_maintenance_stats(assets):
+	"""
+		Returns {asset: {maintenance_status: count}} for all of `assets` with one query.
+	"""
+	frappe.has_permission("Asset Maintenance Log_", throw=True)
+
+	if isinstance(assets, str):
+		assets = json.loads(assets)
+
+	return get_log_counts(assets)
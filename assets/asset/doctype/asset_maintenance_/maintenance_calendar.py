@@ -0,0 +1,160 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+"""
+	Expands the recurrences of many Asset Maintenance Tasks into their due dates at once.
+
+	A task is first due one period after its start date, or after its last completion date if that is later,
+	just as calculate_next_due_date returns, and every period after that until its end date.
+"""
+
+import json
+
+import numpy as np
+import frappe
+from frappe import _
+from frappe.utils import add_months, getdate
+
+from assets.asset.doctype.asset_maintenance_.asset_maintenance_ import get_start_date
+from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_engine import to_datetime64
+
+PERIODICITY_IN_DAYS = {"Daily": 1, "Weekly": 7}
+PERIODICITY_IN_MONTHS = {"Monthly": 1, "Quarterly": 3, "Yearly": 12, "2 Yearly": 24}
+
+# longest range the calendar can be fetched for in one request
+MAX_CALENDAR_MONTHS = 24
+
+# filters the calendar accepts, along with the table each one applies to
+CALENDAR_FILTERS = {"asset": "am", "company": "am", "maintenance_team": "am", "assign_to": "task"}
+
+
+@frappe.whitelist()
+def get_maintenance_calendar(start, end, filters=None):
+	"""
+		Returns every due date between `start` and `end` of the Asset Maintenance Tasks matching `filters`.
+	"""
+	frappe.has_permission("Asset Maintenance_", throw=True)
+
+	start, end = getdate(start), getdate(end)
+	validate_calendar_range(start, end)
+
+	if isinstance(filters, str):
+		filters = json.loads(filters)
+
+	tasks = get_tasks_due_between(start, end, filters or {})
+	task_indexes, due_dates = expand_recurrences(tasks, start, end)
+
+	return [
+		{
+			"task": tasks[i].name,
+			"maintenance_task": tasks[i].maintenance_task,
+			"asset_maintenance": tasks[i].asset_maintenance,
+			"asset": tasks[i].asset,
+			"assign_to": tasks[i].assign_to,
+			"due_date": str(due_date)
+		}
+		for i, due_date in zip(task_indexes.tolist(), due_dates.tolist())
+	]
+
+def validate_calendar_range(start, end):
+	if end < start:
+		frappe.throw(_("End Date should be on or after Start Date."), title=_("Invalid Range"))
+
+	if end > getdate(add_months(start, MAX_CALENDAR_MONTHS)):
+		frappe.throw(_("The maintenance calendar can be fetched for at most {0} months at a time.")
+			.format(MAX_CALENDAR_MONTHS), title=_("Invalid Range"))
+
+def get_tasks_due_between(start, end, filters):
+	conditions, values = [], {"start": start, "end": end}
+
+	for fieldname, table in CALENDAR_FILTERS.items():
+		if filters.get(fieldname):
+			conditions.append("{0}.{1} = %({1})s".format(table, fieldname))
+			values[fieldname] = filters[fieldname]
+
+	return frappe.db.sql(
+		"""
+			SELECT
+				task.name, task.maintenance_task, task.periodicity, task.start_date, task.end_date,
+				task.last_completion_date, task.assign_to, am.name as asset_maintenance, am.asset
+			FROM `tabAsset Maintenance Task_` task
+			INNER JOIN `tabAsset Maintenance_` am
+				ON am.name = task.parent and task.parenttype = 'Asset Maintenance_'
+			WHERE
+				task.maintenance_status != 'Cancelled'
+				and task.start_date <= %(end)s
+				and (task.end_date is null or task.end_date >= %(start)s)
+				{0}
+		""".format("".join(" and " + condition for condition in conditions)),
+		values,
+		as_dict = 1
+	)
+
+def expand_recurrences(tasks, from_date, to_date):
+	"""
+		Returns (task_indexes, due_dates), NumPy arrays with every due date of `tasks` between `from_date`
+		and `to_date` (both inclusive) and the index of the task it belongs to, ordered by date.
+	"""
+	from_date, to_date = to_datetime64(from_date), to_datetime64(to_date)
+	task_indexes, due_dates = [np.array([], dtype=int)], [np.array([], dtype="datetime64[D]")]
+
+	for periodicity in {task.periodicity for task in tasks}:
+		indexes = np.array([i for i, task in enumerate(tasks) if task.periodicity == periodicity])
+		group = [tasks[i] for i in indexes]
+
+		base_dates = np.array(
+			[to_datetime64(get_start_date(task.start_date, task.last_completion_date)) for task in group],
+			dtype = "datetime64[D]"
+		)
+		# the last date each task can be due on within the range
+		last_dates = np.array(
+			[min(to_datetime64(task.end_date), to_date) if task.end_date else to_date for task in group],
+			dtype = "datetime64[D]"
+		)
+
+		if periodicity in PERIODICITY_IN_DAYS:
+			dates = get_dates_every_n_days(base_dates, from_date, last_dates, PERIODICITY_IN_DAYS[periodicity])
+		elif periodicity in PERIODICITY_IN_MONTHS:
+			dates = get_dates_every_n_months(base_dates, last_dates, PERIODICITY_IN_MONTHS[periodicity])
+		else:
+			continue
+
+		is_in_range = (dates >= from_date) & (dates <= last_dates[:, None])
+		task_indexes.append(np.broadcast_to(indexes[:, None], dates.shape)[is_in_range])
+		due_dates.append(dates[is_in_range])
+
+	task_indexes, due_dates = np.concatenate(task_indexes), np.concatenate(due_dates)
+	order = np.lexsort((task_indexes, due_dates))
+
+	return task_indexes[order], due_dates[order]
+
+def get_dates_every_n_days(base_dates, from_date, last_dates, num_of_days):
+	"""
+		Returns a row of dates for each base date, starting from the first one on or after `from_date`.
+		Rows are padded with dates past their last date, which the caller leaves out.
+	"""
+	# the number of periods between each base date and the first date in the range, which is at least one
+	periods_to_skip = np.maximum(-((base_dates - from_date).astype(int) // num_of_days), 0)
+	first_dates = base_dates + (np.maximum(periods_to_skip, 1) * num_of_days).astype("timedelta64[D]")
+
+	num_of_dates = max(int(((last_dates - first_dates).astype(int) // num_of_days).max(initial=-1)) + 1, 0)
+	offsets = (np.arange(num_of_dates) * num_of_days).astype("timedelta64[D]")
+
+	return first_dates[:, None] + offsets
+
+def get_dates_every_n_months(base_dates, last_dates, num_of_months):
+	"""
+		Returns a row of dates for each base date, one period apart. Like get_schedule_dates, a day clamped
+		to a short month stays clamped (Jan 31 -> Feb 28 -> Mar 28), as repeatedly calling add_months does.
+	"""
+	base_months = base_dates.astype("datetime64[M]")
+	months_to_last_date = (last_dates.astype("datetime64[M]") - base_months).astype(int)
+	num_of_dates = max(int(months_to_last_date.max(initial=0)) // num_of_months, 0)
+
+	months = base_months[:, None] + np.arange(1, num_of_dates + 1) * num_of_months
+	days_in_month = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(int)
+
+	day_of_month = (base_dates - base_months.astype("datetime64[D]")).astype(int)
+	day_of_month = np.minimum(day_of_month[:, None], np.minimum.accumulate(days_in_month, axis=1) - 1)
+
+	return months.astype("datetime64[D]") + day_of_month
@@ -4,7 +4,7 @@
 import unittest
 
 import frappe
-from frappe.utils import nowdate, add_days
+from frappe.utils import add_days, getdate, nowdate
 
 from assets.asset.doctype.asset_.test_asset_ import (
 	create_asset,
@@ -12,6 +12,7 @@ from assets.asset.doctype.asset_.test_asset_ import (
 	create_asset_data,
 )
 from assets.asset.doctype.asset_maintenance_.asset_maintenance_ import calculate_next_due_date
+from assets.asset.doctype.asset_maintenance_.maintenance_calendar import expand_recurrences
 
 class TestAssetMaintenance_(unittest.TestCase):
 	@classmethod
@@ -142,9 +143,43 @@ class TestAssetMaintenance_(unittest.TestCase):
 		asset_maintenance = create_asset_maintenance(asset.name)
 
 		for task in asset_maintenance.asset_maintenance_tasks:
-			maintenance_log = asset_maintenance.get_maintenance_log(task)
+			maintenance_log = get_open_maintenance_log(asset_maintenance, task)
 			self.assertTrue(maintenance_log)
 
+	def test_maintenance_logs_are_synced_with_tasks(self):
+		asset = create_asset(maintenance_required = 1, submit = 1)
+		asset_maintenance = create_asset_maintenance(asset.name)
+
+		removed_task = asset_maintenance.asset_maintenance_tasks[1]
+		log_of_removed_task = get_open_maintenance_log(asset_maintenance, removed_task)
+
+		asset_maintenance.asset_maintenance_tasks[0].periodicity = "Weekly"
+		asset_maintenance.remove(removed_task)
+		asset_maintenance.save()
+
+		log = frappe.get_doc("Asset Maintenance Log_", get_open_maintenance_log(asset_maintenance, asset_maintenance.asset_maintenance_tasks[0]))
+		self.assertEqual(log.periodicity, "Weekly")
+		self.assertEqual(log.due_date, getdate(add_days(nowdate(), 7)))
+		self.assertEqual(
+			frappe.db.get_value("Asset Maintenance Log_", log_of_removed_task, "maintenance_status"),
+			"Cancelled"
+		)
+
+class TestMaintenanceCalendar(unittest.TestCase):
+	def test_recurrences_are_expanded_within_range(self):
+		tasks = [
+			frappe._dict(periodicity="Monthly", start_date=getdate("2022-01-31"), end_date=None, last_completion_date=None),
+			frappe._dict(periodicity="Weekly", start_date=getdate("2022-01-01"), end_date=getdate("2022-02-20"),
+				last_completion_date=getdate("2022-01-10")),
+		]
+
+		task_indexes, due_dates = expand_recurrences(tasks, "2022-02-01", "2022-04-30")
+
+		self.assertEqual(
+			list(zip(task_indexes.tolist(), [str(date) for date in due_dates.tolist()])),
+			[(1, "2022-02-07"), (1, "2022-02-14"), (0, "2022-02-28"), (0, "2022-03-28"), (0, "2022-04-28")]
+		)
+
 def create_maintenance_personnel():
 	user_list = ["dwight@dm.com", "jim@dm.com", "pam@dm.com"]
 
@@ -213,6 +248,11 @@ def create_asset_maintenance(asset_name, num_of_assets=0, serial_no=None, do_not
 
 	return asset_maintenance
 
+def get_open_maintenance_log(asset_maintenance, task):
+	log = asset_maintenance.get_open_maintenance_logs().get(task.name)
+
+	return log.name if log else None
+
 def get_maintenance_tasks():
 	return [
 		{
@@ -4,19 +4,44 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import getdate
+from frappe.utils import formatdate, get_link_to_form, getdate, now
 
 from assets.asset.doctype.asset_maintenance_.asset_maintenance_ import calculate_next_due_date
+from assets.asset.doctype.asset_maintenance_log_count.asset_maintenance_log_count import (
+	get_status_changes,
+	update_log_counts,
+)
 
 class AssetMaintenanceLog_(Document):
 	def validate(self):
 		self.check_if_maintenance_is_overdue()
 		self.validate_completion_date()
 
+	def on_update(self):
+		self.update_log_counts()
+
 	def on_submit(self):
 		self.validate_maintenance_status()
 		self.update_maintenance_task()
 
+	def on_cancel(self):
+		update_log_counts({(self.asset_name, self.maintenance_status): -1})
+
+	def on_trash(self):
+		if self.docstatus != 2:
+			update_log_counts({(self.asset_name, self.maintenance_status): -1})
+
+	def update_log_counts(self):
+		"""
+			Runs on insert, save and submit, moving this log from the status it was saved with before (if any).
+		"""
+		doc_before_save = self.get_doc_before_save()
+
+		if doc_before_save:
+			update_log_counts(get_status_changes([doc_before_save], self.maintenance_status))
+		else:
+			update_log_counts({(self.asset_name, self.maintenance_status): 1})
+
 	def check_if_maintenance_is_overdue(self):
 		if getdate(self.due_date) < getdate() and self.maintenance_status not in ["Completed", "Cancelled"]:
 			self.maintenance_status = "Overdue"
@@ -53,3 +78,81 @@ class AssetMaintenanceLog_(Document):
 		maintenance_task.next_due_date = next_due_date
 		maintenance_task.maintenance_status = "Planned"
 		maintenance_task.save()
+
+def mark_overdue_maintenance():
+	"""
+		Daily job that sets the Planned Maintenance Logs and Tasks whose due dates have passed to Overdue, with
+		one update each, and sends every assignee a single notification listing their newly overdue logs.
+	"""
+	today = getdate()
+	overdue_logs = get_logs_becoming_overdue(today)
+
+	# only the logs that were read (and locked) are updated, so the counts move by exactly what is updated
+	if overdue_logs:
+		frappe.db.sql(
+			"""
+				UPDATE `tabAsset Maintenance Log_`
+				SET maintenance_status = 'Overdue', modified = %(now)s
+				WHERE name in %(logs)s
+			""",
+			{"logs": [log.name for log in overdue_logs], "now": now()}
+		)
+
+	frappe.db.sql(
+		"""
+			UPDATE `tabAsset Maintenance Task_`
+			SET maintenance_status = 'Overdue', modified = %(now)s
+			WHERE maintenance_status = 'Planned' and next_due_date < %(today)s
+		""",
+		{"today": today, "now": now()}
+	)
+
+	update_log_counts(get_status_changes(overdue_logs, "Overdue"))
+	notify_assignees_of_overdue_logs(overdue_logs)
+
+def get_logs_becoming_overdue(today):
+	return frappe.db.sql(
+		"""
+			SELECT log.name, log.asset_name, log.maintenance_status, log.task_name, log.due_date, task.assign_to
+			FROM `tabAsset Maintenance Log_` log
+			LEFT JOIN `tabAsset Maintenance Task_` task ON task.name = log.task
+			WHERE log.maintenance_status = 'Planned' and log.due_date < %s and log.docstatus = 0
+			FOR UPDATE
+		""",
+		today,
+		as_dict = 1
+	)
+
+def notify_assignees_of_overdue_logs(overdue_logs):
+	from frappe.desk.doctype.notification_log.notification_log import enqueue_create_notification
+
+	logs_by_assignee = {}
+	for log in overdue_logs:
+		if log.assign_to:
+			logs_by_assignee.setdefault(log.assign_to, []).append(log)
+
+	for assignee, logs in logs_by_assignee.items():
+		enqueue_create_notification(assignee, {
+			"type": "Alert",
+			"document_type": "Asset Maintenance Log_",
+			"document_name": logs[0].name,
+			"subject": _("{0} Asset Maintenance Logs assigned to you are overdue").format(len(logs)),
+			"email_content": get_overdue_logs_digest(logs),
+			"from_user": "Administrator"
+		})
+
+def get_overdue_logs_digest(logs):
+	rows = [
+		"<li>{0}: {1} ({2}), {3}</li>".format(
+			get_link_to_form("Asset Maintenance Log_", log.name),
+			frappe.bold(log.task_name or ""),
+			log.asset_name,
+			_("due on {0}").format(formatdate(log.due_date))
+		)
+		for log in logs
+	]
+
+	return "<ul>{0}</ul>".format("".join(rows))
+
+def on_doctype_update():
+	frappe.db.add_index("Asset Maintenance Log_", ["maintenance_status", "due_date"])
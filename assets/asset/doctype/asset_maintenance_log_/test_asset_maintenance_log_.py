@@ -1,8 +1,49 @@
 # Copyright (c) 2021, Ganga Manoj and Contributors
 # See license.txt
 
-# import frappe
 import unittest
 
+import frappe
+from frappe.utils import add_days, nowdate
+
+from assets.asset.doctype.asset_.test_asset_ import create_asset, create_asset_data, create_company
+from assets.asset.doctype.asset_maintenance_.test_asset_maintenance_ import (
+	create_asset_maintenance,
+	create_maintenance_personnel,
+	get_open_maintenance_log,
+)
+from assets.asset.doctype.asset_maintenance_log_.asset_maintenance_log_ import mark_overdue_maintenance
+
 class TestAssetMaintenanceLog_(unittest.TestCase):
-	pass
+	@classmethod
+	def setUpClass(cls):
+		create_company()
+		create_asset_data()
+		create_maintenance_personnel()
+
+	@classmethod
+	def tearDownClass(cls):
+		frappe.db.rollback()
+
+	def test_overdue_maintenance_is_marked(self):
+		asset = create_asset(maintenance_required = 1, submit = 1)
+		asset_maintenance = create_asset_maintenance(asset.name)
+
+		task = asset_maintenance.asset_maintenance_tasks[0]
+		log = get_open_maintenance_log(asset_maintenance, task)
+
+		frappe.db.set_value("Asset Maintenance Task_", task.name, "next_due_date", add_days(nowdate(), -1))
+		frappe.db.set_value("Asset Maintenance Log_", log, "due_date", add_days(nowdate(), -1))
+
+		mark_overdue_maintenance()
+
+		self.assertEqual(frappe.db.get_value("Asset Maintenance Log_", log, "maintenance_status"), "Overdue")
+		self.assertEqual(frappe.db.get_value("Asset Maintenance Task_", task.name, "maintenance_status"), "Overdue")
+		self.assertEqual(
+			frappe.db.get_value(
+				"Asset Maintenance Log_",
+				get_open_maintenance_log(asset_maintenance, asset_maintenance.asset_maintenance_tasks[1]),
+				"maintenance_status"
+			),
+			"Planned"
+		)
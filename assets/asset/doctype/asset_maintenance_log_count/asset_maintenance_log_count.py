@@ -0,0 +1,95 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+"""
+	Asset Maintenance Log Count holds the number of Maintenance Logs of every asset in each status, so that
+	they can be shown without grouping the logs. Cancelled log documents are not counted.
+"""
+
+from collections import Counter
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import now
+
+class AssetMaintenanceLogCount(Document):
+	pass
+
+def update_log_counts(changes):
+	"""
+		Adds the amounts in `changes`, a dict keyed by (asset, maintenance_status), to the counts with one statement.
+	"""
+	changes = {key: change for key, change in changes.items() if change and key[0] and key[1]}
+	if not changes:
+		return
+
+	timestamp, user = now(), frappe.session.user
+	values = []
+
+	for (asset, maintenance_status), change in changes.items():
+		values += [get_log_count_name(asset, maintenance_status), asset, maintenance_status, change,
+			timestamp, timestamp, user, user]
+
+	frappe.db.sql(
+		"""
+			INSERT INTO `tabAsset Maintenance Log Count`
+				(name, asset, maintenance_status, count, creation, modified, owner, modified_by, docstatus)
+			VALUES {0}
+			ON DUPLICATE KEY UPDATE count = count + VALUES(count), modified = VALUES(modified)
+		""".format(", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, 0)"] * len(changes))),
+		values
+	)
+
+def get_status_changes(logs, new_status):
+	"""
+		Returns the changes to the counts when each of `logs`, dicts with an `asset_name` and a
+		`maintenance_status`, is moved to `new_status`.
+	"""
+	changes = Counter()
+
+	for log in logs:
+		if log.maintenance_status != new_status:
+			changes[(log.asset_name, log.maintenance_status)] -= 1
+			changes[(log.asset_name, new_status)] += 1
+
+	return changes
+
+def get_log_count_name(asset, maintenance_status):
+	return "{0}-{1}".format(asset, maintenance_status)
+
+def get_log_counts(assets):
+	"""
+		Returns {asset: {maintenance_status: count}} for every one of `assets`.
+	"""
+	log_counts = {asset: {} for asset in assets}
+
+	if assets:
+		for row in frappe.get_all(
+			"Asset Maintenance Log Count",
+			filters = {"asset": ["in", list(assets)], "count": [">", 0]},
+			fields = ["asset", "maintenance_status", "count"]
+		):
+			log_counts[row.asset][row.maintenance_status] = row.count
+
+	return log_counts
+
+def rebuild_log_counts():
+	frappe.db.delete("Asset Maintenance Log Count")
+
+	changes = {
+		(row.asset_name, row.maintenance_status): row.count
+		for row in frappe.db.sql(
+			"""
+				SELECT asset_name, maintenance_status, count(*) as count
+				FROM `tabAsset Maintenance Log_`
+				WHERE docstatus < 2
+				GROUP BY asset_name, maintenance_status
+			""",
+			as_dict = 1
+		)
+	}
+
+	update_log_counts(changes)
+
+def on_doctype_update():
+	frappe.db.add_index("Asset Maintenance Log Count", ["asset", "maintenance_status"])
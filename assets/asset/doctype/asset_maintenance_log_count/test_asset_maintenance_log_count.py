@@ -0,0 +1,46 @@
+# Copyright (c) 2022, Ganga Manoj and Contributors
+# See license.txt
+
+import unittest
+
+import frappe
+from frappe.utils import add_days, nowdate
+
+from assets.asset.doctype.asset_.test_asset_ import create_asset, create_asset_data, create_company
+from assets.asset.doctype.asset_maintenance_.test_asset_maintenance_ import (
+	create_asset_maintenance,
+	create_maintenance_personnel,
+	get_open_maintenance_log,
+)
+from assets.asset.doctype.asset_maintenance_log_.asset_maintenance_log_ import mark_overdue_maintenance
+from assets.asset.doctype.asset_maintenance_log_count.asset_maintenance_log_count import get_log_counts
+
+class TestAssetMaintenanceLogCount(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		create_company()
+		create_asset_data()
+		create_maintenance_personnel()
+
+	@classmethod
+	def tearDownClass(cls):
+		frappe.db.rollback()
+
+	def test_counts_follow_status_changes(self):
+		asset = create_asset(maintenance_required = 1, submit = 1)
+		asset_maintenance = create_asset_maintenance(asset.name)
+		self.assertEqual(get_log_counts([asset.name])[asset.name], {"Planned": 2})
+
+		log = get_open_maintenance_log(asset_maintenance, asset_maintenance.asset_maintenance_tasks[0])
+		frappe.db.set_value("Asset Maintenance Log_", log, "due_date", add_days(nowdate(), -1))
+		mark_overdue_maintenance()
+		self.assertEqual(get_log_counts([asset.name])[asset.name], {"Planned": 1, "Overdue": 1})
+
+		log = frappe.get_doc("Asset Maintenance Log_", log)
+		log.maintenance_status = "Completed"
+		log.completion_date = nowdate()
+		log.submit()
+		self.assertEqual(get_log_counts([asset.name])[asset.name], {"Planned": 1, "Completed": 1})
+
+		log.cancel()
+		self.assertEqual(get_log_counts([asset.name])[asset.name], {"Planned": 1})
@@ -1,8 +1,11 @@
 # Copyright (c) 2021, Ganga Manoj and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 class AssetMaintenanceTask_(Document):
 	pass
+
+def on_doctype_update():
+	frappe.db.add_index("Asset Maintenance Task_", ["maintenance_status", "next_due_date"])
@@ -4,24 +4,58 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from assets.asset.doctype.asset_activity.asset_activity import create_asset_activity
+from assets.asset.doctype.asset_activity.asset_activity import queue_asset_activity
+from assets.asset.doctype.asset_position.asset_position import (
+	get_current_positions,
+	record_positions,
+	remove_positions,
+)
+from assets.asset.doctype.location_.location_ import clear_location_rollups
+from assets.controllers.bulk_operations import update_fields_with_case
 
 class AssetMovement_(Document):
 	def validate(self):
+		self.prefetch_details()
 		self.validate_asset()
 		self.validate_movement()
 		self.validate_employee()
 
 	def on_submit(self):
+		record_positions(self)
 		self.update_asset_location_and_custodian()
+		self.clear_location_rollups()
 		self.record_asset_movements()
 
 	def on_cancel(self):
+		remove_positions(self)
 		self.update_asset_location_and_custodian()
+		self.clear_location_rollups()
+
+	def prefetch_details(self):
+		"""
+			Fetches the Assets, Asset Serial Nos and Employees in the movement with one query per doctype,
+			so that validating the rows does not need any more.
+		"""
+		self.asset_details = get_details_by_name(
+			"Asset_",
+			[d.asset for d in self.assets],
+			["status", "company", "is_serialized_asset", "location", "custodian"]
+		)
+		self.serial_no_details = get_details_by_name(
+			"Asset Serial No",
+			[d.serial_no for d in self.assets if d.serial_no],
+			["location", "custodian"]
+		)
+		self.employee_details = get_details_by_name(
+			"Employee",
+			[d.to_employee for d in self.assets if d.to_employee],
+			["company"]
+		)
 
 	def validate_asset(self):
 		for asset in self.assets:
-			status, company, is_serialized_asset = frappe.db.get_value("Asset_", asset.asset, ["status", "company", "is_serialized_asset"])
+			asset_details = self.asset_details.get(asset.asset, frappe._dict())
+			status, company, is_serialized_asset = asset_details.status, asset_details.company, asset_details.is_serialized_asset
 
 			if self.purpose == "Transfer" and status in ("Draft", "Scrapped", "Sold"):
 				frappe.throw(_("Row {0}: {1} asset cannot be transferred.").format(asset.idx, status))
@@ -62,12 +96,7 @@ class AssetMovement_(Document):
 					format(asset.asset, current_location, asset.source_location))
 
 	def get_current_location(self, asset):
-		current_location, is_serialized_asset = frappe.db.get_value("Asset_", asset.asset, ["location", "is_serialized_asset"])
-
-		if is_serialized_asset:
-			current_location = frappe.db.get_value("Asset Serial No", asset.serial_no, "location")
-
-		return current_location
+		return self.get_current_details(asset).location
 
 	def validate_asset_issue(self, asset):
 		if asset.target_location:
@@ -122,38 +151,48 @@ class AssetMovement_(Document):
 				format(row.asset, current_custodian, row.from_employee))
 
 	def get_current_custodian(self, row):
-		current_custodian, is_serialized_asset = frappe.db.get_value("Asset_", row.asset, ["custodian", "is_serialized_asset"])
+		return self.get_current_details(row).custodian
 
-		if is_serialized_asset:
-			current_custodian = frappe.db.get_value("Asset Serial No", row.serial_no, "custodian")
+	def get_current_details(self, row):
+		asset_details = self.asset_details.get(row.asset, frappe._dict())
 
-		return current_custodian
+		if asset_details.is_serialized_asset:
+			return self.serial_no_details.get(row.serial_no, frappe._dict())
+
+		return asset_details
 
 	def validate_to_employee(self, row):
-		if frappe.db.get_value("Employee", row.to_employee, "company") != self.company:
+		if self.employee_details.get(row.to_employee, frappe._dict()).company != self.company:
 			frappe.throw(_("Employee {0} does not belong to the company {1}").
 				format(row.to_employee, self.company))
 
 	def update_asset_location_and_custodian(self):
-		current_location, current_custodian = "", ""
-		assets_to_be_updated = self.get_assets_to_be_updated()
-
-		for d in self.assets:
-			if d.asset in assets_to_be_updated:
-				args = {
-					"asset": d.asset,
-					"company": self.company,
-					"serial_no": d.serial_no
-				}
-
-				current_location, current_custodian = self.get_current_location_and_custodian(args)
-
-				if d.serial_no:
-					frappe.db.set_value("Asset Serial No", d.serial_no, "location", current_location)
-					frappe.db.set_value("Asset Serial No", d.serial_no, "custodian", current_custodian)
-				else:
-					frappe.db.set_value("Asset_", d.asset, "location", current_location)
-					frappe.db.set_value("Asset_", d.asset, "custodian", current_custodian)
+		assets_to_be_updated = set(self.get_assets_to_be_updated())
+		rows = [d for d in self.assets if d.asset in assets_to_be_updated]
+
+		if not rows:
+			return
+
+		# the current position corresponds to this document's location and custodian when its transaction date
+		# is the latest, and, on cancellation, to the previous latest document's location and custodian
+		current_positions = get_current_positions(rows, self.company)
+		serial_no_values, asset_values = {}, {}
+
+		for d in rows:
+			current_position = current_positions.get((d.asset, d.serial_no or ""))
+
+			if not current_position:
+				frappe.throw(_("Unable to update Custodian and Location for Asset {0}").format(frappe.bold(d.asset)))
+
+			values = {"location": current_position.location, "custodian": current_position.custodian}
+
+			if d.serial_no:
+				serial_no_values[d.serial_no] = values
+			else:
+				asset_values[d.asset] = values
+
+		update_fields_with_case("Asset Serial No", ["location", "custodian"], serial_no_values)
+		update_fields_with_case("Asset_", ["location", "custodian"], asset_values)
 
 	def get_assets_to_be_updated(self):
 		assets_being_moved = [d.asset for d in self.assets]
@@ -168,34 +207,15 @@ class AssetMovement_(Document):
 		)
 		return submitted_assets_being_moved
 
-	def get_current_location_and_custodian(self, args):
-		cond = "1=1"
-
-		# latest entry corresponds to current document's location, custodian when transaction date > previous dates
-		# In case of cancellation it corresponds to previous latest document's location, custodian
-		latest_movement_entry = frappe.db.sql(
-			"""
-			SELECT asm_item.target_location, asm_item.to_employee
-			FROM `tabAsset Movement Item_` asm_item, `tabAsset Movement_` asm
-			WHERE
-				asm_item.parent=asm.name and
-				asm_item.asset=%(asset)s and
-				asm_item.serial_no=%(serial_no)s and
-				asm.company=%(company)s and
-				asm.docstatus=1 and {0}
-			ORDER BY
-				asm.transaction_date desc limit 1
-			""".format(cond), args)
-
-		if latest_movement_entry:
-			return latest_movement_entry[0][0], latest_movement_entry[0][1]
-		else:
-			frappe.throw(_("Unable to update Custodian and Location for Asset {0}").format(frappe.bold(args["asset"])))
+	def clear_location_rollups(self):
+		clear_location_rollups(
+			[d.source_location for d in self.assets] + [d.target_location for d in self.assets]
+		)
 
 	def record_asset_movements(self):
 		for asset in self.assets:
 			if self.purpose == "Issue":
-				create_asset_activity(
+				queue_asset_activity(
 					asset = asset.asset,
 					asset_serial_no = asset.serial_no,
 					activity_type = "Movement",
@@ -206,7 +226,7 @@ class AssetMovement_(Document):
 			elif self.purpose == "Receipt":
 				# when asset is first received after purchase
 				if not (asset.from_employee or asset.source_location):
-					create_asset_activity(
+					queue_asset_activity(
 						asset = asset.asset,
 						asset_serial_no = asset.serial_no,
 						activity_type = "Movement",
@@ -215,7 +235,7 @@ class AssetMovement_(Document):
 						notes = _("Received at Location {0}").format(asset.target_location)
 					)
 				else:
-					create_asset_activity(
+					queue_asset_activity(
 						asset = asset.asset,
 						asset_serial_no = asset.serial_no,
 						activity_type = "Movement",
@@ -224,11 +244,24 @@ class AssetMovement_(Document):
 						notes = _("Received at Location {0} from Employee {1}").format(asset.target_location, asset.from_employee)
 					)
 			else:
-				create_asset_activity(
+				queue_asset_activity(
 					asset = asset.asset,
 					asset_serial_no = asset.serial_no,
 					activity_type = "Movement",
 					reference_doctype = self.doctype,
 					reference_docname = self.name,
 					notes = _("Transferred from {0} to {1}").format(asset.source_location, asset.target_location)
-				)
\ No newline at end of file
+				)
+
+def get_details_by_name(doctype, names, fields):
+	if not names:
+		return {}
+
+	return {
+		row.name: row
+		for row in frappe.get_all(
+			doctype,
+			filters = {"name": ["in", list(set(names))]},
+			fields = ["name"] + fields
+		)
+	}
@@ -4,7 +4,7 @@
 import unittest
 
 import frappe
-from frappe.utils import nowdate
+from frappe.utils import add_to_date, now_datetime, nowdate
 
 from assets.asset.doctype.asset_.test_asset_ import (
 	create_asset,
@@ -12,6 +12,8 @@ from assets.asset.doctype.asset_.test_asset_ import (
 	create_location,
 	create_asset_data,
 )
+from assets.asset.doctype.location_.location_ import get_location_rollup
+from assets.controllers.base_asset import make_asset_movement
 from erpnext.hr.doctype.employee.test_employee import make_employee
 
 class TestAssetMovement_(unittest.TestCase):
@@ -113,6 +115,67 @@ class TestAssetMovement_(unittest.TestCase):
 
 		self.assertRaises(frappe.ValidationError, asset_movement.save)
 
+	def test_location_is_updated_on_submit_and_reverted_on_cancel(self):
+		asset = create_asset()
+		asset.location = "Test Location"
+		asset.submit()
+
+		asset_movement = create_asset_movement(
+			purpose = "Transfer",
+			company = asset.company,
+			transaction_date = add_to_date(now_datetime(), minutes=1),
+			assets = [{
+				"asset": asset.name,
+				"source_location": "Test Location",
+				"target_location": "Test Location2"
+			}],
+			submit = 1
+		)
+		self.assertEqual(frappe.db.get_value("Asset_", asset.name, "location"), "Test Location2")
+
+		asset_movement.cancel()
+		self.assertEqual(frappe.db.get_value("Asset_", asset.name, "location"), "Test Location")
+
+	def test_location_rollup_is_refreshed_on_submit(self):
+		asset = create_asset()
+		asset.location = "Test Location"
+		asset.submit()
+
+		num_of_assets = get_location_rollup("Test Location2").num_of_assets
+
+		create_asset_movement(
+			purpose = "Transfer",
+			company = asset.company,
+			transaction_date = add_to_date(now_datetime(), minutes=1),
+			assets = [{
+				"asset": asset.name,
+				"source_location": "Test Location",
+				"target_location": "Test Location2"
+			}],
+			submit = 1
+		)
+
+		self.assertEqual(get_location_rollup("Test Location2").num_of_assets, num_of_assets + asset.num_of_assets)
+
+	def test_movement_is_made_for_filtered_assets(self):
+		asset = create_asset(submit = 1)
+
+		asset_movement = make_asset_movement(filters = {"name": asset.name}, purpose = "Transfer")
+
+		self.assertEqual(len(asset_movement["assets"]), 1)
+		self.assertEqual(asset_movement["assets"][0]["asset"], asset.name)
+		self.assertEqual(asset_movement["assets"][0]["source_location"], asset.location)
+
+	def test_movement_is_not_made_for_other_doctypes(self):
+		self.assertRaises(frappe.ValidationError, make_asset_movement,
+			filters = {"name": "Administrator"}, purpose = "Transfer", doctype = "User")
+
+	def test_movement_is_not_made_for_missing_assets(self):
+		asset = create_asset(submit = 1)
+
+		self.assertRaises(frappe.DoesNotExistError, make_asset_movement,
+			assets = [asset.name, "Missing Asset"], purpose = "Transfer")
+
 	def test_issue_asset_to_a_location(self):
 		asset = create_asset(submit = 1)
 
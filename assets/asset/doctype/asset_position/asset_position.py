@@ -0,0 +1,184 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+"""
+	Asset Position keeps every location and custodian an asset (or serial no) has had, one version per
+	submitted movement. A version is valid from its movement's transaction date until the next version's,
+	so the current position is the one with no `valid_to`.
+"""
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import get_datetime, now_datetime
+
+from assets.controllers.bulk_operations import bulk_insert_docs
+
+# number of versions inserted at a time while rebuilding
+REBUILD_BATCH_SIZE = 10000
+
+POSITION_FIELDS = ["asset", "serial_no", "company", "location", "custodian", "valid_from", "asset_movement"]
+
+class AssetPosition(Document):
+	pass
+
+def record_positions(movement):
+	"""
+		Adds a version for every row of the submitted `movement`, and fixes the validity of the versions
+		around it, even when the movement is back-dated.
+	"""
+	positions = [get_position_values(row, movement) for row in movement.assets]
+
+	bulk_insert_docs("Asset Position", POSITION_FIELDS, positions)
+	set_validity_of_positions(movement.assets)
+
+def remove_positions(movement):
+	frappe.db.delete("Asset Position", {"asset_movement": movement.name})
+	set_validity_of_positions(movement.assets)
+
+def set_validity_of_positions(rows=None):
+	"""
+		Ends each version of the positions of the (asset, serial_no)s in `rows` (or of all of them) where the
+		next one begins. Only the histories of the given assets are read.
+	"""
+	condition, values = "1=1", {}
+
+	if rows is not None:
+		if not rows:
+			return
+
+		condition = "asset in %(assets)s and serial_no in %(serial_nos)s"
+		values = {
+			"assets": list({row.asset for row in rows}),
+			"serial_nos": list({row.serial_no or "" for row in rows})
+		}
+
+	frappe.db.sql(
+		"""
+			UPDATE `tabAsset Position` position
+			INNER JOIN (
+				SELECT
+					name,
+					LEAD(valid_from) OVER (PARTITION BY asset, serial_no ORDER BY valid_from, creation, name) as next_valid_from
+				FROM `tabAsset Position`
+				WHERE {0}
+			) versions ON versions.name = position.name
+			SET position.valid_to = versions.next_valid_from
+		""".format(condition),
+		values
+	)
+
+def get_current_positions(rows, company):
+	"""
+		Returns the current position of every (asset, serial_no) in `rows`, keyed by (asset, serial_no).
+	"""
+	positions = frappe.db.sql(
+		"""
+			SELECT asset, serial_no, location, custodian
+			FROM `tabAsset Position`
+			WHERE
+				asset in %(assets)s and
+				serial_no in %(serial_nos)s and
+				company = %(company)s and
+				valid_to is null
+		""",
+		{
+			"assets": list({row.asset for row in rows}),
+			"serial_nos": list({row.serial_no or "" for row in rows}),
+			"company": company
+		},
+		as_dict = 1
+	)
+
+	return {(position.asset, position.serial_no): position for position in positions}
+
+@frappe.whitelist()
+def get_position(asset, serial_no=None, date=None):
+	"""
+		Returns the location and custodian of the asset (or serial no) at `date`, or now if it isn't given.
+	"""
+	frappe.has_permission("Asset_", doc=asset, throw=True)
+
+	position = frappe.db.sql(
+		"""
+			SELECT location, custodian, valid_from, valid_to, asset_movement
+			FROM `tabAsset Position`
+			WHERE
+				asset = %(asset)s and
+				serial_no = %(serial_no)s and
+				valid_from <= %(date)s
+			ORDER BY valid_from desc, creation desc, name desc
+			LIMIT 1
+		""",
+		{
+			"asset": asset,
+			"serial_no": serial_no or "",
+			"date": get_datetime(date) if date else now_datetime()
+		},
+		as_dict = 1
+	)
+
+	return position[0] if position else None
+
+def copy_positions(asset, new_assets):
+	"""
+		Gives each of `new_assets`, split from `asset`, the versions `asset` has had so far, since the units
+		in them have been wherever `asset` was.
+	"""
+	positions = frappe.get_all(
+		"Asset Position",
+		filters = {"asset": asset, "serial_no": ""},
+		fields = POSITION_FIELDS + ["valid_to"]
+	)
+
+	bulk_insert_docs(
+		"Asset Position",
+		POSITION_FIELDS + ["valid_to"],
+		[
+			frappe._dict(position, name=frappe.generate_hash(length=10), asset=new_asset)
+			for new_asset in new_assets
+			for position in positions
+		]
+	)
+
+def get_position_values(row, movement):
+	return frappe._dict({
+		"name": frappe.generate_hash(length=10),
+		"asset": row.asset,
+		"serial_no": row.serial_no or "",
+		"company": movement.company,
+		"location": row.target_location,
+		"custodian": row.to_employee,
+		"valid_from": movement.transaction_date,
+		"asset_movement": movement.name
+	})
+
+def rebuild_positions():
+	"""
+		Recreates the versions of every asset from its submitted movements.
+	"""
+	frappe.db.delete("Asset Position")
+
+	rows = frappe.db.sql(
+		"""
+			SELECT
+				asm.name, asm.company, asm.transaction_date,
+				asm_item.asset, asm_item.serial_no, asm_item.target_location, asm_item.to_employee
+			FROM `tabAsset Movement Item_` asm_item
+			INNER JOIN `tabAsset Movement_` asm ON asm_item.parent = asm.name
+			WHERE asm.docstatus = 1
+		""",
+		as_dict = 1
+	)
+
+	for i in range(0, len(rows), REBUILD_BATCH_SIZE):
+		bulk_insert_docs(
+			"Asset Position",
+			POSITION_FIELDS,
+			[get_position_values(row, row) for row in rows[i : i + REBUILD_BATCH_SIZE]]
+		)
+
+	set_validity_of_positions()
+
+def on_doctype_update():
+	frappe.db.add_index("Asset Position", ["asset", "serial_no", "valid_from"])
+	frappe.db.add_index("Asset Position", ["asset_movement"])
@@ -0,0 +1,62 @@
+# Copyright (c) 2022, Ganga Manoj and Contributors
+# See license.txt
+
+import unittest
+
+import frappe
+
+from assets.asset.doctype.asset_.test_asset_ import (
+	create_asset,
+	create_asset_data,
+	create_company,
+	create_location,
+)
+from assets.asset.doctype.asset_movement_.test_asset_movement_ import create_asset_movement
+from assets.asset.doctype.asset_position.asset_position import get_position
+
+class TestAssetPosition(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		create_company()
+		create_asset_data()
+		create_location("Test Location2")
+
+	@classmethod
+	def tearDownClass(cls):
+		frappe.db.rollback()
+
+	def test_back_dated_movement_only_changes_the_past(self):
+		asset = create_asset()
+		asset.location = "Test Location"
+		asset.submit()
+
+		create_asset_movement(
+			purpose = "Transfer",
+			company = asset.company,
+			transaction_date = "2021-01-01 10:00:00",
+			assets = [{
+				"asset": asset.name,
+				"source_location": "Test Location",
+				"target_location": "Test Location2"
+			}],
+			submit = 1
+		)
+		back_dated_movement = create_asset_movement(
+			purpose = "Transfer",
+			company = asset.company,
+			transaction_date = "2020-06-01 10:00:00",
+			assets = [{
+				"asset": asset.name,
+				"source_location": "Test Location2",
+				"target_location": "Test Location"
+			}],
+			submit = 1
+		)
+
+		self.assertEqual(get_position(asset.name, date="2020-07-01").location, "Test Location")
+		self.assertEqual(get_position(asset.name, date="2021-02-01").location, "Test Location2")
+		self.assertEqual(frappe.db.get_value("Asset_", asset.name, "location"), "Test Location2")
+
+		back_dated_movement.cancel()
+		self.assertFalse(frappe.db.exists("Asset Position", {"asset_movement": back_dated_movement.name}))
+		self.assertEqual(get_position(asset.name, date="2021-02-01").valid_from, frappe.utils.get_datetime("2021-01-01 10:00:00"))
@@ -1,16 +1,26 @@
 # Copyright (c) 2021, Ganga Manoj and contributors
 # For license information, please see license.txt
 
-from cgitb import enable
+import json
+
 import frappe
 from frappe import _
 from frappe.utils import flt, getdate, time_diff_in_hours, get_link_to_form
 from erpnext.controllers.accounts_controller import AccountsController
 
-from assets.controllers.base_asset import get_asset_account
+from assets.asset.doctype.asset_activity.asset_activity import (
+	get_asset_activity_buffer_length,
+	truncate_asset_activity_buffer,
+)
+from assets.controllers.base_asset import clear_asset_row_cache, get_asset_account, get_asset_row
+from assets.controllers.cached_values import get_accounts_settings_value
 from assets.asset.doctype.asset_.asset_ import split_asset
 from erpnext.accounts.general_ledger import make_gl_entries
 
+# number of Asset Repairs whose accounts are read together while submitting them in bulk
+SUBMIT_BATCH_SIZE = 100
+# Asset Repairs submitted in bulk are submitted in the background if there are more than this
+SUBMIT_IN_BACKGROUND_THRESHOLD = 20
 
 class AssetRepair_(AccountsController):
 	def validate(self):
@@ -152,7 +162,7 @@ class AssetRepair_(AccountsController):
 		if self.asset_doc.doctype == "Asset_":
 			return self.asset_doc.calculate_depreciation
 		else:
-			return frappe.db.get_value("Asset_", self.asset_doc.asset, "calculate_depreciation")
+			return get_asset_row(self.asset_doc.asset).calculate_depreciation
 
 	def decrease_stock_quantity(self):
 		stock_entry = frappe.get_doc({
@@ -174,6 +184,7 @@ class AssetRepair_(AccountsController):
 		stock_entry.submit()
 
 		self.db_set('stock_entry', stock_entry.name)
+		self.stock_entry_doc = stock_entry
 
 	def increase_stock_quantity(self):
 		stock_entry = frappe.get_doc('Stock Entry', self.stock_entry)
@@ -187,9 +198,9 @@ class AssetRepair_(AccountsController):
 
 	def get_gl_entries(self):
 		gl_entries = []
-		repair_and_maintenance_account = frappe.db.get_value('Company', self.company, 'repair_and_maintenance_account')
-		fixed_asset_account = get_asset_account("fixed_asset_account", asset=self.asset, company=self.company)
-		expense_account = frappe.get_doc('Purchase Invoice', self.purchase_invoice).items[0].expense_account
+		repair_and_maintenance_account = frappe.get_cached_value('Company', self.company, 'repair_and_maintenance_account')
+		fixed_asset_account = get_fixed_asset_account(get_asset_row(self.asset).asset_category, self.company)
+		expense_account = get_purchase_invoice_expense_account(self.purchase_invoice)
 
 		gl_entries.append(
 			self.get_gl_dict({
@@ -207,8 +218,7 @@ class AssetRepair_(AccountsController):
 
 		if self.get('stock_consumption'):
 			# creating GL Entries for each row in Stock Items based on the Stock Entry created for it
-			stock_entry = frappe.get_doc('Stock Entry', self.stock_entry)
-			for item in stock_entry.items:
+			for item in self.get_stock_entry_items():
 				gl_entries.append(
 					self.get_gl_dict({
 						"account": item.expense_account,
@@ -241,6 +251,23 @@ class AssetRepair_(AccountsController):
 
 		return gl_entries
 
+	def get_stock_entry_items(self):
+		"""
+			Uses the Stock Entry made while submitting this doc, if it is still loaded, instead of reading it again.
+		"""
+		if self.get('stock_entry_doc'):
+			return self.stock_entry_doc.items
+
+		return frappe.get_all(
+			'Stock Entry Detail',
+			filters = {
+				'parent': self.stock_entry,
+				'parenttype': 'Stock Entry'
+			},
+			fields = ['expense_account', 'amount'],
+			order_by = 'idx'
+		)
+
 	def increase_asset_life(self):
 		self.asset_doc.flags.ignore_validate_update_after_submit = True
 		self.asset_doc.enable_finance_books = self.has_enabled_finance_books()
@@ -286,15 +313,15 @@ class AssetRepair_(AccountsController):
 			self.asset_doc.asset_life_in_months -= self.increase_in_asset_life
 
 	def has_enabled_finance_books(self):
-		return frappe.db.get_single_value("Accounts Settings", "enable_finance_books")
+		return get_accounts_settings_value("enable_finance_books")
 
 	def record_asset_repair(self):
-		from assets.asset.doctype.asset_activity.asset_activity import create_asset_activity
+		from assets.asset.doctype.asset_activity.asset_activity import queue_asset_activity
 		from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_ import get_asset_and_serial_no
 
 		asset, serial_no = get_asset_and_serial_no(self.asset_doc)
 
-		create_asset_activity(
+		queue_asset_activity(
 			asset = asset,
 			asset_serial_no = serial_no,
 			activity_type = "Repair",
@@ -303,6 +330,118 @@ class AssetRepair_(AccountsController):
 			reference_docname = self.name
 		)
 
+def get_fixed_asset_account(asset_category, company):
+	"""
+		Resolves the Fixed Asset Account of each asset category and company only once per request.
+	"""
+	if not hasattr(frappe.local, "repair_fixed_asset_accounts"):
+		frappe.local.repair_fixed_asset_accounts = {}
+
+	key = (asset_category, company)
+	if key not in frappe.local.repair_fixed_asset_accounts:
+		frappe.local.repair_fixed_asset_accounts[key] = get_asset_account(
+			"fixed_asset_account", asset_category=asset_category, company=company)
+
+	return frappe.local.repair_fixed_asset_accounts[key]
+
+def get_purchase_invoice_expense_account(purchase_invoice):
+	"""
+		Returns the Expense Account of the first item of `purchase_invoice`, which the Repair Cost is credited to.
+	"""
+	if not purchase_invoice:
+		frappe.throw(_("Please select the Purchase Invoice the Repair Cost was billed in."), title=_("Missing Value"))
+
+	if purchase_invoice not in getattr(frappe.local, "repair_expense_accounts", {}):
+		set_purchase_invoice_expense_accounts([purchase_invoice])
+
+	expense_account = frappe.local.repair_expense_accounts[purchase_invoice]
+	if not expense_account:
+		frappe.throw(_("Purchase Invoice {0} does not have any items with an Expense Account.")
+			.format(frappe.bold(purchase_invoice)), title=_("Invalid Purchase Invoice"))
+
+	return expense_account
+
+def set_purchase_invoice_expense_accounts(purchase_invoices):
+	"""
+		Caches the Expense Accounts of the first items of all the `purchase_invoices` with one query.
+	"""
+	if not hasattr(frappe.local, "repair_expense_accounts"):
+		frappe.local.repair_expense_accounts = {}
+
+	expense_accounts = dict(frappe.db.sql(
+		"""
+			SELECT item.parent, item.expense_account
+			FROM `tabPurchase Invoice Item` item
+			INNER JOIN (
+				SELECT parent, min(idx) as idx
+				FROM `tabPurchase Invoice Item`
+				WHERE parent in %(purchase_invoices)s and parenttype = 'Purchase Invoice'
+				GROUP BY parent
+			) first_item ON first_item.parent = item.parent and first_item.idx = item.idx
+			WHERE item.parenttype = 'Purchase Invoice'
+		""",
+		{"purchase_invoices": list(purchase_invoices)}
+	))
+
+	for purchase_invoice in purchase_invoices:
+		frappe.local.repair_expense_accounts[purchase_invoice] = expense_accounts.get(purchase_invoice)
+
+@frappe.whitelist()
+def submit_asset_repairs(repairs):
+	"""
+		Submits many Asset Repairs, in the background if there are more than SUBMIT_IN_BACKGROUND_THRESHOLD.
+	"""
+	if isinstance(repairs, str):
+		repairs = json.loads(repairs)
+
+	frappe.has_permission("Asset Repair_", "submit", throw=True)
+
+	if len(repairs) > SUBMIT_IN_BACKGROUND_THRESHOLD:
+		frappe.enqueue(
+			"assets.asset.doctype.asset_repair_.asset_repair_.submit_repairs_in_batches",
+			queue = "long",
+			repairs = repairs,
+			commit = True
+		)
+		frappe.msgprint(_("{0} Asset Repairs are being submitted in the background.").format(len(repairs)))
+	else:
+		return submit_repairs_in_batches(repairs)
+
+def submit_repairs_in_batches(repairs, commit=False):
+	"""
+		Submits the `repairs`, reading the accounts the GL Entries of each batch need with one query per batch.
+		A repair that can't be submitted is rolled back and logged without stopping the others.
+	"""
+	failed = []
+
+	for i in range(0, len(repairs), SUBMIT_BATCH_SIZE):
+		batch = [frappe.get_doc("Asset Repair_", repair) for repair in repairs[i : i + SUBMIT_BATCH_SIZE]]
+		purchase_invoices = {repair.purchase_invoice for repair in batch if repair.capitalize_repair_cost and repair.purchase_invoice}
+
+		if purchase_invoices:
+			set_purchase_invoice_expense_accounts(purchase_invoices)
+
+		for repair in batch:
+			frappe.db.savepoint("submit_asset_repair")
+			num_of_queued_activities = get_asset_activity_buffer_length()
+
+			try:
+				repair.submit()
+			except Exception:
+				frappe.db.rollback(save_point="submit_asset_repair")
+
+				# rolling back to a savepoint leaves what the failed submission cached in memory behind
+				truncate_asset_activity_buffer(num_of_queued_activities)
+				clear_asset_row_cache(repair.asset)
+
+				frappe.log_error(title=_("Asset Repair {0} could not be submitted").format(repair.name))
+				failed.append(repair.name)
+
+		if commit:
+			frappe.db.commit()
+
+	return failed
+
 @frappe.whitelist()
 def get_downtime(failure_date, completion_date):
 	downtime = time_diff_in_hours(completion_date, failure_date)
@@ -12,6 +12,8 @@ from assets.asset.doctype.asset_.test_asset_ import (
 	create_asset_data,
 	enable_finance_books
 )
+from assets.asset.doctype.asset_activity.asset_activity import flush_asset_activities
+from assets.asset.doctype.asset_repair_.asset_repair_ import submit_repairs_in_batches
 from assets.asset.doctype.asset_serial_no.test_asset_serial_no import get_asset_serial_no_doc
 
 from erpnext.stock.doctype.item.test_item import create_item
@@ -188,6 +190,7 @@ class TestAssetRepair_(unittest.TestCase):
 
 	def test_asset_repair_gets_recorded(self):
 		asset_repair = create_asset_repair(submit = 1)
+		flush_asset_activities()
 
 		asset_activity = frappe.get_all(
 			"Asset Activity",
@@ -200,6 +203,47 @@ class TestAssetRepair_(unittest.TestCase):
 		self.assertTrue(asset_activity)
 		self.assertEqual(asset_activity.activity_type, "Repair")
 
+	def test_asset_repairs_are_submitted_in_batches(self):
+		from erpnext.accounts.doctype.purchase_invoice.test_purchase_invoice import make_purchase_invoice
+
+		repairs = []
+		for purchase_invoice in [make_purchase_invoice().name, make_purchase_invoice().name, None]:
+			asset_repair = create_asset_repair()
+			asset_repair.update({
+				"repair_status": "Completed",
+				"cost_center": "_Test Cost Center - _TC",
+				"capitalize_repair_cost": 1,
+				"purchase_invoice": purchase_invoice
+			})
+			asset_repair.save()
+			repairs.append(asset_repair.name)
+
+		failed = submit_repairs_in_batches(repairs)
+
+		self.assertEqual(failed, [repairs[2]])
+		self.assertEqual([frappe.db.get_value("Asset Repair_", repair, "docstatus") for repair in repairs], [1, 1, 0])
+		self.assertTrue(frappe.db.exists("GL Entry", {"voucher_no": repairs[0]}))
+
+	def test_failed_repair_in_batch_leaves_no_split_behind(self):
+		from assets.asset.doctype.asset_.test_asset_ import get_linked_asset_activity
+
+		asset = create_asset(is_serialized_asset = 0, num_of_assets = 5, submit = 1)
+
+		asset_repair = create_asset_repair(asset = asset, num_of_assets = 2)
+		asset_repair.update({
+			"repair_status": "Completed",
+			"cost_center": "_Test Cost Center - _TC",
+			"capitalize_repair_cost": 1,
+			"purchase_invoice": None
+		})
+		asset_repair.save()
+
+		# the asset is split before the missing Purchase Invoice makes the submission fail
+		self.assertEqual(submit_repairs_in_batches([asset_repair.name]), [asset_repair.name])
+
+		self.assertEqual(frappe.db.get_value("Asset_", asset.name, "num_of_assets"), 5)
+		self.assertFalse(get_linked_asset_activity(asset.name, "Split"))
+
 def create_asset_repair(**args):
 	from erpnext.accounts.doctype.purchase_invoice.test_purchase_invoice import make_purchase_invoice
 	from erpnext.stock.doctype.warehouse.test_warehouse import create_warehouse
@@ -3,9 +3,16 @@
 
 import frappe
 from frappe import _
+from frappe.utils import cint
 import json
 
-from assets.controllers.base_asset import BaseAsset, get_finance_books
+from assets.controllers.base_asset import BaseAsset, get_asset_row, get_finance_books
+from assets.controllers.bulk_operations import bulk_insert_child_rows, bulk_insert_docs
+
+# creating more Asset Serial Nos than this at once is done in a background job
+SERIAL_NO_CREATION_THRESHOLD = 100
+# number of Asset Serial Nos inserted together
+SERIAL_NO_BATCH_SIZE = 1000
 
 
 class AssetSerialNo(BaseAsset):
@@ -18,7 +25,7 @@ class AssetSerialNo(BaseAsset):
 		super().before_submit()
 
 	def validate_asset(self):
-		is_serialized_asset = frappe.db.get_value("Asset_", self.asset, "is_serialized_asset")
+		is_serialized_asset = get_asset_row(self.asset).is_serialized_asset
 
 		if not is_serialized_asset:
 			frappe.throw(_("{0} is not a Serialized Asset")
@@ -30,24 +37,112 @@ class AssetSerialNo(BaseAsset):
 
 @frappe.whitelist()
 def create_asset_serial_no_docs(asset, num_of_assets=None):
-	asset, finance_books, asset_value = get_asset_values(asset)
+	if num_of_assets:
+		num_of_serial_nos = cint(num_of_assets)
+	elif isinstance(asset, str):
+		num_of_serial_nos = frappe.db.get_value("Asset_", asset, "num_of_assets")
+	else:
+		num_of_serial_nos = asset.num_of_assets
+
+	if num_of_serial_nos > SERIAL_NO_CREATION_THRESHOLD:
+		frappe.enqueue(
+			"assets.asset.doctype.asset_serial_no.asset_serial_no.create_asset_serial_nos_in_bulk",
+			queue = "long",
+			timeout = 3600,
+			enqueue_after_commit = True,
+			asset = asset if isinstance(asset, str) else asset.name,
+			num_of_assets = num_of_assets
+		)
+
+		frappe.msgprint(_("{0} Asset Serial Nos are being created in the background.")
+			.format(frappe.bold(num_of_serial_nos)), title=_("Queued"), indicator="blue")
+	else:
+		created_serial_nos = create_asset_serial_nos_in_bulk(asset, num_of_assets)
+		display_message_on_successful_creation(created_serial_nos)
+
+def create_asset_serial_nos_in_bulk(asset, num_of_assets=None):
+	"""
+		Validates a single Asset Serial No, as the validations depend only on the Asset,
+		and inserts all of them along with their finance books using multi-row inserts.
+	"""
+	# the range is worked out here rather than when the job is queued, so that it is read under the lock
 	start, total_num_of_assets = get_iteration_limits(asset, num_of_assets)
+	if start >= total_num_of_assets:
+		return []
+
+	asset, finance_books, asset_value = get_asset_values(asset)
+	validated_serial_no = get_validated_serial_no(asset, finance_books, asset_value, start)
+
+	serial_no_values, finance_book_fields = get_values_to_be_copied(validated_serial_no)
 
 	created_serial_nos = []
-	for i in range(start, total_num_of_assets):
-		serial_no = frappe.get_doc({
-			"doctype": "Asset Serial No",
-			"asset": asset.name,
-			"serial_no": get_serial_no(asset.name, i),
-			"asset_value": asset_value,
-			"finance_books": finance_books
-		})
-		serial_no.save(ignore_permissions=True)
-
-		created_serial_nos.append(serial_no.name)
+	for batch_start in range(start, total_num_of_assets, SERIAL_NO_BATCH_SIZE):
+		batch_end = min(batch_start + SERIAL_NO_BATCH_SIZE, total_num_of_assets)
+		serial_nos, finance_book_rows = [], []
+
+		for i in range(batch_start, batch_end):
+			serial_no = frappe._dict(serial_no_values, name=get_serial_no(asset.name, i))
+			serial_no.serial_no = serial_no.name
+			serial_nos.append(serial_no)
+
+			for row in validated_serial_no.get("finance_books"):
+				finance_book_rows.append(frappe._dict(row.get_valid_dict(), name=None, parent=serial_no.name))
+
+		bulk_insert_docs("Asset Serial No", list(serial_no_values), serial_nos)
+
+		if finance_book_rows:
+			bulk_insert_child_rows("Asset Finance Book_", "Asset Serial No", "finance_books",
+				finance_book_fields, finance_book_rows)
+
+		created_serial_nos.extend(serial_no.name for serial_no in serial_nos)
+		publish_serial_no_creation_progress(asset, batch_end - start, total_num_of_assets - start)
 
 	update_asset(asset, total_num_of_assets)
-	display_message_on_successful_creation(created_serial_nos)
+
+	return created_serial_nos
+
+def get_validated_serial_no(asset, finance_books, asset_value, start):
+	serial_no = frappe.new_doc("Asset Serial No")
+	serial_no.update({
+		"asset": asset.name,
+		"serial_no": get_serial_no(asset.name, start),
+		"asset_value": asset_value,
+		"finance_books": finance_books
+	})
+	serial_no.flags.ignore_permissions = True
+
+	serial_no.run_method("validate")
+	serial_no._validate_mandatory()
+
+	return serial_no
+
+def get_values_to_be_copied(serial_no):
+	from frappe.model import default_fields
+
+	serial_no_values = {
+		field: value
+		for field, value in serial_no.get_valid_dict().items()
+		if field not in default_fields
+	}
+
+	finance_book_fields = []
+	if serial_no.get("finance_books"):
+		finance_book_fields = [
+			field for field in serial_no.finance_books[0].get_valid_dict()
+			if field not in default_fields
+		]
+
+	return serial_no_values, finance_book_fields
+
+def publish_serial_no_creation_progress(asset, num_of_serial_nos_created, num_of_serial_nos_to_be_created):
+	frappe.publish_progress(
+		num_of_serial_nos_created * 100 / num_of_serial_nos_to_be_created,
+		title = _("Creating Asset Serial Nos"),
+		doctype = "Asset_",
+		docname = asset.name,
+		description = _("{0} of {1} Asset Serial Nos created").format(num_of_serial_nos_created,
+			num_of_serial_nos_to_be_created)
+	)
 
 def get_asset_values(asset):
 	if isinstance(asset, str):
@@ -62,12 +157,20 @@ def get_asset_values(asset):
 	return asset, finance_books, asset_value
 
 def get_iteration_limits(asset, num_of_assets):
+	"""
+		Locks the Asset's row and returns the range of serial nos to be created, so that two jobs for the same
+		Asset can't create overlapping ranges. Serial nos left by an earlier attempt at creating the initial
+		ones are not created again.
+	"""
+	asset_name = asset if isinstance(asset, str) else asset.name
+	current_num_of_assets = frappe.db.get_value("Asset_", asset_name, "num_of_assets", for_update=True)
+
 	if not num_of_assets:
-		start = 0
-		total_num_of_assets = asset.num_of_assets
+		start = frappe.db.count("Asset Serial No", {"asset": asset_name})
+		total_num_of_assets = current_num_of_assets
 	else:
-		start = asset.num_of_assets
-		total_num_of_assets = int(num_of_assets) + start
+		start = current_num_of_assets
+		total_num_of_assets = cint(num_of_assets) + start
 
 	return start, total_num_of_assets
 
@@ -92,4 +195,7 @@ def display_message_on_successful_creation(created_serial_nos):
 	frappe.msgprint(message, title="Sucess", indicator="green")
 
 def get_serial_no(asset_name, num_of_assets_created):
-	return asset_name + "-" + str(num_of_assets_created + 1)
\ No newline at end of file
+	return asset_name + "-" + str(num_of_assets_created + 1)
+
+def on_doctype_update():
+	frappe.db.add_index("Asset Serial No", ["location"])
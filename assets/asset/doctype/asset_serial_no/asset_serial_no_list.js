@@ -35,20 +35,29 @@ frappe.listview_settings["Asset Serial No"] = {
 
 	onload: function(me) {
 		me.page.add_action_item('Make Asset Movement', function() {
-			const assets = me.get_checked_items();
-			frappe.call({
-				method: "assets.controllers.base_asset.make_asset_movement",
-				freeze: true,
-				args:{
-					"assets": assets
-				},
-				callback: function (r) {
-					if (r.message) {
-						var doc = frappe.model.sync(r.message)[0];
-						frappe.set_route("Form", doc.doctype, doc.name);
-					}
-				}
+			make_asset_movement(me, {
+				"assets": me.get_checked_items(true)
+			});
+		});
+
+		me.page.add_menu_item(__('Make Asset Movement for All Filtered'), function() {
+			make_asset_movement(me, {
+				"filters": me.get_filters_for_args()
 			});
 		});
 	},
-}
\ No newline at end of file
+}
+
+function make_asset_movement(me, args) {
+	frappe.call({
+		method: "assets.controllers.base_asset.make_asset_movement",
+		freeze: true,
+		args: Object.assign({"doctype": me.doctype}, args),
+		callback: function (r) {
+			if (r.message) {
+				var doc = frappe.model.sync(r.message)[0];
+				frappe.set_route("Form", doc.doctype, doc.name);
+			}
+		}
+	});
+}
@@ -15,6 +15,7 @@ from assets.asset.doctype.asset_.test_asset_ import (
 	create_depreciation_template,
 	enable_book_asset_depreciation_entry_automatically,
 )
+from assets.asset.doctype.asset_activity.asset_activity import flush_asset_activities
 class TestAssetSerialNo(unittest.TestCase):
 	@classmethod
 	def setUpClass(cls):
@@ -390,6 +391,7 @@ class TestAssetSerialNo(unittest.TestCase):
 		asset_serial_no = get_asset_serial_no_doc(asset.name)
 		asset_serial_no.location = "Test Location"
 		asset_serial_no.submit()
+		flush_asset_activities()
 
 		asset_activity = frappe.get_value(
 			"Asset Activity",
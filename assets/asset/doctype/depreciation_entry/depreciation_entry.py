@@ -5,7 +5,7 @@ import frappe
 from frappe import _
 from frappe.utils import flt
 
-from assets.controllers.base_asset import validate_serial_no
+from assets.controllers.base_asset import get_asset_row, validate_serial_no
 
 from erpnext.controllers.accounts_controller import AccountsController
 
@@ -32,7 +32,7 @@ class DepreciationEntry(AccountsController):
 	def set_credit_and_debit_accounts(self):
 		from assets.asset.doctype.depreciation_schedule_.depreciation_posting import get_depreciation_accounts
 
-		asset_category = frappe.get_value("Asset_", self.asset, "asset_category")
+		asset_category = get_asset_row(self.asset).asset_category
 
 		if (not self.credit_account or not self.debit_account) and asset_category and self.company:
 			credit_account, debit_account = get_depreciation_accounts(asset_category, self.company)
@@ -52,7 +52,7 @@ class DepreciationEntry(AccountsController):
 			frappe.throw(_("Reference Document Type cannot be {0} when Serial No has not been entered.").
 				format(self.reference_doctype), title = _("Invalid Reference"))
 
-	def validate_reference_docname(self):
+	def validate_reference_docname(self, depr_schedule=None):
 		if self.reference_doctype in ["Asset_", "Asset Serial No"]:
 			ideal_reference_docname = self.get_asset_or_serial_no()
 
@@ -64,7 +64,11 @@ class DepreciationEntry(AccountsController):
 		elif self.reference_doctype == "Depreciation Schedule_":
 			fieldname = "serial_no" if self.serial_no else "asset"
 
-			asset_linked_with_depr_schedule = frappe.get_value("Depreciation Schedule_", self.reference_docname, fieldname)
+			if depr_schedule is None:
+				asset_linked_with_depr_schedule = frappe.get_value("Depreciation Schedule_", self.reference_docname, fieldname)
+			else:
+				asset_linked_with_depr_schedule = depr_schedule.get(fieldname)
+
 			asset_linked_with_depr_entry = self.get_asset_or_serial_no()
 
 			if asset_linked_with_depr_schedule != asset_linked_with_depr_entry:
@@ -76,12 +80,15 @@ class DepreciationEntry(AccountsController):
 		if self.reference_doctype == "Depreciation Schedule_" and not self.depr_schedule_row:
 			frappe.throw(_("Depreciation Schedule Row needs to be fetched."), title = _("Missing Value"))
 
-	def validate_finance_book(self):
-		is_depreciable_asset = frappe.get_value("Asset_", self.asset, "calculate_depreciation")
+	def validate_finance_book(self, is_depreciable_asset=None, finance_books=None):
+		if is_depreciable_asset is None:
+			is_depreciable_asset = get_asset_row(self.asset).calculate_depreciation
 
 		if is_depreciable_asset:
 			asset_or_serial_no = self.get_asset_or_serial_no()
-			finance_books = self.get_finance_books_linked_with_asset(asset_or_serial_no)
+
+			if finance_books is None:
+				finance_books = self.get_finance_books_linked_with_asset(asset_or_serial_no)
 
 			if len(finance_books) == 1:
 				if not self.finance_book:
@@ -0,0 +1,444 @@
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate
+
+from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
+	get_checks_for_pl_and_bs_accounts,
+)
+
+from assets.controllers.bulk_operations import bulk_insert_docs, reserve_names, update_rows_with_case
+from assets.asset.doctype.depreciation_schedule_.depreciation_posting import (
+	get_depreciation_accounts,
+	get_shard_condition,
+	lock_schedule_if_it_needs_posting,
+	post_depreciation_entries,
+	record_depreciation_posting,
+)
+
+# number of Depreciation Schedules posted together in a single batch
+BATCH_SIZE = 500
+
+
+def post_depreciation_entries_in_bulk(date, shard=None):
+	"""
+		Posts all due depreciation rows, or those of `shard`, with a handful of queries per batch instead of
+		loading, saving and submitting documents for every row.
+	"""
+	from assets.controllers.base_asset import clear_asset_row_cache
+
+	due_rows = get_depreciation_rows_that_need_posting(date, shard)
+	groups, schedules_that_need_serial_posting = group_depreciation_rows(due_rows)
+
+	for rows_by_schedule in groups.values():
+		for batch in get_batches(rows_by_schedule):
+			post_batch(batch, date)
+			frappe.db.commit()
+			clear_asset_row_cache()
+
+	for schedule in schedules_that_need_serial_posting:
+		if lock_schedule_if_it_needs_posting(schedule, date):
+			post_depreciation_entries(schedule, date)
+
+		frappe.db.commit()
+
+def get_depreciation_rows_that_need_posting(date, shard=None):
+	dimension_fields = get_dimension_fields("Asset_")
+	dimension_columns = "".join(", asset.`{0}`".format(field) for field in dimension_fields)
+
+	return frappe.db.sql(
+		"""
+			SELECT
+				schedule_row.name, schedule_row.parent, schedule_row.schedule_date,
+				schedule_row.depreciation_amount, depr_schedule.asset, depr_schedule.serial_no,
+				depr_schedule.finance_book, asset.company, asset.asset_category, asset.cost_center
+				{dimension_columns}
+			FROM `tabAsset Depreciation Schedule` schedule_row
+			INNER JOIN `tabDepreciation Schedule_` depr_schedule
+				ON depr_schedule.name = schedule_row.parent
+			INNER JOIN `tabAsset_` asset
+				ON asset.name = depr_schedule.asset
+			WHERE
+				depr_schedule.status = 'Active'
+				and schedule_row.schedule_date <= %(date)s
+				and (schedule_row.depreciation_entry is null or schedule_row.depreciation_entry = '')
+				{shard_condition}
+			ORDER BY schedule_row.parent, schedule_row.schedule_date
+		""".format(dimension_columns=dimension_columns, shard_condition=get_shard_condition(shard)),
+		dict(shard or {}, date=date),
+		as_dict = 1
+	)
+
+def get_dimension_fields(doctype):
+	meta = frappe.get_meta(doctype)
+
+	return [
+		dimension["fieldname"]
+		for dimension in get_accounting_dimensions()
+		if meta.has_field(dimension["fieldname"])
+	]
+
+def get_accounting_dimensions():
+	if not hasattr(frappe.local, "asset_accounting_dimensions"):
+		frappe.local.asset_accounting_dimensions = get_checks_for_pl_and_bs_accounts()
+
+	return frappe.local.asset_accounting_dimensions
+
+def group_depreciation_rows(due_rows):
+	"""
+		Groups rows in the form {(company, finance_book, credit_account, debit_account): {schedule: [rows]}}.
+
+		Schedules whose accounts cannot be resolved are returned separately, so that the regular
+		posting flow can record their failure.
+	"""
+	groups = {}
+	schedules_that_need_serial_posting = []
+	accounts = {}
+
+	for row in due_rows:
+		category_and_company = (row.asset_category, row.company)
+
+		if category_and_company not in accounts:
+			try:
+				accounts[category_and_company] = get_depreciation_accounts(row.asset_category, row.company)
+			except frappe.ValidationError:
+				frappe.clear_messages()
+				accounts[category_and_company] = None
+
+		if not accounts[category_and_company]:
+			if row.parent not in schedules_that_need_serial_posting:
+				schedules_that_need_serial_posting.append(row.parent)
+			continue
+
+		row.credit_account, row.debit_account = accounts[category_and_company]
+		group_key = (row.company, row.finance_book, row.credit_account, row.debit_account)
+
+		groups.setdefault(group_key, {}).setdefault(row.parent, []).append(row)
+
+	return groups, schedules_that_need_serial_posting
+
+def get_batches(rows_by_schedule, batch_size=BATCH_SIZE):
+	"""
+		Splits {schedule: [rows]} into batches without spreading the rows of a schedule across batches.
+	"""
+	schedules = list(rows_by_schedule)
+
+	for i in range(0, len(schedules), batch_size):
+		yield {schedule: rows_by_schedule[schedule] for schedule in schedules[i : i + batch_size]}
+
+def post_batch(batch, date):
+	frappe.db.savepoint("bulk_depreciation_posting")
+
+	try:
+		# a retried or overlapping job could be posting the same schedules, so wait for it and post only what is left
+		batch = lock_rows_that_need_posting(batch, date)
+		depr_entries = make_depreciation_entries_in_bulk(batch) if batch else []
+	except Exception:
+		frappe.db.rollback(save_point="bulk_depreciation_posting")
+		frappe.log_error(title="Bulk Depreciation Posting Failed")
+
+		# fall back to posting each schedule individually so that failures are recorded on the schedule
+		for schedule in batch:
+			post_depreciation_entries(schedule, date)
+	else:
+		record_depreciation_postings(depr_entries)
+
+def lock_rows_that_need_posting(batch, date):
+	"""
+		Locks the schedules of the batch, like lock_schedule_if_it_needs_posting, and leaves out the rows
+		that were posted after they were read.
+	"""
+	frappe.db.sql("select name from `tabDepreciation Schedule_` where name in %s for update", (list(batch),))
+
+	rows_that_need_posting = set(frappe.db.sql_list(
+		"""
+			SELECT name
+			FROM `tabAsset Depreciation Schedule`
+			WHERE
+				parent in %(schedules)s
+				and schedule_date <= %(date)s
+				and (depreciation_entry is null or depreciation_entry = '')
+		""",
+		{"schedules": list(batch), "date": date}
+	))
+
+	batch = {schedule: [row for row in rows if row.name in rows_that_need_posting] for schedule, rows in batch.items()}
+
+	return {schedule: rows for schedule, rows in batch.items() if rows}
+
+def make_depreciation_entries_in_bulk(batch):
+	rows = [row for schedule_rows in batch.values() for row in schedule_rows]
+	depreciation_series = get_depreciation_series(rows[0].company)
+	names = reserve_names(depreciation_series, len(rows))
+
+	depr_entries = []
+	for row, name in zip(rows, names):
+		depr_entries.append(get_depreciation_entry_values(row, name, depreciation_series))
+
+	insert_depreciation_entries(depr_entries)
+	insert_gl_entries(depr_entries)
+
+	update_rows_with_case("Asset Depreciation Schedule", "depreciation_entry",
+		{entry.depr_schedule_row: entry.name for entry in depr_entries})
+	update_rows_with_case("Depreciation Schedule_", "depr_entry_posting_status",
+		{schedule: "Successful" for schedule in batch})
+	update_asset_values_in_parents(depr_entries)
+
+	return depr_entries
+
+def get_depreciation_series(company):
+	return frappe.get_cached_value("Company", company, "series_for_depreciation_entry") \
+		or frappe.get_meta("Depreciation Entry").get_field("naming_series").options.split("\n")[0]
+
+def get_depreciation_entry_values(row, name, depreciation_series):
+	depreciation_cost_center = frappe.get_cached_value("Company", row.company, "depreciation_cost_center")
+
+	depr_entry = frappe._dict({
+		"name": name,
+		"naming_series": depreciation_series,
+		"posting_date": row.schedule_date,
+		"company": row.company,
+		"asset": row.asset,
+		"serial_no": row.serial_no,
+		"finance_book": row.finance_book,
+		"credit_account": row.credit_account,
+		"debit_account": row.debit_account,
+		"depreciation_amount": flt(row.depreciation_amount, get_depreciation_amount_precision()),
+		"cost_center": row.cost_center or depreciation_cost_center,
+		"reference_doctype": "Depreciation Schedule_",
+		"reference_docname": row.parent,
+		"depr_schedule_row": row.name
+	})
+
+	for dimension in get_accounting_dimensions():
+		if (row.get(dimension["fieldname"]) or dimension.get("mandatory_for_bs") or dimension.get("mandatory_for_pl")):
+			depr_entry[dimension["fieldname"]] = row.get(dimension["fieldname"]) or dimension.get("default_dimension")
+
+	return depr_entry
+
+def get_depreciation_amount_precision():
+	return frappe.get_precision("Depreciation Entry", "depreciation_amount")
+
+def insert_depreciation_entries(depr_entries):
+	validate_depreciation_entries(depr_entries)
+
+	fields = ["naming_series", "posting_date", "company", "asset", "serial_no", "finance_book", "credit_account",
+		"debit_account", "depreciation_amount", "cost_center", "reference_doctype", "reference_docname",
+		"depr_schedule_row"] + get_dimension_fields("Depreciation Entry")
+
+	bulk_insert_docs("Depreciation Entry", fields, depr_entries, docstatus=1)
+
+def validate_depreciation_entries(depr_entries):
+	"""
+		Runs the checks of DepreciationEntry.validate on every entry, with the assets, schedules and finance
+		books they need fetched for the whole batch at once. The accounts are always set in bulk mode.
+	"""
+	from assets.controllers.base_asset import validate_serial_no
+
+	assets = get_assets_of_entries(depr_entries)
+	schedules = get_schedules_of_entries(depr_entries)
+	finance_books = get_finance_books_of_parents(list({entry.serial_no or entry.asset for entry in depr_entries}))
+
+	for depr_entry in depr_entries:
+		asset = assets.get(depr_entry.asset, frappe._dict())
+		depr_entry_doc = get_depreciation_entry_doc(depr_entry)
+
+		validate_serial_no(depr_entry_doc, is_serialized_asset=asset.is_serialized_asset)
+		depr_entry_doc.validate_depreciation_amount()
+		depr_entry_doc.validate_reference_doctype()
+		depr_entry_doc.validate_reference_docname(
+			depr_schedule=schedules.get(depr_entry.reference_docname, frappe._dict())
+		)
+		depr_entry_doc.validate_depr_schedule_row()
+		depr_entry_doc.validate_finance_book(
+			is_depreciable_asset=asset.calculate_depreciation,
+			finance_books=[
+				row.finance_book for row in finance_books.get(depr_entry_doc.get_asset_or_serial_no(), [])
+			]
+		)
+
+		depr_entry.finance_book = depr_entry_doc.finance_book
+
+def get_assets_of_entries(depr_entries):
+	return {
+		asset.name: asset
+		for asset in frappe.get_all(
+			"Asset_",
+			filters = {"name": ["in", list({entry.asset for entry in depr_entries})]},
+			fields = ["name", "is_serialized_asset", "calculate_depreciation"]
+		)
+	}
+
+def get_schedules_of_entries(depr_entries):
+	return {
+		schedule.name: schedule
+		for schedule in frappe.get_all(
+			"Depreciation Schedule_",
+			filters = {"name": ["in", list({entry.reference_docname for entry in depr_entries})]},
+			fields = ["name", "asset", "serial_no"]
+		)
+	}
+
+def insert_gl_entries(depr_entries):
+	"""
+		Posts the GL Entries of each Depreciation Entry with its own make_gl_entries call, so that they go
+		through the same validations, currency conversion and round off handling as entries submitted one
+		at a time, and are never merged with those of another entry.
+	"""
+	from erpnext.accounts.general_ledger import make_gl_entries
+
+	for depr_entry in depr_entries:
+		depr_entry_doc = get_depreciation_entry_doc(depr_entry)
+		remarks = _("Depreciation as per Depreciation Schedule {0}").format(depr_entry.reference_docname)
+		gl_map = []
+
+		for account, against, dr_or_cr in [
+			(depr_entry.credit_account, depr_entry.debit_account, "credit"),
+			(depr_entry.debit_account, depr_entry.credit_account, "debit")
+		]:
+			gl_map.append(
+				depr_entry_doc.get_gl_dict({
+					"account": account,
+					"against": against,
+					dr_or_cr: depr_entry.depreciation_amount,
+					"cost_center": depr_entry.cost_center,
+					"finance_book": depr_entry.finance_book,
+					"voucher_type": "Depreciation Entry",
+					"voucher_no": depr_entry.name,
+					"remarks": remarks,
+					"company": depr_entry.company
+				}, item = depr_entry_doc)
+			)
+
+		make_gl_entries(gl_map, update_outstanding = "Yes")
+
+def get_depreciation_entry_doc(depr_entry):
+	return frappe.get_doc(dict(depr_entry, doctype = "Depreciation Entry"))
+
+def update_asset_values_in_parents(depr_entries):
+	decrease_in_value = {}
+
+	for depr_entry in depr_entries:
+		parent = (depr_entry.serial_no or depr_entry.asset, depr_entry.finance_book)
+		decrease_in_value[parent] = decrease_in_value.get(parent, 0) + depr_entry.depreciation_amount
+
+	update_finance_book_values(decrease_in_value)
+
+	for parent_doctype in ["Asset_", "Asset Serial No"]:
+		update_parents(parent_doctype, depr_entries, decrease_in_value)
+
+def update_finance_book_values(decrease_in_value):
+	finance_book_rows = frappe.get_all(
+		"Asset Finance Book_",
+		filters = {
+			"parent": ["in", list({parent for parent, finance_book in decrease_in_value})]
+		},
+		fields = ["name", "parent", "finance_book", "asset_value"]
+	)
+
+	new_values = {}
+	for row in finance_book_rows:
+		decrease = decrease_in_value.get((row.parent, row.finance_book))
+
+		if decrease:
+			new_values[row.name] = flt(row.asset_value) - decrease
+
+	update_rows_with_case("Asset Finance Book_", "asset_value", new_values)
+
+def update_parents(parent_doctype, depr_entries, decrease_in_value):
+	if parent_doctype == "Asset_":
+		parents = list({entry.asset for entry in depr_entries if not entry.serial_no})
+	else:
+		parents = list({entry.serial_no for entry in depr_entries if entry.serial_no})
+
+	if not parents:
+		return
+
+	finance_books = get_finance_books_of_parents(parents)
+	asset_values, statuses = {}, {}
+
+	for parent in get_parent_details(parent_doctype, parents):
+		if finance_books.get(parent.name):
+			# same as BaseAsset.update_asset_value, the first finance book drives the asset value
+			asset_values[parent.name] = finance_books[parent.name][0].asset_value
+		else:
+			decrease = sum(value for (name, finance_book), value in decrease_in_value.items() if name == parent.name)
+			asset_values[parent.name] = flt(parent.asset_value) - decrease
+
+		statuses[parent.name] = get_status(parent, finance_books.get(parent.name))
+
+	update_rows_with_case(parent_doctype, "asset_value", asset_values)
+	update_rows_with_case(parent_doctype, "status", statuses)
+
+def get_finance_books_of_parents(parents):
+	finance_books = {}
+
+	for row in frappe.get_all(
+		"Asset Finance Book_",
+		filters = {
+			"parent": ["in", parents]
+		},
+		fields = ["parent", "finance_book", "asset_value"],
+		order_by = "idx"
+	):
+		finance_books.setdefault(row.parent, []).append(row)
+
+	return finance_books
+
+def get_parent_details(parent_doctype, parents):
+	if parent_doctype == "Asset_":
+		return frappe.db.sql(
+			"""
+				SELECT name, company, asset_value, salvage_value, gross_purchase_amount,
+					journal_entry_for_scrap, default_finance_book
+				FROM `tabAsset_`
+				WHERE name in %s
+			""", (parents,), as_dict = 1)
+
+	return frappe.db.sql(
+		"""
+			SELECT serial_no.name, asset.company, serial_no.asset_value, serial_no.salvage_value,
+				asset.gross_purchase_amount, serial_no.journal_entry_for_scrap, asset.default_finance_book
+			FROM `tabAsset Serial No` serial_no
+			INNER JOIN `tabAsset_` asset ON asset.name = serial_no.asset
+			WHERE serial_no.name in %s
+		""", (parents,), as_dict = 1)
+
+def get_status(parent, finance_books):
+	"""
+		Set-based equivalent of BaseAsset.get_status for submitted, depreciable assets.
+	"""
+	from assets.controllers.base_asset import get_default_finance_book
+
+	if parent.journal_entry_for_scrap:
+		return "Scrapped"
+
+	if not finance_books:
+		return "Submitted"
+
+	default_finance_book = parent.default_finance_book or get_default_finance_book(parent.company)
+	asset_value = finance_books[0].asset_value
+
+	for row in finance_books:
+		if row.finance_book == default_finance_book:
+			asset_value = row.asset_value
+			break
+
+	if flt(asset_value) <= flt(parent.salvage_value):
+		return "Fully Depreciated"
+	elif flt(asset_value) < flt(parent.gross_purchase_amount):
+		return "Partially Depreciated"
+
+	return "Submitted"
+
+def record_depreciation_postings(depr_entries):
+	for depr_entry in depr_entries:
+		parent = frappe._dict({
+			"doctype": "Asset Serial No" if depr_entry.serial_no else "Asset_",
+			"name": depr_entry.serial_no or depr_entry.asset,
+			"asset": depr_entry.asset,
+			"serial_no": depr_entry.serial_no
+		})
+		depr_entry.doctype = "Depreciation Entry"
+		depr_entry.posting_date = getdate(depr_entry.posting_date)
+
+		record_depreciation_posting(parent, depr_entry)
@@ -7,48 +7,218 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 )
 from frappe.utils.data import get_link_to_form
 
+from assets.controllers.cached_values import get_accounts_settings_value
 
-def post_all_depreciation_entries(date=None):
+# seconds for which the shards of a posting run are tracked in the cache
+POSTING_RUN_EXPIRY = 86400
+
+def post_all_depreciation_entries(date=None, bulk=None):
 	# Return if automatic booking of asset depreciation is disabled
-	if not cint(frappe.db.get_value("Accounts Settings", None, "book_asset_depreciation_entry_automatically")):
+	if not cint(get_accounts_settings_value("book_asset_depreciation_entry_automatically")):
 		return
 
 	if not date:
 		date = today()
 
-	for schedule in get_schedules_that_need_posting(date):
-		post_depreciation_entries(schedule, date)
-		frappe.db.commit()
+	if bulk is None:
+		bulk = is_bulk_posting_enabled()
+
+	if bulk:
+		from assets.asset.doctype.depreciation_schedule_.bulk_depreciation_posting import post_depreciation_entries_in_bulk
+
+		post_depreciation_entries_in_bulk(date)
+	else:
+		for schedule in get_schedules_that_need_posting(date):
+			post_depreciation_entries(schedule, date)
+			frappe.db.commit()
+
+	notify_accounts_managers_if_posting_failed()
 
+def is_bulk_posting_enabled():
+	return cint(frappe.conf.get("bulk_depreciation_posting"))
+
+def notify_accounts_managers_if_posting_failed():
 	schedules_that_failed_posting = get_schedules_that_failed_to_post_depr_entries()
 
 	if schedules_that_failed_posting:
 		notify_accounts_managers(schedules_that_failed_posting)
 
-def get_schedules_that_need_posting(date):
-	active_schedules = frappe.get_all(
-		"Depreciation Schedule_",
-		filters = {
-			"status": "Active"
+def post_all_depreciation_entries_in_shards(date=None, num_of_shards=None):
+	"""
+		Splits the schedules that need posting into shards and posts each shard in its own background job.
+		The shard that finishes last notifies the Accounts Managers about failures, once for the whole run.
+	"""
+	if not cint(get_accounts_settings_value("book_asset_depreciation_entry_automatically")):
+		return
+
+	if not date:
+		date = today()
+
+	num_of_shards = cint(num_of_shards) or cint(frappe.conf.get("depreciation_posting_shards")) or 4
+	shards = get_shards(date, num_of_shards)
+
+	run_id = frappe.generate_hash(length=10)
+
+	for job_idx, shard in enumerate(shards):
+		frappe.enqueue(
+			"assets.asset.doctype.depreciation_schedule_.depreciation_posting.post_depreciation_entries_for_shard",
+			queue = "long",
+			job_name = "Depreciation Posting {0} ({1}/{2})".format(run_id, job_idx + 1, len(shards)),
+			shard = shard,
+			date = date,
+			run_id = run_id,
+			num_of_jobs = len(shards)
+		)
+
+	return run_id
+
+def get_shards(date, num_of_shards):
+	"""
+		Distributes schedules across shards by asset, so that all the schedules of an asset are posted
+		by the same job and parallel jobs never compete for the same asset's records.
+
+		Each shard is returned as its index and the first and last schedules in it, which are all a job
+		needs to find its schedules again.
+	"""
+	return frappe.db.sql(
+		"""
+			SELECT
+				MOD(CRC32(depr_schedule.asset), %(num_of_shards)s) as shard_idx,
+				%(num_of_shards)s as num_of_shards,
+				MIN(schedule_row.parent) as first_schedule,
+				MAX(schedule_row.parent) as last_schedule
+			FROM `tabAsset Depreciation Schedule` schedule_row
+			INNER JOIN `tabDepreciation Schedule_` depr_schedule
+				ON depr_schedule.name = schedule_row.parent
+			WHERE
+				depr_schedule.status = 'Active'
+				and schedule_row.schedule_date <= %(date)s
+				and (schedule_row.depreciation_entry is null or schedule_row.depreciation_entry = '')
+			GROUP BY shard_idx
+			ORDER BY shard_idx
+		""",
+		{
+			"date": date,
+			"num_of_shards": num_of_shards
 		},
-		pluck = "name"
+		as_dict = 1
 	)
 
-	schedules_that_need_posting = frappe.get_all(
+def get_shard_condition(shard):
+	"""
+		Returns the conditions that limit a query joining `depr_schedule` to the schedules of `shard`.
+	"""
+	if not shard:
+		return ""
+
+	return """
+		and depr_schedule.name between %(first_schedule)s and %(last_schedule)s
+		and MOD(CRC32(depr_schedule.asset), %(num_of_shards)s) = %(shard_idx)s
+	"""
+
+def post_depreciation_entries_for_shard(shard, date, run_id, num_of_jobs):
+	shard = frappe._dict(shard)
+
+	try:
+		if is_bulk_posting_enabled():
+			from assets.asset.doctype.depreciation_schedule_.bulk_depreciation_posting import post_depreciation_entries_in_bulk
+
+			post_depreciation_entries_in_bulk(date, shard)
+		else:
+			for schedule in get_schedules_that_need_posting(date, shard):
+				# a retried job could be posting the same schedule, so wait for it and post only what is left
+				if lock_schedule_if_it_needs_posting(schedule, date):
+					post_depreciation_entries(schedule, date)
+
+				frappe.db.commit()
+	finally:
+		if mark_shard_as_posted(run_id, shard.shard_idx, num_of_jobs):
+			notify_accounts_managers_if_posting_failed()
+
+def lock_schedule_if_it_needs_posting(schedule, date):
+	frappe.db.sql("select name from `tabDepreciation Schedule_` where name=%s for update", schedule)
+
+	return frappe.db.exists(
 		"Asset Depreciation Schedule",
-		filters = {
-			"parent": ["in", active_schedules],
+		{
+			"parent": schedule,
 			"schedule_date": ["<=", date],
 			"depreciation_entry": None
-		},
-		pluck = "parent"
+		}
 	)
 
-	# to remove duplicates
-	schedules_that_need_posting = list(set(schedules_that_need_posting))
+def mark_shard_as_posted(run_id, shard_idx, num_of_jobs):
+	"""
+		Returns True only for the call that completes the run, even if shards finish at the same time or are retried.
+	"""
+	cache = frappe.cache()
+	posted_shards_key = "depreciation_posting_shards|" + run_id
+
+	cache.sadd(posted_shards_key, shard_idx)
+	cache.expire(cache.make_key(posted_shards_key), POSTING_RUN_EXPIRY)
+
+	if len(cache.smembers(posted_shards_key)) < num_of_jobs:
+		return False
+
+	if not cache.set(cache.make_key("depreciation_posting_notified|" + run_id), 1, nx=True, ex=POSTING_RUN_EXPIRY):
+		return False
+
+	cache.delete_value(posted_shards_key)
+	return True
+
+def get_schedules_that_need_posting(date, shard=None):
+	schedules_that_need_posting = []
+
+	for page in get_pages_of_schedules_that_need_posting(date, shard):
+		schedules_that_need_posting.extend(schedule.name for schedule in page)
 
 	return schedules_that_need_posting
 
+def get_pages_of_schedules_that_need_posting(date, shard=None, page_length=10000):
+	"""
+		Yields pages of [{"name": schedule, "asset": asset}, ...], paging on the schedule name. Each page reads
+		the (parent, schedule_date, depreciation_entry) index from the last schedule of the previous page until
+		it is full, so the rows of schedules already paged through are not read again.
+
+		If `shard` is given, only its schedules are returned.
+	"""
+	last_schedule = ""
+
+	while True:
+		page = frappe.db.sql(
+			"""
+				SELECT DISTINCT schedule_row.parent as name, depr_schedule.asset
+				FROM `tabAsset Depreciation Schedule` schedule_row
+				INNER JOIN `tabDepreciation Schedule_` depr_schedule
+					ON depr_schedule.name = schedule_row.parent
+				WHERE
+					depr_schedule.status = 'Active'
+					and schedule_row.schedule_date <= %(date)s
+					and (schedule_row.depreciation_entry is null or schedule_row.depreciation_entry = '')
+					and schedule_row.parent > %(last_schedule)s
+					{shard_condition}
+				ORDER BY schedule_row.parent
+				LIMIT %(page_length)s
+			""".format(shard_condition=get_shard_condition(shard)),
+			dict(
+				shard or {},
+				date = date,
+				last_schedule = last_schedule,
+				page_length = page_length
+			),
+			as_dict = 1
+		)
+
+		if not page:
+			break
+
+		yield page
+
+		if len(page) < page_length:
+			break
+
+		last_schedule = page[-1].name
+
 @frappe.whitelist()
 def post_depreciation_entries(schedule_name, date=None):
 	frappe.has_permission("Depreciation Entry", throw=True)
@@ -265,12 +435,12 @@ def get_accounts_managers():
 	)))
 
 def record_depreciation_posting(parent, depr_entry):
-	from assets.asset.doctype.asset_activity.asset_activity import create_asset_activity
+	from assets.asset.doctype.asset_activity.asset_activity import queue_asset_activity
 	from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_ import get_asset_and_serial_no
 
 	asset, serial_no = get_asset_and_serial_no(parent)
 
-	create_asset_activity(
+	queue_asset_activity(
 		asset = asset,
 		asset_serial_no = serial_no,
 		activity_type = "Depreciation",
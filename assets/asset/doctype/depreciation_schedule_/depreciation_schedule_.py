@@ -3,9 +3,12 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import add_months, date_diff, add_days, getdate
+from frappe.utils import flt, getdate
 from frappe import _
 
+from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_engine import get_depreciation_schedule
+from assets.controllers.cached_values import get_accounts_settings_value, get_depreciation_template_values
+
 
 class DepreciationSchedule_(Document):
 	def validate(self):
@@ -30,7 +33,7 @@ def create_depreciation_schedules(asset, date_of_sale=None):
 		create_a_single_depreciation_schedule(asset, None, purchase_value, date_of_sale)
 
 def get_enable_finance_books_value():
-	return frappe.db.get_single_value("Accounts Settings", "enable_finance_books")
+	return get_accounts_settings_value("enable_finance_books")
 
 def create_a_single_depreciation_schedule(asset, row=None, purchase_value=None, date_of_sale=None):
 	if not purchase_value:
@@ -51,21 +54,16 @@ def create_a_single_depreciation_schedule(asset, row=None, purchase_value=None,
 
 	set_depreciation_details_from_template(depr_schedule, asset, row)
 	make_depreciation_schedule(depr_schedule, asset, purchase_value, date_of_sale)
-	set_accumulated_depreciation(depr_schedule)
 
 	depr_schedule.save()
 
 def get_purchase_amount(asset):
+	from assets.controllers.base_asset import get_asset_row
+
 	if asset.doctype == "Asset_":
 		return asset.gross_purchase_amount
 	else:
-		purchase_value = frappe.get_value(
-			"Asset_",
-			asset.asset,
-			"gross_purchase_amount"
-		)
-
-		return purchase_value
+		return get_asset_row(asset.asset).gross_purchase_amount
 
 def set_depreciation_details_from_template(depr_schedule, asset, row):
 	template_values = fetch_template_values(asset, row)
@@ -82,12 +80,7 @@ def set_depreciation_details_from_template(depr_schedule, asset, row):
 def fetch_template_values(asset, row):
 	depreciation_template = get_depr_template(asset, row)
 
-	return frappe.get_value(
-		"Depreciation Template",
-		depreciation_template,
-		["depreciation_method", "frequency_of_depreciation", "asset_life", "asset_life_unit", "rate_of_depreciation"],
-		as_dict = 1
-	)
+	return get_depreciation_template_values(depreciation_template)
 
 def get_depr_template(asset, row):
 	if row:
@@ -96,16 +89,35 @@ def get_depr_template(asset, row):
 		return asset.depreciation_template
 
 def make_depreciation_schedule(depr_schedule, asset, purchase_value, date_of_sale):
-	depreciable_value = purchase_value - asset.salvage_value
 	frequency_of_depr = get_frequency_of_depreciation_in_months(depr_schedule.frequency_of_depreciation)
 
-	if depr_schedule.depreciation_method == "Straight Line":
-		make_depreciation_schedule_for_slm(depr_schedule, asset, frequency_of_depr,
-			depreciable_value, date_of_sale)
+	if depr_schedule.depreciation_method in ["Double Declining Balance", "Written Down Value"]:
+		set_rate_of_depreciation(depr_schedule)
+
+		beginning_book_value = get_beginning_book_value(depr_schedule.depreciation_method, purchase_value,
+			purchase_value - asset.salvage_value)
+		validate_beginning_book_value(beginning_book_value, asset.salvage_value)
+
+	schedule_dates, depr_amounts, accumulated_depr_amounts = get_depreciation_schedule(
+		depreciation_method = depr_schedule.depreciation_method,
+		purchase_value = purchase_value,
+		salvage_value = flt(asset.salvage_value),
+		available_for_use_date = asset.available_for_use_date,
+		depreciation_posting_start_date = asset.depreciation_posting_start_date,
+		asset_life_in_months = depr_schedule.asset_life_in_months,
+		frequency_of_depr = frequency_of_depr,
+		rate_of_depreciation = flt(depr_schedule.rate_of_depreciation),
+		opening_accumulated_depreciation = flt(asset.opening_accumulated_depreciation),
+		date_of_sale = date_of_sale
+	)
 
-	elif depr_schedule.depreciation_method in ["Double Declining Balance", "Written Down Value"]:
-		make_depreciation_schedule_for_ddb_and_wdv(depr_schedule, asset, frequency_of_depr,
-			purchase_value, depreciable_value, date_of_sale)
+	for schedule_date, depr_amount, accumulated_depr_amount in zip(schedule_dates.tolist(),
+		depr_amounts.tolist(), accumulated_depr_amounts.tolist()):
+		depr_schedule.append("depreciation_schedule", {
+			"schedule_date": schedule_date,
+			"depreciation_amount": depr_amount,
+			"accumulated_depreciation_amount": accumulated_depr_amount
+		})
 
 def get_frequency_of_depreciation_in_months(frequency_of_depreciation):
 	frequency_in_months = {
@@ -125,86 +137,6 @@ def get_frequency_of_depreciation_in_months(frequency_of_depreciation):
 
 	return frequency_in_months[frequency_of_depreciation]
 
-def make_depreciation_schedule_for_slm(depr_schedule, asset, frequency_of_depr, depreciable_value, date_of_sale):
-	depr_in_one_day = get_depreciation_in_one_day(asset.available_for_use_date, depr_schedule.asset_life_in_months, depreciable_value)
-
-	depr_start_date = get_depreciation_start_date(asset.available_for_use_date, asset.opening_accumulated_depreciation, depr_in_one_day)
-	depr_end_date = get_depreciation_end_date(asset.available_for_use_date, depr_schedule.asset_life_in_months, date_of_sale)
-
-	schedule_date = asset.depreciation_posting_start_date
-
-	while schedule_date < depr_end_date:
-		depr_amount = get_depr_amount_for_slm(schedule_date, depr_start_date, depr_in_one_day)
-		create_depreciation_entry(depr_schedule, schedule_date, depr_amount)
-
-		depr_start_date = add_days(schedule_date, 1)
-		schedule_date = add_months(schedule_date, frequency_of_depr)
-
-	# for the final row
-	depr_amount = get_depr_amount_for_slm(schedule_date, depr_start_date, depr_in_one_day)
-	create_depreciation_entry(depr_schedule, schedule_date, depr_amount)
-
-def make_depreciation_schedule_for_ddb_and_wdv(depr_schedule, asset, frequency_of_depr, purchase_value, depreciable_value, date_of_sale):
-	set_rate_of_depreciation(depr_schedule)
-
-	beginning_book_value = get_beginning_book_value(depr_schedule.depreciation_method, purchase_value, depreciable_value)
-	ending_book_value = beginning_book_value
-	validate_beginning_book_value(beginning_book_value, asset.salvage_value)
-
-	schedule_date = asset.depreciation_posting_start_date
-	final_schedule_date = get_final_schedule_date(depr_schedule.asset_life_in_months, asset.available_for_use_date, date_of_sale)
-
-	while beginning_book_value >= asset.salvage_value:
-		if schedule_date <= final_schedule_date:
-			# beginning book value for each depreciation is the ending book value of the previous one
-			beginning_book_value = ending_book_value
-			depr_amount = depr_schedule.rate_of_depreciation * beginning_book_value
-
-			create_depreciation_entry(depr_schedule, schedule_date, depr_amount)
-
-			ending_book_value = beginning_book_value - depr_amount
-
-			# for the next depreciation
-			schedule_date = add_months(schedule_date, frequency_of_depr)
-		else:
-			adjust_final_depreciation_amount(depr_schedule, ending_book_value, beginning_book_value, asset.salvage_value)
-			break
-
-def get_depreciation_start_date(available_for_use_date, opening_accumulated_depr, depr_in_one_day):
-	if not opening_accumulated_depr:
-		return available_for_use_date
-	else:
-		days_of_depr_booked = int(opening_accumulated_depr / depr_in_one_day)
-		return add_days(available_for_use_date, days_of_depr_booked)
-
-def get_depreciation_end_date(available_for_use_date, asset_life, date_of_sale):
-	if date_of_sale:
-		return date_of_sale
-
-	day_after_depr_end_date = add_months(available_for_use_date, asset_life)
-	depr_end_date = add_days(day_after_depr_end_date, -1)
-
-	return depr_end_date
-
-def get_depreciation_in_one_day(available_for_use_date, asset_life, depreciable_value):
-	depr_end_date = add_months(available_for_use_date, asset_life)
-	asset_life_in_days = date_diff(depr_end_date, available_for_use_date)
-
-	return depreciable_value / asset_life_in_days
-
-def get_depr_amount_for_slm(schedule_date, depr_start_date, depr_in_one_day):
-	depr_period = date_diff(schedule_date, depr_start_date) + 1
-	depr_amount = depr_in_one_day * depr_period
-
-	return depr_amount
-
-def create_depreciation_entry(depr_schedule, schedule_date, depr_amount):
-	if depr_amount > 0:
-		depr_schedule.append("depreciation_schedule", {
-			"schedule_date": schedule_date,
-			"depreciation_amount": depr_amount
-		})
-
 def set_rate_of_depreciation(depr_schedule):
 	if depr_schedule.depreciation_method == "Double Declining Balance":
 		depr_schedule.rate_of_depreciation = get_rate_of_depr_for_ddb(depr_schedule.asset_life_in_months)
@@ -227,23 +159,6 @@ def validate_beginning_book_value(beginning_book_value, salvage_value):
 	if beginning_book_value <= salvage_value:
 		frappe.throw(_("Salvage Value cannot be greater than or equal to Gross Purchase Amount."))
 
-def get_final_schedule_date(asset_life_in_months, available_for_use_date, date_of_sale):
-	depr_end_date = get_depreciation_end_date(available_for_use_date, asset_life_in_months, date_of_sale)
-	final_schedule_date = add_days(depr_end_date, 1)
-
-	return final_schedule_date
-
-def adjust_final_depreciation_amount(depr_schedule, ending_book_value, beginning_book_value, salvage_value):
-	if ending_book_value != salvage_value:
-		depr_schedule.depreciation_schedule[-1].depreciation_amount = beginning_book_value - salvage_value
-
-def set_accumulated_depreciation(depr_schedule):
-	accumulated_depr_amount = 0
-
-	for schedule in depr_schedule.depreciation_schedule:
-		accumulated_depr_amount += schedule.depreciation_amount
-		schedule.accumulated_depreciation_amount = accumulated_depr_amount
-
 def delete_existing_schedules(asset, finance_book=None):
 	asset, serial_no = get_asset_and_serial_no(asset)
 
@@ -272,4 +187,7 @@ def get_asset_and_serial_no(asset):
 	if asset.doctype == "Asset_":
 		return asset.name, ""
 	else:
-		return asset.asset, asset.serial_no
\ No newline at end of file
+		return asset.asset, asset.serial_no
+
+def on_doctype_update():
+	frappe.db.add_index("Depreciation Schedule_", ["status"])
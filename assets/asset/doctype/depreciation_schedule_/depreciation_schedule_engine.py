@@ -0,0 +1,150 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+"""
+	Computes depreciation schedules in one pass, without touching the database or documents.
+
+	Every function here returns (schedule_dates, depreciation_amounts, accumulated_depreciation_amounts)
+	as NumPy arrays, matching the rows the period-by-period loops used to append, except that the last
+	Straight Line period no longer runs past the end of the asset's life.
+"""
+
+import numpy as np
+from frappe.utils import getdate
+
+
+def get_depreciation_schedule(depreciation_method, purchase_value, salvage_value, available_for_use_date,
+	depreciation_posting_start_date, asset_life_in_months, frequency_of_depr, rate_of_depreciation=None,
+	opening_accumulated_depreciation=0, date_of_sale=None):
+	depreciable_value = purchase_value - salvage_value
+
+	if depreciation_method == "Straight Line":
+		schedule_dates, depr_amounts = get_depreciation_schedule_for_slm(
+			available_for_use_date, depreciation_posting_start_date, asset_life_in_months,
+			frequency_of_depr, depreciable_value, opening_accumulated_depreciation, date_of_sale)
+
+	elif depreciation_method in ["Double Declining Balance", "Written Down Value"]:
+		beginning_book_value = purchase_value if depreciation_method == "Double Declining Balance" else depreciable_value
+
+		schedule_dates, depr_amounts = get_depreciation_schedule_for_ddb_and_wdv(
+			available_for_use_date, depreciation_posting_start_date, asset_life_in_months,
+			frequency_of_depr, rate_of_depreciation, beginning_book_value, salvage_value, date_of_sale)
+
+	else:
+		schedule_dates, depr_amounts = np.array([], dtype="datetime64[D]"), np.array([])
+
+	# rows with no depreciation are not added to the schedule
+	has_depreciation = depr_amounts > 0
+	schedule_dates, depr_amounts = schedule_dates[has_depreciation], depr_amounts[has_depreciation]
+
+	return schedule_dates, depr_amounts, np.cumsum(depr_amounts)
+
+def get_depreciation_schedule_for_slm(available_for_use_date, depreciation_posting_start_date, asset_life_in_months,
+	frequency_of_depr, depreciable_value, opening_accumulated_depreciation, date_of_sale):
+	available_for_use_date = to_datetime64(available_for_use_date)
+
+	depr_in_one_day = get_depreciation_in_one_day(available_for_use_date, asset_life_in_months, depreciable_value)
+	depr_start_date = get_depreciation_start_date(available_for_use_date, opening_accumulated_depreciation, depr_in_one_day)
+	depr_end_date = get_depreciation_end_date(available_for_use_date, asset_life_in_months, date_of_sale)
+
+	# every date before the end date gets a row, and so does the first one on or after it
+	schedule_dates = get_schedule_dates(depreciation_posting_start_date, depr_end_date, frequency_of_depr)
+
+	# each period starts the day after the previous schedule date, and none is depreciated past the end date
+	period_start_dates = np.concatenate(([depr_start_date], schedule_dates[:-1] + np.timedelta64(1, "D")))
+	period_end_dates = np.minimum(schedule_dates, depr_end_date)
+	days_in_period = np.maximum((period_end_dates - period_start_dates).astype(int) + 1, 0)
+
+	return schedule_dates, depr_in_one_day * days_in_period
+
+def get_depreciation_schedule_for_ddb_and_wdv(available_for_use_date, depreciation_posting_start_date,
+	asset_life_in_months, frequency_of_depr, rate_of_depreciation, beginning_book_value, salvage_value, date_of_sale):
+	available_for_use_date = to_datetime64(available_for_use_date)
+
+	final_schedule_date = get_depreciation_end_date(available_for_use_date, asset_life_in_months, date_of_sale) \
+		+ np.timedelta64(1, "D")
+	schedule_dates = get_schedule_dates(depreciation_posting_start_date, final_schedule_date, frequency_of_depr, inclusive=True)
+
+	# book value at the beginning of each period, and the one after the last period
+	book_values = beginning_book_value * np.power(1 - rate_of_depreciation, np.arange(len(schedule_dates) + 1))
+
+	# a period is depreciated only if the previous period began at or above the salvage value...
+	previous_book_values = np.concatenate(([beginning_book_value], book_values[:-2]))
+	fell_below_salvage_value = previous_book_values < salvage_value
+	# ...and it is not after the final schedule date, in which case the last row absorbs what is left
+	is_after_final_date = schedule_dates > final_schedule_date
+
+	stop = np.flatnonzero(fell_below_salvage_value | is_after_final_date)
+	num_of_rows = stop[0] if len(stop) else len(schedule_dates)
+
+	schedule_dates = schedule_dates[:num_of_rows]
+	depr_amounts = rate_of_depreciation * book_values[:num_of_rows]
+
+	if len(stop) and num_of_rows and not fell_below_salvage_value[num_of_rows] \
+		and book_values[num_of_rows] != salvage_value:
+		depr_amounts[-1] = book_values[num_of_rows - 1] - salvage_value
+
+	return schedule_dates, depr_amounts
+
+def get_schedule_dates(start_date, end_date, frequency_of_depr, inclusive=False):
+	"""
+		Returns start_date, start_date + frequency, ... up to and including the first date on (or, if
+		`inclusive`, after) `end_date`.
+
+		Dates are advanced one period at a time from the previous date, so a day clamped to a short month
+		stays clamped (Jan 31 -> Feb 28 -> Mar 28), just like repeatedly calling add_months.
+	"""
+	start_date = to_datetime64(start_date)
+	end_date = to_datetime64(end_date)
+
+	start_month = start_date.astype("datetime64[M]")
+	months_to_end = (end_date.astype("datetime64[M]") - start_month).astype(int)
+	num_of_dates = max(months_to_end // frequency_of_depr + 2 + int(inclusive), 1)
+
+	months = start_month + np.arange(num_of_dates) * frequency_of_depr
+	days_in_month = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(int)
+
+	day_of_month = (start_date - start_month.astype("datetime64[D]")).astype(int)
+	days_in_month[0] = day_of_month + 1
+	day_of_month = np.minimum(day_of_month, np.minimum.accumulate(days_in_month) - 1)
+
+	schedule_dates = months.astype("datetime64[D]") + day_of_month
+
+	if inclusive:
+		return schedule_dates[:np.searchsorted(schedule_dates, end_date, side="right") + 1]
+
+	return schedule_dates[:np.searchsorted(schedule_dates, end_date, side="left") + 1]
+
+def get_depreciation_in_one_day(available_for_use_date, asset_life_in_months, depreciable_value):
+	depr_end_date = add_months(available_for_use_date, asset_life_in_months)
+	asset_life_in_days = (depr_end_date - available_for_use_date).astype(int)
+
+	return depreciable_value / asset_life_in_days
+
+def get_depreciation_start_date(available_for_use_date, opening_accumulated_depr, depr_in_one_day):
+	if not opening_accumulated_depr:
+		return available_for_use_date
+
+	days_of_depr_booked = int(opening_accumulated_depr / depr_in_one_day)
+	return available_for_use_date + np.timedelta64(days_of_depr_booked, "D")
+
+def get_depreciation_end_date(available_for_use_date, asset_life_in_months, date_of_sale):
+	if date_of_sale:
+		return to_datetime64(date_of_sale)
+
+	return add_months(available_for_use_date, asset_life_in_months) - np.timedelta64(1, "D")
+
+def add_months(date, months):
+	month = date.astype("datetime64[M]")
+	target_month = month + months
+
+	day_of_month = (date - month.astype("datetime64[D]")).astype(int)
+	days_in_target_month = ((target_month + 1).astype("datetime64[D]") - target_month.astype("datetime64[D]")).astype(int)
+
+	return target_month.astype("datetime64[D]") + min(day_of_month, days_in_target_month - 1)
+
+def to_datetime64(date):
+	if isinstance(date, np.datetime64):
+		return date.astype("datetime64[D]")
+
+	return np.datetime64(getdate(date), "D")
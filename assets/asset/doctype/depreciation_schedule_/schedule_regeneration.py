@@ -0,0 +1,236 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate
+
+from assets.controllers.bulk_operations import (
+	bulk_insert_child_rows,
+	bulk_insert_docs,
+	delete_docs_with_children,
+	reserve_names,
+)
+from assets.controllers.cached_values import get_depreciation_template_values
+from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_ import (
+	get_enable_finance_books_value,
+	get_frequency_of_depreciation_in_months,
+	get_rate_of_depr_for_ddb,
+)
+from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_engine import get_depreciation_schedule
+
+# number of assets and serial nos whose schedules are replaced together
+BATCH_SIZE = 1000
+
+
+def regenerate_schedules_for_template(depreciation_template):
+	"""
+		Replaces the Draft Depreciation Schedules of every Asset and Asset Serial No that uses
+		`depreciation_template`, recomputing them from the template's current values.
+	"""
+	template_values = get_template_values(depreciation_template)
+	targets = get_assets_using_template(depreciation_template)
+	failed = []
+
+	for i in range(0, len(targets), BATCH_SIZE):
+		failed.extend(regenerate_schedules(targets[i : i + BATCH_SIZE], template_values))
+		frappe.db.commit()
+
+		num_of_targets_processed = min(i + BATCH_SIZE, len(targets))
+		frappe.publish_progress(
+			num_of_targets_processed * 100 / len(targets),
+			title = _("Regenerating Depreciation Schedules"),
+			doctype = "Depreciation Template",
+			docname = depreciation_template,
+			description = _("{0} of {1} assets processed").format(num_of_targets_processed, len(targets))
+		)
+
+	if failed:
+		frappe.log_error(
+			title = _("Depreciation Schedules not regenerated for {0}").format(depreciation_template),
+			message = _("Salvage Value is greater than or equal to the depreciable value of: {0}").format(", ".join(failed))
+		)
+
+	return failed
+
+def get_template_values(depreciation_template):
+	template_values = get_depreciation_template_values(depreciation_template)
+
+	if template_values.asset_life_unit == "Months":
+		template_values.asset_life_in_months = template_values.asset_life
+	else:
+		template_values.asset_life_in_months = template_values.asset_life * 12
+
+	if template_values.depreciation_method == "Double Declining Balance":
+		template_values.rate = get_rate_of_depr_for_ddb(template_values.asset_life_in_months)
+	else:
+		template_values.rate = flt(template_values.rate_of_depreciation) / 100
+
+	template_values.frequency_in_months = get_frequency_of_depreciation_in_months(template_values.frequency_of_depreciation)
+
+	return template_values
+
+def get_assets_using_template(depreciation_template):
+	"""
+		Returns the Draft Assets and Asset Serial Nos (with their finance books, if enabled) whose
+		schedules are generated from `depreciation_template`, along with the values needed to do so.
+	"""
+	if get_enable_finance_books_value():
+		# one schedule per finance book that uses the template
+		finance_book_join = """INNER JOIN `tabAsset Finance Book_` fb
+			ON fb.parent = doc.name and fb.parenttype = %(doctype)s and fb.depreciation_template = %(template)s"""
+		finance_book_column = "fb.finance_book"
+		template_condition = "1=1"
+	else:
+		finance_book_join = ""
+		finance_book_column = "null"
+		template_condition = "doc.depreciation_template = %(template)s"
+
+	conditions = {
+		"finance_book_join": finance_book_join,
+		"finance_book_column": finance_book_column,
+		"template_condition": template_condition
+	}
+
+	targets = frappe.db.sql(
+		"""
+			SELECT
+				'Asset_' as doctype, doc.name, doc.name as asset, '' as serial_no, {finance_book_column} as finance_book,
+				doc.gross_purchase_amount, doc.salvage_value, doc.available_for_use_date,
+				doc.depreciation_posting_start_date, doc.opening_accumulated_depreciation
+			FROM `tabAsset_` doc
+			{finance_book_join}
+			WHERE
+				doc.docstatus = 0
+				and doc.calculate_depreciation = 1
+				and doc.is_serialized_asset = 0
+				and {template_condition}
+		""".format(**conditions),
+		{"doctype": "Asset_", "template": depreciation_template},
+		as_dict = 1
+	)
+
+	targets += frappe.db.sql(
+		"""
+			SELECT
+				'Asset Serial No' as doctype, doc.name, doc.asset, doc.name as serial_no,
+				{finance_book_column} as finance_book, asset.gross_purchase_amount, doc.salvage_value,
+				doc.available_for_use_date, doc.depreciation_posting_start_date, doc.opening_accumulated_depreciation
+			FROM `tabAsset Serial No` doc
+			INNER JOIN `tabAsset_` asset ON asset.name = doc.asset
+			{finance_book_join}
+			WHERE
+				doc.docstatus = 0
+				and asset.calculate_depreciation = 1
+				and {template_condition}
+		""".format(**conditions),
+		{"doctype": "Asset Serial No", "template": depreciation_template},
+		as_dict = 1
+	)
+
+	# schedules can only be made once the depreciation dates have been entered
+	return [
+		target for target in targets
+		if target.available_for_use_date and target.depreciation_posting_start_date
+	]
+
+def regenerate_schedules(targets, template_values):
+	new_schedules, new_rows, failed = [], [], []
+
+	for target in targets:
+		if not has_valid_beginning_book_value(target, template_values):
+			failed.append(target.name)
+			continue
+
+		schedule_dates, depr_amounts, accumulated_depr_amounts = get_depreciation_schedule(
+			depreciation_method = template_values.depreciation_method,
+			purchase_value = flt(target.gross_purchase_amount),
+			salvage_value = flt(target.salvage_value),
+			available_for_use_date = target.available_for_use_date,
+			depreciation_posting_start_date = target.depreciation_posting_start_date,
+			asset_life_in_months = template_values.asset_life_in_months,
+			frequency_of_depr = template_values.frequency_in_months,
+			rate_of_depreciation = template_values.rate,
+			opening_accumulated_depreciation = flt(target.opening_accumulated_depreciation)
+		)
+
+		new_schedules.append(target)
+		target.rows = list(zip(schedule_dates.tolist(), depr_amounts.tolist(), accumulated_depr_amounts.tolist()))
+
+	if not new_schedules:
+		return failed
+
+	delete_draft_schedules(new_schedules)
+
+	naming_series = frappe.get_meta("Depreciation Schedule_").get_field("naming_series").options.split("\n")[0]
+	names = reserve_names(naming_series, len(new_schedules))
+
+	for target, name in zip(new_schedules, names):
+		target.schedule_values = frappe._dict({
+			"name": name,
+			"naming_series": naming_series,
+			"asset": target.asset,
+			"serial_no": target.serial_no or None,
+			"finance_book": target.finance_book,
+			"creation_date": getdate(),
+			"status": "Draft",
+			"depreciation_method": template_values.depreciation_method,
+			"frequency_of_depreciation": template_values.frequency_of_depreciation,
+			"asset_life_in_months": template_values.asset_life_in_months,
+			"rate_of_depreciation": template_values.rate
+		})
+
+		for idx, (schedule_date, depr_amount, accumulated_depr_amount) in enumerate(target.rows, 1):
+			new_rows.append(frappe._dict({
+				"parent": name,
+				"idx": idx,
+				"schedule_date": schedule_date,
+				"depreciation_amount": depr_amount,
+				"accumulated_depreciation_amount": accumulated_depr_amount
+			}))
+
+	bulk_insert_docs(
+		"Depreciation Schedule_",
+		["naming_series", "asset", "serial_no", "finance_book", "creation_date", "status", "depreciation_method",
+			"frequency_of_depreciation", "asset_life_in_months", "rate_of_depreciation"],
+		[target.schedule_values for target in new_schedules]
+	)
+	bulk_insert_child_rows(
+		"Asset Depreciation Schedule",
+		"Depreciation Schedule_",
+		"depreciation_schedule",
+		["schedule_date", "depreciation_amount", "accumulated_depreciation_amount"],
+		new_rows
+	)
+
+	return failed
+
+def has_valid_beginning_book_value(target, template_values):
+	if template_values.depreciation_method == "Straight Line":
+		return True
+
+	beginning_book_value = flt(target.gross_purchase_amount)
+	if template_values.depreciation_method == "Written Down Value":
+		beginning_book_value -= flt(target.salvage_value)
+
+	return beginning_book_value > flt(target.salvage_value)
+
+def delete_draft_schedules(targets):
+	keys = {(target.asset, target.serial_no or "", target.finance_book or "") for target in targets}
+
+	draft_schedules = frappe.get_all(
+		"Depreciation Schedule_",
+		filters = {
+			"asset": ["in", list({target.asset for target in targets})],
+			"status": "Draft"
+		},
+		fields = ["name", "asset", "serial_no", "finance_book"]
+	)
+
+	delete_docs_with_children(
+		"Depreciation Schedule_",
+		[
+			schedule.name for schedule in draft_schedules
+			if (schedule.asset, schedule.serial_no or "", schedule.finance_book or "") in keys
+		]
+	)
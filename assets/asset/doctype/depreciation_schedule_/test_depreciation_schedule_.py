@@ -4,5 +4,50 @@
 # import frappe
 import unittest
 
+from frappe.utils import getdate
+
+from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_engine import get_depreciation_schedule
+
 class TestDepreciationSchedule_(unittest.TestCase):
-	pass
+	def test_schedule_for_slm(self):
+		schedule_dates, depr_amounts, accumulated_depr_amounts = get_depreciation_schedule(
+			depreciation_method = "Straight Line",
+			purchase_value = 36500,
+			salvage_value = 0,
+			available_for_use_date = "2021-01-01",
+			depreciation_posting_start_date = "2021-06-30",
+			asset_life_in_months = 12,
+			frequency_of_depr = 6
+		)
+
+		self.assertEqual(schedule_dates.tolist(), [getdate("2021-06-30"), getdate("2021-12-30"), getdate("2022-06-30")])
+		self.assertEqual([round(amount, 2) for amount in depr_amounts], [18100, 18300, 100])
+		self.assertLessEqual(round(accumulated_depr_amounts[-1], 2), 36500)
+
+	def test_schedule_dates_stay_clamped_after_short_months(self):
+		schedule_dates, _, _ = get_depreciation_schedule(
+			depreciation_method = "Straight Line",
+			purchase_value = 1200,
+			salvage_value = 0,
+			available_for_use_date = "2021-01-01",
+			depreciation_posting_start_date = "2021-01-31",
+			asset_life_in_months = 4,
+			frequency_of_depr = 1
+		)
+
+		self.assertEqual(schedule_dates.tolist()[:3], [getdate("2021-01-31"), getdate("2021-02-28"), getdate("2021-03-28")])
+
+	def test_schedule_for_wdv_ends_at_salvage_value(self):
+		_, depr_amounts, accumulated_depr_amounts = get_depreciation_schedule(
+			depreciation_method = "Written Down Value",
+			purchase_value = 100000,
+			salvage_value = 10000,
+			available_for_use_date = "2021-01-01",
+			depreciation_posting_start_date = "2021-12-31",
+			asset_life_in_months = 36,
+			frequency_of_depr = 12,
+			rate_of_depreciation = 0.4
+		)
+
+		self.assertEqual([round(amount, 2) for amount in depr_amounts], [36000, 21600, 22400])
+		self.assertEqual(round(accumulated_depr_amounts[-1], 2), 80000)
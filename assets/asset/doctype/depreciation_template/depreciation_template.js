@@ -2,7 +2,18 @@
 // For license information, please see license.txt
 
 frappe.ui.form.on('Depreciation Template', {
-	// refresh: function(frm) {
-
-	// }
+	refresh: function(frm) {
+		if (!frm.is_new()) {
+			frm.add_custom_button(__("Regenerate Depreciation Schedules"), function() {
+				frappe.confirm(__("Replace the Draft Depreciation Schedules of all Assets using this template?"), () => {
+					frappe.call({
+						method: "assets.asset.doctype.depreciation_template.depreciation_template.regenerate_depreciation_schedules",
+						args: {
+							"depreciation_template": frm.doc.name
+						}
+					});
+				});
+			});
+		}
+	}
 });
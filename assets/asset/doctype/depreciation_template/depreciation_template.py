@@ -1,8 +1,24 @@
 # Copyright (c) 2021, Ganga Manoj and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
+from frappe import _
 from frappe.model.document import Document
 
 class DepreciationTemplate(Document):
 	pass
+
+@frappe.whitelist()
+def regenerate_depreciation_schedules(depreciation_template):
+	frappe.has_permission("Depreciation Schedule_", "write", throw=True)
+
+	frappe.enqueue(
+		"assets.asset.doctype.depreciation_schedule_.schedule_regeneration.regenerate_schedules_for_template",
+		queue = "long",
+		timeout = 3600,
+		job_name = "Regenerate Depreciation Schedules: {0}".format(depreciation_template),
+		depreciation_template = depreciation_template
+	)
+
+	frappe.msgprint(_("Depreciation Schedules using {0} are being regenerated in the background.")
+		.format(frappe.bold(depreciation_template)), alert=True)
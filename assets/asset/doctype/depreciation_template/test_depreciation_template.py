@@ -1,8 +1,20 @@
 # Copyright (c) 2021, Ganga Manoj and Contributors
 # See license.txt
 
-# import frappe
 import unittest
 
+import frappe
+
+from assets.asset.doctype.asset_.test_asset_ import create_depreciation_template
+from assets.controllers.cached_values import get_depreciation_template_values
+
 class TestDepreciationTemplate(unittest.TestCase):
-	pass
+	def test_cached_values_are_cleared_when_template_is_updated(self):
+		template = create_depreciation_template(template_name = "Test Cached Depreciation Template", asset_life = 5)
+		self.assertEqual(get_depreciation_template_values(template).asset_life, 5)
+
+		template_doc = frappe.get_doc("Depreciation Template", template)
+		template_doc.asset_life = 3
+		template_doc.save()
+
+		self.assertEqual(get_depreciation_template_values(template).asset_life, 3)
@@ -3,120 +3,147 @@
 
 import json
 import math
+from itertools import chain
+
+import numpy as np
 
 import frappe
-from frappe.utils import flt
+from frappe.utils import cint, flt
 from frappe.utils.nestedset import NestedSet, update_nsm
 
+from assets.asset.doctype.location_bounding_box.location_bounding_box import delete_bounding_boxes, get_bounds
+from assets.asset.doctype.location_feature_reference.location_feature_reference import (
+	delete_feature_references,
+	get_descendant_locations,
+	get_descendants_area,
+	get_referencing_ancestors,
+	get_subtree_references,
+	set_feature_references,
+	update_location_totals,
+)
+
 EARTH_RADIUS = 6378137
 
+# rollups are cleared when assets are moved, and expire to pick up changes in asset values
+LOCATION_ROLLUP_CACHE_EXPIRY = 600
+
+# the submitted assets and serial nos, with the location each of them is at
+POSITIONED_ASSETS_QUERY = """
+	SELECT location, num_of_assets, 0 as is_serial_no, asset_value
+	FROM `tabAsset_`
+	WHERE docstatus = 1 and is_serialized_asset = 0
+	UNION ALL
+	SELECT location, 1 as num_of_assets, 1 as is_serial_no, asset_value
+	FROM `tabAsset Serial No`
+	WHERE docstatus = 1
+"""
+
 
 class Location_(NestedSet):
 	nsm_parent_field = 'parent_location'
 
+	def onload(self):
+		descendant_features = get_descendant_features(self.name)
+
+		# the map shows the features of the descendants along with the location's own
+		if descendant_features:
+			self.location = set_features(self.location, self.get_location_features() + descendant_features)
+
 	def validate(self):
+		self.remove_descendant_features()
 		self.calculate_location_area()
 
-		if not self.is_new() and self.get('parent_location'):
-			self.update_ancestor_location_features()
-
 	def on_update(self):
 		# super(Location, self).on_update()
 		NestedSet.on_update(self)
+		self.update_feature_references()
 
 	def on_trash(self):
 		NestedSet.validate_if_child_exists(self)
+		ancestors = get_referencing_ancestors(self.name)
 		update_nsm(self)
-		self.remove_ancestor_location_features()
+		delete_feature_references([self.name])
+		delete_bounding_boxes([self.name])
+		update_location_totals([ancestor for ancestor in ancestors if ancestor != self.name])
 		# super(Location, self).on_update()
 
+	def remove_descendant_features(self):
+		# the features of descendants are only stored with the descendants themselves
+		if self.location:
+			self.location = set_features(self.location, self.get_location_features())
+
 	def calculate_location_area(self):
-		features = self.get_location_features()
-		new_area = compute_area(features)
+		self.area = compute_area(self.get_location_features())
 
-		self.area_difference = new_area - flt(self.area)
-		self.area = new_area
+		if not self.is_new():
+			self.area += get_descendants_area(self.name)
 
 	def get_location_features(self):
-		if not self.location:
-			return []
-
-		features = json.loads(self.location).get('features')
+		return get_own_features(self.location)
 
-		if not isinstance(features, list):
-			features = json.loads(features)
+	def update_feature_references(self):
+		"""
+			Updates the rows that reference this location's own features, and the areas and bounding boxes of the
+			locations they count towards. If the location has moved, the rows of its descendants move along.
+		"""
+		old_ancestors = set(get_referencing_ancestors(self.name))
+		new_ancestors = set(self.get_ancestors()) | {self.name}
 
-		return features
+		references = [get_feature_reference(self, self.get_location_features())]
 
-	def set_location_features(self, features):
-		if not self.location:
-			self.location = '{"type":"FeatureCollection","features":[]}'
+		if old_ancestors and old_ancestors != new_ancestors:
+			references.extend(
+				reference for reference in get_subtree_references(self.name) if reference.child != self.name
+			)
 
-		location = json.loads(self.location)
-		location['features'] = features
+		set_feature_references(references)
+		update_location_totals(old_ancestors | new_ancestors)
 
-		self.db_set('location', json.dumps(location), commit=True)
 
-	def update_ancestor_location_features(self):
-		self_features = set(self.add_child_property())
-
-		for ancestor in self.get_ancestors():
-			ancestor_doc = frappe.get_doc('Location', ancestor)
-			child_features, ancestor_features = ancestor_doc.feature_seperator(child_feature=self.name)
-
-			ancestor_features = list(set(ancestor_features))
-			child_features = set(child_features)
-
-			if self_features != child_features:
-				features_to_be_appended = self_features - child_features
-				features_to_be_discarded = child_features - self_features
-
-				for feature in features_to_be_discarded:
-					child_features.discard(feature)
-
-				for feature in features_to_be_appended:
-					child_features.add(feature)
-
-			ancestor_features.extend(list(child_features))
+def get_feature_reference(location, features):
+	"""
+		Returns the area and bounds of `features`, the own features of `location`.
+	"""
+	reference = frappe._dict({'child': location.name, 'area': compute_area(features)})
+	reference.update(get_bounds(features, location.latitude, location.longitude) or {})
 
-			for index, feature in enumerate(ancestor_features):
-				ancestor_features[index] = json.loads(feature)
+	return reference
 
-			ancestor_doc.set_location_features(features=ancestor_features)
-			ancestor_doc.db_set('area', ancestor_doc.area + self.area_difference, commit=True)
+def get_descendant_features(location):
+	features = []
 
-	def remove_ancestor_location_features(self):
-		for ancestor in self.get_ancestors():
-			ancestor_doc = frappe.get_doc('Location', ancestor)
-			child_features, ancestor_features = ancestor_doc.feature_seperator(child_feature=self.name)
+	for descendant in get_descendant_locations(location):
+		for feature in get_own_features(descendant.location):
+			feature.setdefault('properties', {}).update({'child_feature': True, 'feature_of': descendant.location_name})
+			features.append(feature)
 
-			for index, feature in enumerate(ancestor_features):
-				ancestor_features[index] = json.loads(feature)
+	return features
 
-			ancestor_doc.set_location_features(features=ancestor_features)
-			ancestor_doc.db_set('area', ancestor_doc.area - self.area, commit=True)
+def get_own_features(location):
+	"""
+		Returns the features of `location`, leaving out any that were copied from its descendants.
+	"""
+	return [
+		feature for feature in get_features(location)
+		if not (feature.get('properties') or {}).get('child_feature')
+	]
 
-	def add_child_property(self):
-		features = self.get_location_features()
-		filter_features = [feature for feature in features if not feature.get('properties').get('child_feature')]
+def get_features(location):
+	if not location:
+		return []
 
-		for index, feature in enumerate(filter_features):
-			feature['properties'].update({'child_feature': True, 'feature_of': self.location_name})
-			filter_features[index] = json.dumps(filter_features[index])
+	features = json.loads(location).get('features')
 
-		return filter_features
+	if not isinstance(features, list):
+		features = json.loads(features)
 
-	def feature_seperator(self, child_feature=None):
-		child_features, non_child_features = [], []
-		features = self.get_location_features()
+	return features
 
-		for feature in features:
-			if feature.get('properties').get('feature_of') == child_feature:
-				child_features.extend([json.dumps(feature)])
-			else:
-				non_child_features.extend([json.dumps(feature)])
+def set_features(location, features):
+	location = json.loads(location or '{"type":"FeatureCollection","features":[]}')
+	location['features'] = features
 
-		return child_features, non_child_features
+	return json.dumps(location)
 
 
 def compute_area(features):
@@ -158,32 +185,34 @@ def _polygon_area(coords):
 
 
 def _ring_area(coords):
-	area = 0.0
-	coords_length = len(coords)
-
-	if coords_length > 2:
-		for i in range(coords_length):
-			if i == coords_length - 2:  # i = N-2
-				lower_index = coords_length - 2
-				middle_index = coords_length - 1
-				upper_index = 0
-			elif i == coords_length - 1:  # i = N-1
-				lower_index = coords_length - 1
-				middle_index = 0
-				upper_index = 1
-			else:  # i = 0 to N-3
-				lower_index = i
-				middle_index = i + 1
-				upper_index = i + 2
-
-			p1 = coords[lower_index]
-			p2 = coords[middle_index]
-			p3 = coords[upper_index]
-			area += (math.radians(p3[0]) - math.radians(p1[0])) * math.sin(math.radians(p2[1]))
-
-		area = area * EARTH_RADIUS * EARTH_RADIUS / 2
+	"""
+	Sums (lon[i+2] - lon[i]) * sin(lat[i+1]) over every vertex of the ring,
+	wrapping around its end, as array operations.
+	"""
+	if len(coords) <= 2:
+		return 0.0
 
-	return area
+	lon, lat = np.radians(get_coordinates(coords))
+
+	area = np.sum((np.roll(lon, -2) - lon) * np.sin(np.roll(lat, -1)))
+
+	return float(area * EARTH_RADIUS * EARTH_RADIUS / 2)
+
+
+def get_coordinates(coords):
+	"""
+	Returns the longitudes and latitudes (in degrees) of a list of positions as arrays.
+	"""
+	# flattening the positions is much faster than converting the nested lists
+	flat_coords = np.fromiter(chain.from_iterable(coords), dtype=float)
+
+	if len(flat_coords) == 2 * len(coords):
+		flat_coords = flat_coords.reshape(-1, 2)
+	else:
+		# some positions have an altitude
+		flat_coords = np.array([position[:2] for position in coords], dtype=float)
+
+	return flat_coords[:, 0], flat_coords[:, 1]
 
 
 @frappe.whitelist()
@@ -191,18 +220,127 @@ def get_children(doctype, parent=None, location=None, is_root=False):
 	if parent is None or parent == "All Locations":
 		parent = ""
 
-	return frappe.db.sql("""
+	parent_field = get_parent_field(doctype)
+
+	# null and "" are compared separately, so that the index on the parent field can be used
+	children = frappe.db.sql("""
 		select
 			name as value,
 			is_group as expandable
 		from
 			`tab{doctype}` comp
 		where
-			ifnull(parent_location, "")={parent}
+			{condition}
 		""".format(
 			doctype=doctype,
-			parent=frappe.db.escape(parent)
-		), as_dict=1)
+			condition="`{0}` = %(parent)s".format(parent_field) if parent
+				else "(`{0}` is null or `{0}` = '')".format(parent_field)
+		), {"parent": parent}, as_dict=1)
+
+	# the number and value of the assets at each location are only shown to those who can read assets
+	if frappe.has_permission("Asset_"):
+		rollups = get_location_rollups([child.value for child in children])
+
+		for child in children:
+			child.update(rollups.get(child.value, {}))
+
+	return children
+
+@frappe.whitelist()
+def get_location_tree(doctype="Location_", parent=None, levels=2):
+	"""
+		Returns the nodes up to `levels` levels below `parent` (every level if it is 0), in tree order,
+		each with the number and value of the assets and serial nos in its subtree if the user can read assets.
+		Uses one query for the nodes and one for the assets, however many nodes there are.
+	"""
+	frappe.has_permission(doctype, throw=True)
+
+	if parent == "All Locations":
+		parent = None
+
+	levels = cint(levels)
+	parent_field = get_parent_field(doctype)
+	condition, values = "1=1", {}
+
+	if parent:
+		lft, rgt = frappe.db.get_value(doctype, parent, ["lft", "rgt"])
+		condition, values = "lft > %(lft)s and rgt < %(rgt)s", {"lft": lft, "rgt": rgt}
+
+	nodes = frappe.db.sql("""
+		select
+			name as value,
+			`{parent_field}` as parent,
+			is_group as expandable,
+			lft,
+			rgt
+		from
+			`tab{doctype}`
+		where
+			{condition}
+		order by lft
+		""".format(doctype=doctype, parent_field=parent_field, condition=condition), values, as_dict=1)
+
+	if frappe.has_permission("Asset_"):
+		set_subtree_totals(nodes, get_asset_totals_by_location([node.value for node in nodes]))
+
+	# the nodes that are still open on the stack are the ancestors of the current one
+	tree, ancestors = [], []
+
+	for node in nodes:
+		while ancestors and ancestors[-1].rgt < node.lft:
+			ancestors.pop()
+
+		if not levels or len(ancestors) < levels:
+			tree.append(node)
+
+		ancestors.append(node)
+
+	return tree
+
+def set_subtree_totals(nodes, totals_by_location):
+	"""
+		Adds the totals of every node's descendants to its own, going through the nodes (ordered by lft) once.
+	"""
+	ancestors = []
+
+	for node in nodes + [None]:
+		while ancestors and (node is None or ancestors[-1].rgt < node.lft):
+			completed_node = ancestors.pop()
+
+			if ancestors:
+				for field in ("num_of_assets", "num_of_serial_nos", "asset_value"):
+					ancestors[-1][field] += completed_node[field]
+
+		if node is not None:
+			totals = totals_by_location.get(node.value, {})
+			node.num_of_assets = cint(totals.get("num_of_assets"))
+			node.num_of_serial_nos = cint(totals.get("num_of_serial_nos"))
+			node.asset_value = flt(totals.get("asset_value"))
+			ancestors.append(node)
+
+def get_asset_totals_by_location(locations):
+	if not locations:
+		return {}
+
+	totals = frappe.db.sql(
+		"""
+			SELECT
+				location,
+				sum(num_of_assets) as num_of_assets,
+				sum(is_serial_no) as num_of_serial_nos,
+				sum(asset_value) as asset_value
+			FROM ({0}) positioned
+			WHERE location in %(locations)s
+			GROUP BY location
+		""".format(POSITIONED_ASSETS_QUERY),
+		{"locations": locations},
+		as_dict = 1
+	)
+
+	return {total.location: total for total in totals}
+
+def get_parent_field(doctype):
+	return frappe.get_meta(doctype).get("nsm_parent_field") or "parent_location"
 
 @frappe.whitelist()
 def add_node():
@@ -216,5 +354,101 @@ def add_node():
 	frappe.get_doc(args).insert()
 
 
+@frappe.whitelist()
+def get_location_rollup(location):
+	"""
+		Returns the number and total value of the assets and serial nos at `location` or any of its descendants.
+	"""
+	frappe.has_permission("Location_", doc=location, throw=True)
+	frappe.has_permission("Asset_", throw=True)
+
+	return get_location_rollups([location]).get(location)
+
+def get_location_rollups(locations):
+	"""
+		Returns the rollups of `locations`, computing the ones that are not cached with a single query.
+	"""
+	rollups, locations_to_be_computed = {}, []
+
+	for location in set(locations):
+		rollup = frappe.cache().get_value(get_location_rollup_cache_key(location))
+
+		if rollup is None:
+			locations_to_be_computed.append(location)
+		else:
+			rollups[location] = frappe._dict(rollup)
+
+	if locations_to_be_computed:
+		for location, rollup in compute_location_rollups(locations_to_be_computed).items():
+			frappe.cache().set_value(
+				get_location_rollup_cache_key(location),
+				rollup,
+				expires_in_sec = LOCATION_ROLLUP_CACHE_EXPIRY
+			)
+			rollups[location] = rollup
+
+	return rollups
+
+def compute_location_rollups(locations):
+	rollups = {
+		location: frappe._dict({"num_of_assets": 0, "num_of_serial_nos": 0, "asset_value": 0.0})
+		for location in locations
+	}
+
+	# every asset or serial no belongs to the nodes whose lft/rgt range contains its location's
+	totals = frappe.db.sql(
+		"""
+			SELECT
+				node.name as location,
+				sum(positioned.num_of_assets) as num_of_assets,
+				sum(positioned.is_serial_no) as num_of_serial_nos,
+				sum(positioned.asset_value) as asset_value
+			FROM `tabLocation_` node
+			INNER JOIN `tabLocation_` descendant
+				ON descendant.lft >= node.lft and descendant.rgt <= node.rgt
+			INNER JOIN ({0}) positioned ON positioned.location = descendant.name
+			WHERE node.name in %(locations)s
+			GROUP BY node.name
+		""".format(POSITIONED_ASSETS_QUERY),
+		{"locations": locations},
+		as_dict = 1
+	)
+
+	for total in totals:
+		rollups[total.location].update({
+			"num_of_assets": cint(total.num_of_assets),
+			"num_of_serial_nos": cint(total.num_of_serial_nos),
+			"asset_value": flt(total.asset_value)
+		})
+
+	return rollups
+
+def clear_location_rollups(locations):
+	"""
+		Clears the cached rollups of `locations` and all their ancestors.
+	"""
+	locations = [location for location in set(locations) if location]
+
+	if not locations:
+		return
+
+	ancestors = frappe.db.sql_list(
+		"""
+			SELECT DISTINCT ancestor.name
+			FROM `tabLocation_` location
+			INNER JOIN `tabLocation_` ancestor
+				ON ancestor.lft <= location.lft and ancestor.rgt >= location.rgt
+			WHERE location.name in %(locations)s
+		""",
+		{"locations": locations}
+	)
+
+	for location in ancestors:
+		frappe.cache().delete_value(get_location_rollup_cache_key(location))
+
+def get_location_rollup_cache_key(location):
+	return "assets_location_rollup:" + location
+
 def on_doctype_update():
-	frappe.db.add_index("Location", ["lft", "rgt"])
+	frappe.db.add_index("Location_", ["lft", "rgt"])
+	frappe.db.add_index("Location_", [get_parent_field("Location_")])
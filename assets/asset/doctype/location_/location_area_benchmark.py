@@ -0,0 +1,100 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+"""
+	Compares compute_area with the vertex-by-vertex implementation it replaced, on synthetic polygons.
+
+	bench --site <site> execute assets.asset.doctype.location_.location_area_benchmark.run
+"""
+
+import math
+import random
+import timeit
+
+from assets.asset.doctype.location_.location_ import EARTH_RADIUS, compute_area
+
+
+def run(num_of_vertices=50000, num_of_rings=4, num_of_polygons=5, repeat=5):
+	features = get_synthetic_features(num_of_vertices, num_of_rings, num_of_polygons)
+
+	area = compute_area(features)
+	reference_area = compute_reference_area(features)
+
+	time_taken = min(timeit.repeat(lambda: compute_area(features), number=1, repeat=repeat))
+	reference_time_taken = min(timeit.repeat(lambda: compute_reference_area(features), number=1, repeat=repeat))
+
+	return {
+		"area": area,
+		"reference_area": reference_area,
+		"relative_difference": abs(area - reference_area) / reference_area,
+		"seconds": time_taken,
+		"reference_seconds": reference_time_taken,
+		"speedup": reference_time_taken / time_taken
+	}
+
+def get_synthetic_features(num_of_vertices, num_of_rings, num_of_polygons, seed=0):
+	"""
+		Returns polygons made of an outer ring and holes, each a jagged circle with `num_of_vertices` vertices.
+	"""
+	rng = random.Random(seed)
+	features = []
+
+	for i in range(num_of_polygons):
+		center = (rng.uniform(-170, 170), rng.uniform(-70, 70))
+		rings = [
+			get_ring(center, 0.05 / (ring + 1), num_of_vertices, rng)
+			for ring in range(num_of_rings)
+		]
+
+		features.append({
+			"type": "Feature",
+			"properties": {},
+			"geometry": {"type": "Polygon", "coordinates": rings}
+		})
+
+	return features
+
+def get_ring(center, radius, num_of_vertices, rng):
+	ring = []
+
+	for i in range(num_of_vertices):
+		angle = 2 * math.pi * i / num_of_vertices
+		distance = radius * rng.uniform(0.9, 1.1)
+		ring.append([center[0] + distance * math.cos(angle), center[1] + distance * math.sin(angle)])
+
+	ring.append(ring[0])
+
+	return ring
+
+def compute_reference_area(features):
+	"""
+		The pure Python implementation compute_area used to have, kept to validate and time it against.
+	"""
+	area = 0.0
+
+	for feature in features:
+		if feature.get("geometry", {}).get("type") == "Polygon":
+			coords = feature["geometry"]["coordinates"]
+			polygon_area = abs(get_reference_ring_area(coords[0]))
+
+			for ring in coords[1:]:
+				polygon_area -= abs(get_reference_ring_area(ring))
+
+			area += polygon_area
+
+	return area
+
+def get_reference_ring_area(coords):
+	area = 0.0
+	coords_length = len(coords)
+
+	if coords_length > 2:
+		for i in range(coords_length):
+			p1 = coords[i]
+			p2 = coords[(i + 1) % coords_length]
+			p3 = coords[(i + 2) % coords_length]
+			area += (math.radians(p3[0]) - math.radians(p1[0])) * math.sin(math.radians(p2[1]))
+
+		area = area * EARTH_RADIUS * EARTH_RADIUS / 2
+
+	return area
@@ -1,7 +1,7 @@
-frappe.treeview_settings["Location"] = {
+frappe.treeview_settings["Location_"] = {
 	ignore_fields: ["parent_location"],
-	get_tree_nodes: 'erpnext.assets.doctype.location_.location_.get_children',
-	add_tree_node: 'erpnext.assets.doctype.location_.location_.add_node',
+	get_tree_nodes: 'assets.asset.doctype.location_.location_.get_children',
+	add_tree_node: 'assets.asset.doctype.location_.location_.add_node',
 	filters: [
 		{
 			fieldname: "location",
@@ -6,6 +6,12 @@ import unittest
 
 import frappe
 
+from assets.asset.doctype.location_.location_ import compute_area, set_subtree_totals
+from assets.asset.doctype.location_.location_area_benchmark import (
+	compute_reference_area,
+	get_synthetic_features,
+)
+
 test_records = frappe.get_test_records('Location_')
 
 class TestLocation_(unittest.TestCase):
@@ -17,18 +23,46 @@ class TestLocation_(unittest.TestCase):
 		for location in locations:
 			doc = frappe.get_doc('Location_', location)
 			doc.save()
-			area += doc.area
 			temp = json.loads(doc.location)
+			area += compute_area(temp['features'])
 			temp['features'][0]['properties']['child_feature'] = True
 			temp['features'][0]['properties']['feature_of'] = location
 			formatted_locations.extend(temp['features'])
 
 		test_location = frappe.get_doc('Location_', 'Test Location Area')
 		test_location.save()
+		test_location.run_method('onload')
 
 		test_location_features = json.loads(test_location.get('location'))['features']
 		ordered_test_location_features = sorted(test_location_features, key=lambda x: x['properties']['feature_of'])
 		ordered_formatted_locations = sorted(formatted_locations, key=lambda x: x['properties']['feature_of'])
 
 		self.assertEqual(ordered_formatted_locations, ordered_test_location_features)
-		self.assertEqual(area, test_location.get('area'))
+		self.assertAlmostEqual(area, test_location.get('area'))
+		self.assertAlmostEqual(area, frappe.db.get_value('Location_', 'Test Location Area', 'area'))
+
+class TestLocationCalculations(unittest.TestCase):
+	def test_area_matches_the_reference_implementation(self):
+		for num_of_vertices, num_of_rings in [(3, 1), (5, 2), (1000, 3)]:
+			features = get_synthetic_features(num_of_vertices, num_of_rings, num_of_polygons=2)
+
+			self.assertAlmostEqual(
+				compute_area(features) / compute_reference_area(features), 1, places=9
+			)
+
+	def test_tree_totals_include_descendants(self):
+		nodes = [
+			frappe._dict({"value": value, "lft": lft, "rgt": rgt})
+			for value, lft, rgt in [("A", 1, 8), ("B", 2, 5), ("C", 3, 4), ("D", 6, 7), ("E", 9, 10)]
+		]
+		totals_by_location = {
+			"A": {"num_of_assets": 1},
+			"C": {"num_of_assets": 2, "asset_value": 500},
+			"D": {"num_of_assets": 4},
+			"E": {"num_of_assets": 8}
+		}
+
+		set_subtree_totals(nodes, totals_by_location)
+
+		self.assertEqual([node.num_of_assets for node in nodes], [7, 2, 2, 4, 8])
+		self.assertEqual([node.asset_value for node in nodes], [500, 500, 500, 0, 0])
@@ -0,0 +1,276 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+"""
+	Location Bounding Box holds the extent of every Location_'s features, and Location Grid Cell the grid cells
+	each extent overlaps, so that locations (and the assets at them) in an area are found by looking up the
+	cells it covers instead of by parsing every Location_'s GeoJSON.
+"""
+
+import math
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import flt
+
+from assets.asset.doctype.location_grid_cell.location_grid_cell import (
+	OVERSIZED_CELL_ID,
+	delete_grid_cells,
+	get_cell_ids,
+	insert_grid_cells,
+)
+from assets.controllers.bulk_operations import bulk_insert_docs
+
+BOUNDS_FIELDS = ["location", "min_longitude", "min_latitude", "max_longitude", "max_latitude"]
+
+EARTH_RADIUS = 6378137
+METERS_PER_DEGREE_OF_LATITUDE = math.pi * EARTH_RADIUS / 180
+
+class LocationBoundingBox(Document):
+	pass
+
+def set_bounding_boxes(locations):
+	"""
+		Replaces the bounding boxes of `locations`, dicts with the `name`, `features`, `latitude` and `longitude`
+		of a Location_. Locations without any coordinates are left without one.
+	"""
+	bounding_boxes = []
+
+	for location in locations:
+		bounds = get_bounds(location.features, location.latitude, location.longitude)
+
+		if bounds:
+			bounds.name = bounds.location = location.name
+			bounding_boxes.append(bounds)
+
+	replace_bounding_boxes([location.name for location in locations], bounding_boxes)
+
+def replace_bounding_boxes(locations, bounding_boxes):
+	"""
+		Replaces the bounding boxes of `locations` with `bounding_boxes`, which hold the `name` of the location.
+	"""
+	delete_bounding_boxes(locations)
+	bulk_insert_docs("Location Bounding Box", BOUNDS_FIELDS, bounding_boxes)
+	insert_grid_cells(bounding_boxes)
+
+def delete_bounding_boxes(locations):
+	if locations:
+		frappe.db.delete("Location Bounding Box", {"name": ["in", locations]})
+		delete_grid_cells(locations)
+
+def rebuild_bounding_boxes():
+	from assets.asset.doctype.location_.location_ import get_features
+
+	locations = frappe.get_all("Location_", fields=["name", "location", "latitude", "longitude"])
+
+	for location in locations:
+		location.features = get_features(location.location)
+
+	set_bounding_boxes(locations)
+
+def get_bounds(features, latitude=None, longitude=None):
+	from assets.asset.doctype.location_.location_ import get_coordinates
+
+	min_longitudes, min_latitudes, max_longitudes, max_latitudes = [], [], [], []
+
+	def extend(min_longitude, min_latitude, max_longitude, max_latitude):
+		min_longitudes.append(min_longitude)
+		min_latitudes.append(min_latitude)
+		max_longitudes.append(max_longitude)
+		max_latitudes.append(max_latitude)
+
+	if latitude or longitude:
+		extend(flt(longitude), flt(latitude), flt(longitude), flt(latitude))
+
+	for feature in features:
+		geometry = feature.get("geometry") or {}
+
+		if geometry.get("type") == "Point":
+			point_longitude, point_latitude = geometry.get("coordinates")[:2]
+			properties = feature.get("properties") or {}
+			radius = flt(properties.get("radius")) if properties.get("point_type") == "circle" else 0
+			latitude_delta, longitude_delta = get_degrees_around(point_latitude, radius)
+
+			extend(point_longitude - longitude_delta, point_latitude - latitude_delta,
+				point_longitude + longitude_delta, point_latitude + latitude_delta)
+			continue
+
+		for positions in get_position_lists(geometry):
+			if positions:
+				longitudes, latitudes = get_coordinates(positions)
+				extend(longitudes.min(), latitudes.min(), longitudes.max(), latitudes.max())
+
+	if not min_longitudes:
+		return None
+
+	return frappe._dict({
+		"min_longitude": float(min(min_longitudes)),
+		"min_latitude": float(min(min_latitudes)),
+		"max_longitude": float(max(max_longitudes)),
+		"max_latitude": float(max(max_latitudes))
+	})
+
+def get_position_lists(geometry):
+	"""
+		Returns the lists of positions that bound a GeoJSON geometry; holes never extend past their outer ring.
+	"""
+	geometry_type, coordinates = geometry.get("type"), geometry.get("coordinates") or []
+
+	if geometry_type == "Polygon":
+		return coordinates[:1]
+	elif geometry_type == "MultiPolygon":
+		return [polygon[0] for polygon in coordinates if polygon]
+	elif geometry_type in ("LineString", "MultiPoint"):
+		return [coordinates]
+	elif geometry_type == "MultiLineString":
+		return coordinates
+
+	return []
+
+def get_degrees_around(latitude, radius):
+	"""
+		Returns how many degrees of latitude and longitude `radius` meters span around `latitude`.
+	"""
+	latitude_delta = radius / METERS_PER_DEGREE_OF_LATITUDE
+	longitude_delta = min(latitude_delta / max(math.cos(math.radians(latitude)), 1e-6), 180)
+
+	return latitude_delta, longitude_delta
+
+@frappe.whitelist()
+def get_locations_in_bbox(min_longitude, min_latitude, max_longitude, max_latitude):
+	"""
+		Returns the locations whose bounding boxes intersect the given one. A box that crosses the ±180°
+		line can be given with a `min_longitude` greater than its `max_longitude`, or one past ±180.
+	"""
+	frappe.has_permission("Location_", throw=True)
+
+	min_latitude, max_latitude = flt(min_latitude), flt(max_latitude)
+	locations = {}
+
+	for range_min_longitude, range_max_longitude in get_longitude_ranges(flt(min_longitude), flt(max_longitude)):
+		for bounds in get_locations_in_range(range_min_longitude, min_latitude, range_max_longitude, max_latitude):
+			locations.setdefault(bounds.location, bounds)
+
+	return list(locations.values())
+
+def get_longitude_ranges(min_longitude, max_longitude):
+	"""
+		Splits a range of longitudes that crosses the ±180° line into the ranges on either side of it.
+	"""
+	if max_longitude - min_longitude >= 360:
+		return [(-180, 180)]
+	elif min_longitude > max_longitude:
+		return [(min_longitude, 180), (-180, max_longitude)]
+	elif min_longitude < -180:
+		return [(min_longitude + 360, 180), (-180, max_longitude)]
+	elif max_longitude > 180:
+		return [(min_longitude, 180), (-180, max_longitude - 360)]
+
+	return [(min_longitude, max_longitude)]
+
+def get_locations_in_range(min_longitude, min_latitude, max_longitude, max_latitude):
+	"""
+		Looks the candidates up by the grid cells the range covers, then checks their boxes exactly. Ranges
+		that cover too many cells are checked against every box instead.
+	"""
+	values = {
+		"min_longitude": min_longitude,
+		"min_latitude": min_latitude,
+		"max_longitude": max_longitude,
+		"max_latitude": max_latitude
+	}
+	cell_ids = get_cell_ids(frappe._dict(values))
+
+	if cell_ids is None:
+		cell_condition = ""
+	else:
+		cell_condition = """and location in (
+			SELECT location FROM `tabLocation Grid Cell` WHERE cell_id in %(cell_ids)s
+		)"""
+		values["cell_ids"] = cell_ids + [OVERSIZED_CELL_ID]
+
+	return frappe.db.sql(
+		"""
+			SELECT location, min_longitude, min_latitude, max_longitude, max_latitude
+			FROM `tabLocation Bounding Box`
+			WHERE
+				min_latitude <= %(max_latitude)s and
+				max_latitude >= %(min_latitude)s and
+				min_longitude <= %(max_longitude)s and
+				max_longitude >= %(min_longitude)s
+				{0}
+		""".format(cell_condition),
+		values,
+		as_dict = 1
+	)
+
+@frappe.whitelist()
+def get_assets_near(longitude, latitude, radius):
+	"""
+		Returns the locations within `radius` meters of the point, nearest first, along with the Assets
+		and Asset Serial Nos at them.
+	"""
+	longitude, latitude, radius = flt(longitude), flt(latitude), flt(radius)
+
+	if radius <= 0:
+		frappe.throw(_("Radius should be greater than zero"), title=_("Invalid Radius"))
+
+	latitude_delta, longitude_delta = get_degrees_around(latitude, radius)
+	locations = []
+
+	for bounds in get_locations_in_bbox(longitude - longitude_delta, latitude - latitude_delta,
+		longitude + longitude_delta, latitude + latitude_delta):
+		bounds.distance = get_distance_to_bounds(longitude, latitude, bounds)
+
+		if bounds.distance <= radius:
+			locations.append(bounds)
+
+	locations.sort(key=lambda bounds: bounds.distance)
+	location_names = [bounds.location for bounds in locations]
+
+	if not location_names:
+		return {"locations": [], "assets": [], "serial_nos": []}
+
+	return {
+		"locations": locations,
+		"assets": frappe.get_list(
+			"Asset_",
+			filters = {"location": ["in", location_names], "docstatus": 1, "is_serialized_asset": 0},
+			fields = ["name", "asset_name", "location", "custodian", "status"],
+			limit_page_length = 0
+		),
+		"serial_nos": frappe.get_list(
+			"Asset Serial No",
+			filters = {"location": ["in", location_names], "docstatus": 1},
+			fields = ["name", "asset", "location", "custodian", "status"],
+			limit_page_length = 0
+		)
+	}
+
+def get_distance_to_bounds(longitude, latitude, bounds):
+	"""
+		Returns the great-circle distance in meters from the point to the nearest point of `bounds`,
+		which may be across the ±180° line from it.
+	"""
+	nearest_latitude = min(max(latitude, bounds.min_latitude), bounds.max_latitude)
+
+	return min(
+		get_haversine_distance(
+			point_longitude,
+			latitude,
+			min(max(point_longitude, bounds.min_longitude), bounds.max_longitude),
+			nearest_latitude
+		)
+		for point_longitude in (longitude, longitude - 360, longitude + 360)
+	)
+
+def get_haversine_distance(longitude, latitude, other_longitude, other_latitude):
+	longitude, latitude, other_longitude, other_latitude = map(
+		math.radians, [longitude, latitude, other_longitude, other_latitude]
+	)
+
+	a = math.sin((other_latitude - latitude) / 2) ** 2 \
+		+ math.cos(latitude) * math.cos(other_latitude) * math.sin((other_longitude - longitude) / 2) ** 2
+
+	return 2 * EARTH_RADIUS * math.asin(min(1, math.sqrt(a)))
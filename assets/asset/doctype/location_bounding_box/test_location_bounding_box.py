@@ -0,0 +1,52 @@
+# Copyright (c) 2022, Ganga Manoj and Contributors
+# See license.txt
+
+import unittest
+
+import frappe
+
+from assets.asset.doctype.location_bounding_box.location_bounding_box import (
+	get_bounds,
+	get_distance_to_bounds,
+	get_longitude_ranges,
+)
+
+class TestLocationBoundingBox(unittest.TestCase):
+	def test_bounds_cover_polygons_and_circles(self):
+		features = [
+			{
+				"type": "Feature",
+				"properties": {},
+				"geometry": {"type": "Polygon", "coordinates": [[[72.84, 19.11], [72.84, 19.12], [72.85, 19.12], [72.84, 19.11]]]}
+			},
+			{
+				"type": "Feature",
+				"properties": {"point_type": "circle", "radius": 1000},
+				"geometry": {"type": "Point", "coordinates": [72.90, 19.10]}
+			}
+		]
+
+		bounds = get_bounds(features)
+
+		self.assertEqual(bounds.min_longitude, 72.84)
+		self.assertEqual(bounds.max_latitude, 19.12)
+		self.assertAlmostEqual(bounds.min_latitude, 19.10 - 1000 / 111319.49, places=5)
+		self.assertGreater(bounds.max_longitude, 72.90)
+
+	def test_distance_is_zero_inside_bounds(self):
+		bounds = frappe._dict({"min_longitude": 0, "min_latitude": 0, "max_longitude": 1, "max_latitude": 1})
+
+		self.assertEqual(get_distance_to_bounds(0.5, 0.5, bounds), 0)
+		self.assertAlmostEqual(get_distance_to_bounds(0.5, 2, bounds), 111319.49, delta=1)
+
+	def test_distance_across_the_antimeridian(self):
+		bounds = frappe._dict({"min_longitude": 179, "min_latitude": 0, "max_longitude": 180, "max_latitude": 1})
+
+		self.assertAlmostEqual(get_distance_to_bounds(-179.5, 0.5, bounds), 55659.75, delta=1)
+
+	def test_longitude_ranges_are_split_at_the_antimeridian(self):
+		self.assertEqual(get_longitude_ranges(10, 20), [(10, 20)])
+		self.assertEqual(get_longitude_ranges(179, 181), [(179, 180), (-180, -179)])
+		self.assertEqual(get_longitude_ranges(-181, -179), [(179, 180), (-180, -179)])
+		self.assertEqual(get_longitude_ranges(179, -179), [(179, 180), (-180, -179)])
+		self.assertEqual(get_longitude_ranges(-200, 200), [(-180, 180)])
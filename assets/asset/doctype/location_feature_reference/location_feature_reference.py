@@ -0,0 +1,145 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+"""
+	Location Feature Reference links every Location_ to itself and to each of its ancestors, along with the area
+	and bounds of its own features. The area and bounding box of a location are aggregated from the rows that
+	point to it, and its map is put together from the features of the locations they reference, so editing a
+	location rewrites only its own rows instead of the GeoJSON of every ancestor.
+"""
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import flt
+
+from assets.asset.doctype.location_bounding_box.location_bounding_box import replace_bounding_boxes
+from assets.controllers.bulk_operations import bulk_insert_docs, update_fields_with_case
+
+REFERENCE_FIELDS = ["ancestor", "child", "area", "min_longitude", "min_latitude", "max_longitude", "max_latitude"]
+
+class LocationFeatureReference(Document):
+	pass
+
+def set_feature_references(references):
+	"""
+		Replaces the rows of each location in `references`, dicts with the `child` and the area and bounds of
+		its own features, with one for every location it is in, itself included.
+	"""
+	references_by_child = {reference.child: reference for reference in references}
+
+	if not references_by_child:
+		return
+
+	ancestors = frappe.db.sql(
+		"""
+			SELECT node.name as child, ancestor.name as ancestor
+			FROM `tabLocation_` node
+			INNER JOIN `tabLocation_` ancestor
+				ON ancestor.lft <= node.lft and ancestor.rgt >= node.rgt
+			WHERE node.name in %(children)s
+		""",
+		{"children": list(references_by_child)},
+		as_dict = 1
+	)
+
+	delete_feature_references(list(references_by_child))
+	bulk_insert_docs(
+		"Location Feature Reference",
+		REFERENCE_FIELDS,
+		[
+			frappe._dict(references_by_child[row.child], name=frappe.generate_hash(length=10), ancestor=row.ancestor)
+			for row in ancestors
+		]
+	)
+
+def delete_feature_references(children):
+	if children:
+		frappe.db.delete("Location Feature Reference", {"child": ["in", children]})
+
+def get_referencing_ancestors(child):
+	"""
+		Returns the locations the features of `child` count towards, itself included.
+	"""
+	return frappe.get_all("Location Feature Reference", filters={"child": child}, pluck="ancestor")
+
+def get_subtree_references(location):
+	"""
+		Returns the area and bounds of the own features of `location` and of each of its descendants.
+	"""
+	return frappe.db.sql(
+		"""
+			SELECT
+				reference.child, reference.area, reference.min_longitude, reference.min_latitude,
+				reference.max_longitude, reference.max_latitude
+			FROM `tabLocation Feature Reference` reference
+			INNER JOIN `tabLocation_` node ON node.name = reference.child
+			INNER JOIN `tabLocation_` location
+				ON node.lft >= location.lft and node.rgt <= location.rgt
+			WHERE
+				location.name = %s
+				and reference.ancestor = reference.child
+		""",
+		location,
+		as_dict = 1
+	)
+
+def get_descendants_area(location):
+	return flt(frappe.db.sql(
+		"""
+			SELECT sum(area)
+			FROM `tabLocation Feature Reference`
+			WHERE ancestor = %s and child != ancestor
+		""",
+		location
+	)[0][0])
+
+def get_descendant_locations(location):
+	"""
+		Returns the names and GeoJSON of the descendants of `location`.
+	"""
+	return frappe.db.sql(
+		"""
+			SELECT descendant.location_name, descendant.location
+			FROM `tabLocation Feature Reference` reference
+			INNER JOIN `tabLocation_` descendant ON descendant.name = reference.child
+			WHERE
+				reference.ancestor = %s
+				and reference.child != reference.ancestor
+		""",
+		location,
+		as_dict = 1
+	)
+
+def update_location_totals(locations):
+	"""
+		Sets the area and bounding box of each of `locations` from the rows that reference it,
+		with one query to aggregate them and one update for all the areas.
+	"""
+	locations = [location for location in set(locations) if location]
+
+	if not locations:
+		return
+
+	totals = frappe.db.sql(
+		"""
+			SELECT
+				ancestor as location, sum(area) as area,
+				min(min_longitude) as min_longitude, min(min_latitude) as min_latitude,
+				max(max_longitude) as max_longitude, max(max_latitude) as max_latitude
+			FROM `tabLocation Feature Reference`
+			WHERE ancestor in %(locations)s
+			GROUP BY ancestor
+		""",
+		{"locations": locations},
+		as_dict = 1
+	)
+
+	update_fields_with_case("Location_", ["area"], {total.location: {"area": flt(total.area)} for total in totals})
+	replace_bounding_boxes(
+		locations,
+		[frappe._dict(total, name=total.location) for total in totals if total.min_longitude is not None]
+	)
+
+def on_doctype_update():
+	frappe.db.add_index("Location Feature Reference", ["ancestor", "child"])
+	frappe.db.add_index("Location Feature Reference", ["child"])
@@ -0,0 +1,66 @@
+# Copyright (c) 2022, Ganga Manoj and contributors
+# For license information, please see license.txt
+
+"""
+	Location Grid Cell lists the cells of a fixed latitude/longitude grid that each Location Bounding Box
+	overlaps, so that the locations in an area are found by looking up the few cells it covers.
+"""
+
+import math
+
+import frappe
+from frappe.model.document import Document
+
+from assets.controllers.bulk_operations import bulk_insert_docs
+
+# size of a cell, in degrees of latitude and longitude
+GRID_CELL_SIZE = 0.5
+NUM_OF_ROWS = int(180 / GRID_CELL_SIZE)
+NUM_OF_COLUMNS = int(360 / GRID_CELL_SIZE)
+
+# boxes that overlap more cells than this go into OVERSIZED_CELL_ID, which every lookup includes
+MAX_CELLS_PER_BOX = 256
+OVERSIZED_CELL_ID = -1
+
+class LocationGridCell(Document):
+	pass
+
+def insert_grid_cells(bounding_boxes):
+	grid_cells = [
+		frappe._dict({"name": frappe.generate_hash(length=10), "location": bounds.location, "cell_id": cell_id})
+		for bounds in bounding_boxes
+		for cell_id in get_cell_ids(bounds) or [OVERSIZED_CELL_ID]
+	]
+
+	bulk_insert_docs("Location Grid Cell", ["location", "cell_id"], grid_cells)
+
+def delete_grid_cells(locations):
+	if locations:
+		frappe.db.delete("Location Grid Cell", {"location": ["in", locations]})
+
+def get_cell_ids(bounds):
+	"""
+		Returns the ids of the cells `bounds` overlaps, or None if there are more than MAX_CELLS_PER_BOX of them.
+		Longitudes are expected to be within [-180, 180].
+	"""
+	first_row, last_row = get_row(bounds.min_latitude), get_row(bounds.max_latitude)
+	first_column, last_column = get_column(bounds.min_longitude), get_column(bounds.max_longitude)
+
+	if (last_row - first_row + 1) * (last_column - first_column + 1) > MAX_CELLS_PER_BOX:
+		return None
+
+	return [
+		row * NUM_OF_COLUMNS + column
+		for row in range(first_row, last_row + 1)
+		for column in range(first_column, last_column + 1)
+	]
+
+def get_row(latitude):
+	return min(max(int(math.floor((latitude + 90) / GRID_CELL_SIZE)), 0), NUM_OF_ROWS - 1)
+
+def get_column(longitude):
+	return min(max(int(math.floor((longitude + 180) / GRID_CELL_SIZE)), 0), NUM_OF_COLUMNS - 1)
+
+def on_doctype_update():
+	frappe.db.add_index("Location Grid Cell", ["cell_id", "location"])
+	frappe.db.add_index("Location Grid Cell", ["location"])
@@ -0,0 +1,23 @@
+# Copyright (c) 2022, Ganga Manoj and Contributors
+# See license.txt
+
+import unittest
+
+import frappe
+
+from assets.asset.doctype.location_grid_cell.location_grid_cell import (
+	NUM_OF_COLUMNS,
+	get_cell_ids,
+)
+
+class TestLocationGridCell(unittest.TestCase):
+	def test_cell_ids_cover_bounds(self):
+		bounds = frappe._dict({"min_longitude": 0.2, "min_latitude": 0.2, "max_longitude": 0.7, "max_latitude": 0.3})
+		first_cell_id = 180 * NUM_OF_COLUMNS + 360
+
+		self.assertEqual(get_cell_ids(bounds), [first_cell_id, first_cell_id + 1])
+
+	def test_large_bounds_have_no_cell_ids(self):
+		bounds = frappe._dict({"min_longitude": -180, "min_latitude": -10, "max_longitude": 180, "max_latitude": 10})
+
+		self.assertIsNone(get_cell_ids(bounds))
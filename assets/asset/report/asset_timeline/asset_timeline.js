@@ -12,7 +12,9 @@ frappe.query_reports["Asset Timeline"] = {
 			reqd: 1,
 			on_change: function(query_report) {
 				frappe.query_report.set_filter_value({
-					serial_no: ""
+					serial_no: "",
+					last_activity_date: "",
+					last_name: ""
 				});
 			}
 		},
@@ -30,5 +32,50 @@ frappe.query_reports["Asset Timeline"] = {
 				};
 			}
 		},
-	]
+		{
+			fieldname: "last_activity_date",
+			label: __("Last Activity Date"),
+			fieldtype: "Date",
+			hidden: 1
+		},
+		{
+			fieldname: "last_name",
+			label: __("Last Activity"),
+			fieldtype: "Data",
+			hidden: 1
+		},
+	],
+
+	onload: function(report) {
+		report.page.add_inner_button(__("First Page"), function() {
+			frappe.query_report.set_filter_value({
+				last_activity_date: "",
+				last_name: ""
+			});
+		});
+
+		report.page.add_inner_button(__("Next Page"), function() {
+			let data = frappe.query_report.data || [];
+
+			if (!data.length) {
+				frappe.msgprint(__("There are no more activities."));
+				return;
+			}
+
+			let last_row = data[data.length - 1];
+			frappe.query_report.set_filter_value({
+				last_activity_date: last_row.activity_date,
+				last_name: last_row.name
+			});
+		});
+
+		report.page.add_inner_button(__("Export All as CSV"), function() {
+			frappe.call({
+				method: "assets.asset.report.asset_timeline.asset_timeline.export_asset_timeline",
+				args: {
+					filters: frappe.query_report.get_filter_values()
+				}
+			});
+		});
+	}
 };
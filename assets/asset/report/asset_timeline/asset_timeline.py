@@ -1,8 +1,15 @@
 # Copyright (c) 2022, Ganga Manoj and contributors
 # For license information, please see license.txt
 
+import csv
+from io import StringIO
+
 import frappe
 from frappe import _
+from frappe.utils import cint, get_link_to_form
+
+# number of activities fetched at a time
+PAGE_LENGTH = 500
 
 def execute(filters=None):
 	filters = frappe._dict(filters or {})
@@ -50,18 +57,119 @@ def get_columns():
 	return columns
 
 def get_data(filters):
-	asset_activities = []
+	"""
+		Returns a page of the asset's activities, starting after the (activity_date, name) of the
+		last row of the previous page when `last_activity_date` and `last_name` are set.
+	"""
+	return get_page_of_activities(
+		filters,
+		last_activity_date = filters.get("last_activity_date"),
+		last_name = filters.get("last_name"),
+		page_length = cint(filters.get("page_length")) or PAGE_LENGTH
+	)
 
-	fields = get_fields()
+def get_page_of_activities(filters, last_activity_date=None, last_name=None, page_length=PAGE_LENGTH):
+	conditions = ["asset = %(asset)s", "docstatus = 1"]
+	values = {"asset": filters.get("asset"), "page_length": page_length}
 
-	asset_activities = frappe.get_all(
-		"Asset Activity",
-		filters = filters,
-		fields = fields,
-		order_by = "activity_date"
+	if filters.get("serial_no"):
+		conditions.append("serial_no = %(serial_no)s")
+		values["serial_no"] = filters.get("serial_no")
+
+	if last_activity_date and last_name:
+		conditions.append("""(activity_date > %(last_activity_date)s
+			or (activity_date = %(last_activity_date)s and name > %(last_name)s))""")
+		values.update({"last_activity_date": last_activity_date, "last_name": last_name})
+
+	return frappe.db.sql(
+		"""
+			SELECT name, {fields}
+			FROM `tabAsset Activity`
+			WHERE {conditions}
+			ORDER BY activity_date, name
+			LIMIT %(page_length)s
+		""".format(fields=", ".join(get_fields()), conditions=" and ".join(conditions)),
+		values,
+		as_dict = 1
 	)
 
-	return asset_activities
+def get_pages_of_activities(filters, page_length=PAGE_LENGTH):
+	last_activity_date = last_name = None
+
+	while True:
+		activities = get_page_of_activities(filters, last_activity_date, last_name, page_length)
+
+		if not activities:
+			break
+
+		yield activities
+
+		last_activity_date, last_name = activities[-1].activity_date, activities[-1].name
 
 def get_fields():
-	return ["activity_type", "activity_date", "reference_doctype", "reference_docname", "notes"]
\ No newline at end of file
+	return ["activity_type", "activity_date", "reference_doctype", "reference_docname", "notes"]
+
+@frappe.whitelist()
+def export_asset_timeline(filters):
+	filters = frappe._dict(frappe.parse_json(filters))
+
+	if not filters.get("asset"):
+		frappe.throw(_("Please select an Asset"), title=_("Missing Filters"))
+
+	frappe.has_permission("Asset Activity", throw=True)
+
+	frappe.enqueue(
+		"assets.asset.report.asset_timeline.asset_timeline.write_asset_timeline_csv",
+		queue = "long",
+		filters = filters,
+		user = frappe.session.user
+	)
+
+	frappe.msgprint(_("The Asset Timeline is being exported in the background. It will be attached to {0} once it is ready.")
+		.format(frappe.bold(filters.asset)))
+
+def write_asset_timeline_csv(filters, user):
+	"""
+		Writes every activity of the asset to a private CSV file one page at a time, so that only a
+		single page is held in memory, and attaches the file to the asset.
+	"""
+	file_name = "{0}-timeline-{1}.csv".format(filters.asset, frappe.generate_hash(length=6))
+	file_path = frappe.get_site_path("private", "files", file_name)
+
+	with open(file_path, "w", newline="") as csv_file:
+		for chunk in get_asset_timeline_csv_chunks(filters):
+			csv_file.write(chunk)
+
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": file_name,
+		"file_url": "/private/files/" + file_name,
+		"is_private": 1,
+		"attached_to_doctype": "Asset_",
+		"attached_to_name": filters.asset
+	}).insert(ignore_permissions=True)
+
+	frappe.publish_realtime(
+		"msgprint",
+		_("The Asset Timeline of {0} has been exported: {1}").format(filters.asset, get_link_to_form("File", file_doc.name)),
+		user = user
+	)
+
+def get_asset_timeline_csv_chunks(filters, page_length=PAGE_LENGTH):
+	"""
+		Yields the timeline as CSV, with the header as the first chunk and a page of activities in every other one.
+	"""
+	columns = get_columns()
+	buffer = StringIO()
+	writer = csv.writer(buffer)
+
+	writer.writerow([column["label"] for column in columns])
+
+	for activities in get_pages_of_activities(filters, page_length):
+		yield buffer.getvalue()
+		buffer.seek(0)
+		buffer.truncate()
+
+		writer.writerows([[activity.get(column["fieldname"]) for column in columns] for activity in activities])
+
+	yield buffer.getvalue()
@@ -7,14 +7,38 @@ from frappe.utils import flt, cint, nowdate, getdate, get_datetime, add_months,
 from frappe.model.document import Document
 import json
 
-from assets.asset.doctype.asset_activity.asset_activity import create_asset_activity
+from assets.asset.doctype.asset_activity.asset_activity import queue_asset_activity
 from assets.asset.doctype.asset_category_.asset_category_ import get_asset_category_account
+from assets.controllers.cached_values import (
+	DEPRECIATION_TEMPLATE_FIELDS,
+	get_accounts_settings_value,
+	get_depreciation_template_values,
+)
 from assets.asset.doctype.depreciation_schedule_.depreciation_schedule_ import (
 	create_depreciation_schedules,
 	create_a_single_depreciation_schedule,
 	delete_existing_schedules
 )
 
+# fields of Asset_ read by get_asset_row()
+ASSET_ROW_FIELDS = [
+	"calculate_depreciation",
+	"num_of_assets",
+	"asset_category",
+	"gross_purchase_amount",
+	"opening_accumulated_depreciation",
+	"purchase_date",
+	"asset_name",
+	"company",
+	"purchase_receipt",
+	"purchase_invoice",
+	"item_code",
+	"is_serialized_asset"
+]
+
+# number of rows get_asset_row() keeps, so that long jobs going through many assets don't hold all of them
+MAX_CACHED_ASSET_ROWS = 1000
+
 
 class BaseAsset(Document):
 	def validate(self):
@@ -53,21 +77,7 @@ class BaseAsset(Document):
 
 	# to reduce number of db calls
 	def get_asset_values(self):
-		self.asset_values = frappe.get_value(
-			"Asset_",
-			self.asset,
-			[
-				"calculate_depreciation",
-				"num_of_assets",
-				"asset_category",
-				"gross_purchase_amount",
-				"opening_accumulated_depreciation",
-				"purchase_date",
-				"asset_name",
-				"company"
-			],
-			as_dict = 1
-		)
+		self.asset_values = get_asset_row(self.asset)
 
 	def is_not_serialized_asset(self):
 		"""
@@ -187,7 +197,7 @@ class BaseAsset(Document):
 			return self.asset_values["gross_purchase_amount"], self.asset_values["opening_accumulated_depreciation"]
 
 	def get_enable_finance_books_value(self):
-		self.enable_finance_books = frappe.db.get_single_value("Accounts Settings", "enable_finance_books")
+		self.enable_finance_books = get_accounts_settings_value("enable_finance_books")
 
 	def validate_available_for_use_date(self):
 		purchase_date = self.get_purchase_date()
@@ -272,11 +282,9 @@ class BaseAsset(Document):
 			frappe.throw(message, title = _("Missing Depreciation Template"))
 
 	def fetch_template_values(self, row_or_doc):
-		return frappe.get_value(
-			"Depreciation Template",
-			row_or_doc.depreciation_template,
-			["depreciation_method", "frequency_of_depreciation", "asset_life", "asset_life_unit", "rate_of_depreciation"]
-		)
+		template_values = get_depreciation_template_values(row_or_doc.depreciation_template)
+
+		return [template_values.get(field) for field in DEPRECIATION_TEMPLATE_FIELDS]
 
 	def create_schedules_if_depr_details_have_been_updated(self):
 		if self.has_updated_basic_depr_details():
@@ -381,7 +389,7 @@ class BaseAsset(Document):
 			serial_no = self.get_serial_no()
 			asset = self.get_asset()
 
-			create_asset_activity(
+			queue_asset_activity(
 				asset = asset,
 				asset_serial_no = serial_no,
 				activity_type = "Purchase",
@@ -394,7 +402,7 @@ class BaseAsset(Document):
 		asset = self.get_asset()
 		serial_no = self.get_serial_no()
 
-		create_asset_activity(
+		queue_asset_activity(
 			asset = asset,
 			asset_serial_no = serial_no,
 			activity_type = "Creation",
@@ -494,6 +502,36 @@ class BaseAsset(Document):
 				if finance_book.finance_book == self.default_finance_book:
 					return cint(finance_book.idx) - 1
 
+def get_asset_row(asset):
+	"""
+		Returns a copy of the fields of an Asset_ that Asset Serial Nos and other linked docs need, fetching them
+		only once per request. The row is dropped from the cache whenever the Asset_ is written to, and the
+		oldest rows are dropped once there are MAX_CACHED_ASSET_ROWS of them.
+	"""
+	if not hasattr(frappe.local, "asset_rows"):
+		frappe.local.asset_rows = {}
+
+	if asset not in frappe.local.asset_rows:
+		if len(frappe.local.asset_rows) >= MAX_CACHED_ASSET_ROWS:
+			frappe.local.asset_rows.pop(next(iter(frappe.local.asset_rows)))
+
+		asset_row = frappe.db.get_value("Asset_", asset, ASSET_ROW_FIELDS, as_dict=1) if asset else None
+		frappe.local.asset_rows[asset] = asset_row or frappe._dict()
+
+	return frappe._dict(frappe.local.asset_rows[asset])
+
+def clear_asset_row_cache(asset=None):
+	"""
+		Drops the row of `asset` from the cache, or every row if no asset is given.
+	"""
+	if not hasattr(frappe.local, "asset_rows"):
+		return
+
+	if asset:
+		frappe.local.asset_rows.pop(asset, None)
+	else:
+		frappe.local.asset_rows.clear()
+
 def get_default_finance_book(company=None):
 	from erpnext import get_default_company
 
@@ -544,45 +582,117 @@ def get_finance_books(asset_category):
 	return books
 
 @frappe.whitelist()
-def make_asset_movement(assets, purpose=None):
-	if isinstance(assets, str):
-		assets = json.loads(assets)
+def make_asset_movement(assets=None, purpose=None, doctype="Asset_", filters=None):
+	"""
+		Returns a new Asset Movement for the selected Assets or Asset Serial Nos.
+
+		`assets` can be a list of names of `doctype`, or of the docs themselves. If it is not given, every
+		`doctype` record that matches `filters` is moved instead.
+	"""
+	asset_names, serial_nos = get_assets_and_serial_nos_to_be_moved(assets, doctype, filters)
 
-	if len(assets) == 0:
+	if not (asset_names or serial_nos):
 		frappe.throw(_("Atleast one asset has to be selected."))
 
+	asset_details, serial_no_details = fetch_asset_tracking_details(asset_names, serial_nos)
+
 	asset_movement = frappe.new_doc("Asset Movement_")
-	asset_movement.quantity = len(assets)
 	asset_movement.purpose = purpose
 
-	for asset in assets:
-		location, custodian, company, asset_name, serial_no  = fetch_asset_tracking_details(asset)
+	for name in asset_names:
+		asset = asset_details[name]
+		append_asset_to_movement(asset_movement, asset.name, "", asset.location, asset.custodian, asset.company)
 
-		asset_movement.company = company
-		asset_movement.append("assets", {
-			"asset": asset_name,
-			"source_location": location,
-			"from_employee": custodian,
-			"serial_no": serial_no
-		})
+	for name in serial_nos:
+		serial_no = serial_no_details[name]
+		company = asset_details[serial_no.asset].company
+		append_asset_to_movement(asset_movement, serial_no.asset, serial_no.name, serial_no.location,
+			serial_no.custodian, company)
+
+	asset_movement.quantity = len(asset_movement.get("assets"))
 
 	if asset_movement.get("assets"):
 		return asset_movement.as_dict()
 
-def fetch_asset_tracking_details(asset):
-	asset = frappe._dict(asset)
+def get_assets_and_serial_nos_to_be_moved(assets, doctype, filters):
+	validate_movement_doctype(doctype)
 
-	if asset.get("serial_no"):
-		location, custodian = frappe.get_value("Asset Serial No", asset.name, ["location", "custodian"])
-		company = frappe.get_value("Asset_", asset.asset, "company")
-		asset_name = asset.asset
-		serial_no = asset.name
-	else:
-		location, custodian, company = frappe.get_value("Asset_", asset.name, ["location", "custodian", "company"])
-		asset_name = asset.name
-		serial_no = ""
+	if isinstance(assets, str):
+		assets = json.loads(assets)
 
-	return location, custodian, company, asset_name, serial_no
+	if not assets and filters:
+		assets = frappe.get_list(doctype, filters=frappe.parse_json(filters), pluck="name", limit_page_length=0)
+
+	asset_names, serial_nos = [], []
+
+	for asset in assets or []:
+		if isinstance(asset, dict):
+			is_serial_no = bool(asset.get("serial_no"))
+			asset = asset.get("name")
+		else:
+			is_serial_no = doctype == "Asset Serial No"
+
+		if is_serial_no:
+			serial_nos.append(asset)
+		else:
+			asset_names.append(asset)
+
+	return asset_names, serial_nos
+
+def validate_movement_doctype(doctype):
+	if doctype not in ["Asset_", "Asset Serial No"]:
+		frappe.throw(_("Only Assets and Asset Serial Nos can be moved, not {0}.").format(frappe.bold(doctype)),
+			title=_("Invalid Document Type"))
+
+def append_asset_to_movement(asset_movement, asset, serial_no, location, custodian, company):
+	asset_movement.company = company
+	asset_movement.append("assets", {
+		"asset": asset,
+		"source_location": location,
+		"from_employee": custodian,
+		"serial_no": serial_no
+	})
+
+def fetch_asset_tracking_details(asset_names, serial_nos):
+	"""
+		Returns the locations, custodians and companies of the Assets and Asset Serial Nos, fetched with one query per doctype.
+	"""
+	serial_no_details = {}
+
+	if serial_nos:
+		serial_no_details = {
+			serial_no.name: serial_no
+			for serial_no in frappe.get_all(
+				"Asset Serial No",
+				filters = {"name": ["in", list(set(serial_nos))]},
+				fields = ["name", "asset", "location", "custodian"]
+			)
+		}
+
+	assets = set(asset_names) | {serial_no.asset for serial_no in serial_no_details.values()}
+	asset_details = {}
+
+	if assets:
+		asset_details = {
+			asset.name: asset
+			for asset in frappe.get_all(
+				"Asset_",
+				filters = {"name": ["in", list(assets)]},
+				fields = ["name", "location", "custodian", "company"]
+			)
+		}
+
+	validate_assets_exist(assets, asset_details, _("Assets"))
+	validate_assets_exist(serial_nos, serial_no_details, _("Asset Serial Nos"))
+
+	return asset_details, serial_no_details
+
+def validate_assets_exist(names, details, label):
+	missing_names = sorted(set(names) - set(details))
+
+	if missing_names:
+		frappe.throw(_("{0} not found: {1}").format(label, ", ".join(map(frappe.bold, missing_names))),
+			exc=frappe.DoesNotExistError, title=_("Missing Records"))
 
 @frappe.whitelist()
 def get_purchase_details(asset):
@@ -592,11 +702,8 @@ def get_purchase_details(asset):
 	if asset.doctype == "Asset_":
 		purchase_receipt, purchase_invoice = asset.purchase_receipt, asset.purchase_invoice
 	else:
-		purchase_receipt, purchase_invoice = frappe.db.get_value(
-			"Asset_",
-			asset.asset,
-			["purchase_receipt", "purchase_invoice"]
-		)
+		asset_row = get_asset_row(asset.asset)
+		purchase_receipt, purchase_invoice = asset_row.purchase_receipt, asset_row.purchase_invoice
 
 	purchase_doctype = "Purchase Receipt" if purchase_receipt else "Purchase Invoice"
 	purchase_docname = purchase_receipt or purchase_invoice
@@ -625,10 +732,11 @@ def get_item(asset):
 	if asset.doctype == "Asset_":
 		return asset.item_code
 	else:
-		return frappe.db.get_value("Asset_", asset.asset, "item_code")
+		return get_asset_row(asset.asset).item_code
 
-def validate_serial_no(doc):
-	is_serialized_asset = frappe.db.get_value("Asset_", doc.asset, "is_serialized_asset")
+def validate_serial_no(doc, is_serialized_asset=None):
+	if is_serialized_asset is None:
+		is_serialized_asset = get_asset_row(doc.asset).is_serialized_asset
 
 	if is_serialized_asset and not doc.serial_no:
 		frappe.throw(_("Please enter Serial No as {0} is a Serialized Asset")
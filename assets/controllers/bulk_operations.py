@@ -0,0 +1,175 @@
+# Copyright (c) 2022, Frappe Technologies Pvt. Ltd. and Contributors
+# For license information, please see license.txt
+
+"""
+	Helpers for writing many rows at once, used where creating documents one by one is too slow.
+	They bypass document hooks, so callers are responsible for validating the values they write.
+"""
+
+import frappe
+from frappe.model.naming import parse_naming_series
+from frappe.query_builder import Case
+from frappe.utils import cint, now
+
+# number of rows changed by a single UPDATE ... CASE statement
+UPDATE_CHUNK_SIZE = 1000
+
+# columns set by bulk_insert_docs and bulk_insert_child_rows rather than copied from the source row
+STANDARD_COLUMNS = {"name", "owner", "creation", "modified", "modified_by", "docstatus", "idx", "parent", "parenttype", "parentfield"}
+
+
+def reserve_names(naming_series, count, digits=5):
+	"""
+		Reserves `count` consecutive names from a naming series with a single update to `tabSeries`.
+	"""
+	prefix = parse_naming_series(naming_series)
+	current = reserve_series_values(prefix, count)
+
+	return [prefix + ("%0" + str(digits) + "d") % (current + i) for i in range(1, count + 1)]
+
+def reserve_series_values(series, count):
+	"""
+		Advances the counter of `series` by `count` and returns its value before the update.
+	"""
+	current = frappe.db.sql("select `current` from `tabSeries` where `name`=%s for update", series)
+
+	if current and current[0][0] is not None:
+		current = cint(current[0][0])
+		frappe.db.sql("update `tabSeries` set `current` = `current` + %s where `name`=%s", (count, series))
+	else:
+		current = 0
+		frappe.db.sql("insert into `tabSeries` (`name`, `current`) values (%s, %s)", (series, count))
+
+	return current
+
+def bulk_insert_docs(doctype, fields, docs, docstatus=0):
+	"""
+		Inserts `docs` (dicts with a `name`) into `doctype` using multi-row inserts.
+	"""
+	if not docs:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+
+	values = [
+		[doc.name, timestamp, timestamp, user, user, docstatus] + [doc.get(field) for field in fields]
+		for doc in docs
+	]
+
+	frappe.db.bulk_insert(doctype, ["name", "creation", "modified", "owner", "modified_by", "docstatus"] + fields, values)
+
+def bulk_insert_child_rows(doctype, parenttype, parentfield, fields, rows, docstatus=0):
+	"""
+		Inserts child table rows, each of which must have a `parent` and an `idx`.
+	"""
+	for row in rows:
+		if not row.get("name"):
+			row.name = frappe.generate_hash(length=10)
+
+		row.parenttype = parenttype
+		row.parentfield = parentfield
+
+	bulk_insert_docs(doctype, ["parent", "parenttype", "parentfield", "idx"] + fields, rows, docstatus)
+
+def update_rows_with_case(doctype, fieldname, values_by_name, update_modified=True):
+	"""
+		Sets a different value of `fieldname` for each row using UPDATE ... CASE statements.
+	"""
+	update_fields_with_case(
+		doctype,
+		[fieldname],
+		{name: {fieldname: value} for name, value in values_by_name.items()},
+		update_modified
+	)
+
+def update_fields_with_case(doctype, fieldnames, values_by_name, update_modified=True):
+	"""
+		Sets different values of all the `fieldnames` for each row, with one UPDATE ... CASE statement per chunk of rows.
+	"""
+	names = list(values_by_name)
+	table = frappe.qb.DocType(doctype)
+
+	for i in range(0, len(names), UPDATE_CHUNK_SIZE):
+		chunk = names[i : i + UPDATE_CHUNK_SIZE]
+		query = frappe.qb.update(table).where(table.name.isin(chunk))
+
+		for fieldname in fieldnames:
+			case = Case()
+
+			for name in chunk:
+				case = case.when(table.name == name, values_by_name[name].get(fieldname))
+
+			query = query.set(table[fieldname], case)
+
+		if update_modified:
+			query = query.set(table.modified, now())
+
+		query.run()
+
+def delete_docs_with_children(doctype, names):
+	"""
+		Deletes documents along with the rows of all their child tables.
+	"""
+	if not names:
+		return
+
+	for child_doctype in {df.options for df in frappe.get_meta(doctype).get_table_fields()}:
+		frappe.db.delete(child_doctype, {"parenttype": doctype, "parent": ["in", names]})
+
+	frappe.db.delete(doctype, {"name": ["in", names]})
+
+def copy_docs_with_children(doctype, source_name, copies, reset_fields=None):
+	"""
+		Inserts a copy of `source_name` and of its child table rows for every dict in `copies`, which holds
+		the `name` of the copy and the values that differ from the source. Fields in `reset_fields` are left empty.
+	"""
+	if not copies:
+		return
+
+	source = frappe.db.sql("select * from `tab{0}` where name=%s".format(doctype), source_name, as_dict=1)[0]
+	fields = get_fields_to_copy(source)
+
+	bulk_insert_docs(
+		doctype,
+		fields,
+		[get_copy_of_row(source, copy, reset_fields) for copy in copies],
+		source.docstatus
+	)
+
+	for child_doctype in {df.options for df in frappe.get_meta(doctype).get_table_fields()}:
+		rows = frappe.db.sql(
+			"select * from `tab{0}` where parent=%s and parenttype=%s".format(child_doctype),
+			(source_name, doctype),
+			as_dict = 1
+		)
+		if not rows:
+			continue
+
+		bulk_insert_docs(
+			child_doctype,
+			get_fields_to_copy(rows[0]) + ["parent", "parenttype", "parentfield", "idx"],
+			[
+				get_copy_of_row(row, {"name": frappe.generate_hash(length=10), "parent": copy["name"]}, reset_fields)
+				for copy in copies
+				for row in rows
+			],
+			source.docstatus
+		)
+
+def get_copy_of_row(row, values, reset_fields=None):
+	copy = frappe._dict(row)
+
+	for fieldname in reset_fields or []:
+		if fieldname in copy:
+			copy[fieldname] = None
+
+	copy.update(values)
+
+	return copy
+
+def get_fields_to_copy(row):
+	return [
+		fieldname for fieldname in row
+		if fieldname not in STANDARD_COLUMNS and not fieldname.startswith("_")
+	]
@@ -0,0 +1,60 @@
+# Copyright (c) 2022, Frappe Technologies Pvt. Ltd. and Contributors
+# For license information, please see license.txt
+
+"""
+	Redis-backed lookups for configuration that is read far more often than it changes.
+	Each value is cleared through the doc_events in hooks.py when the record it was read from changes.
+"""
+
+import frappe
+from frappe.utils import cint
+
+ACCOUNTS_SETTINGS_CACHE_KEY = "assets_accounts_settings"
+DEPRECIATION_TEMPLATE_CACHE_KEY = "assets_depreciation_template_values"
+ASSET_CATEGORY_CWIP_CACHE_KEY = "assets_asset_category_cwip"
+
+DEPRECIATION_TEMPLATE_FIELDS = [
+	"depreciation_method", "frequency_of_depreciation", "asset_life", "asset_life_unit", "rate_of_depreciation"
+]
+
+
+def get_accounts_settings_value(fieldname):
+	return frappe.cache().hget(
+		ACCOUNTS_SETTINGS_CACHE_KEY,
+		fieldname,
+		generator = lambda: frappe.db.get_single_value("Accounts Settings", fieldname)
+	)
+
+def get_depreciation_template_values(depreciation_template):
+	"""
+		Returns the values of `depreciation_template` that schedules are made from, as a dict.
+	"""
+	if not depreciation_template:
+		return None
+
+	template_values = frappe.cache().hget(
+		DEPRECIATION_TEMPLATE_CACHE_KEY,
+		depreciation_template,
+		generator = lambda: frappe.db.get_value(
+			"Depreciation Template", depreciation_template, DEPRECIATION_TEMPLATE_FIELDS, as_dict = 1
+		)
+	)
+
+	# callers get their own copy, so that changing it does not change the cached value
+	return frappe._dict(template_values) if template_values else None
+
+def get_cwip_accounting_value(asset_category):
+	return cint(frappe.cache().hget(
+		ASSET_CATEGORY_CWIP_CACHE_KEY,
+		asset_category,
+		generator = lambda: cint(frappe.db.get_value("Asset Category", asset_category, "enable_cwip_accounting"))
+	))
+
+def clear_accounts_settings_cache(doc, method=None):
+	frappe.cache().delete_value(ACCOUNTS_SETTINGS_CACHE_KEY)
+
+def clear_depreciation_template_cache(doc, method=None):
+	frappe.cache().hdel(DEPRECIATION_TEMPLATE_CACHE_KEY, doc.name)
+
+def clear_asset_category_cache(doc, method=None):
+	frappe.cache().hdel(ASSET_CATEGORY_CWIP_CACHE_KEY, doc.name)
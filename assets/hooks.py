@@ -98,34 +98,32 @@ app_license = "MIT"
 # ---------------
 # Hook on document methods and events
 
-# doc_events = {
-# 	"*": {
-# 		"on_update": "method",
-# 		"on_cancel": "method",
-# 		"on_trash": "method"
-#	}
-# }
+doc_events = {
+	"Accounts Settings": {
+		"on_update": "assets.controllers.cached_values.clear_accounts_settings_cache"
+	},
+	"Depreciation Template": {
+		"on_update": "assets.controllers.cached_values.clear_depreciation_template_cache",
+		"on_trash": "assets.controllers.cached_values.clear_depreciation_template_cache"
+	},
+	"Asset Category": {
+		"on_update": "assets.controllers.cached_values.clear_asset_category_cache",
+		"on_trash": "assets.controllers.cached_values.clear_asset_category_cache"
+	},
+	"Asset Category_": {
+		"on_update": "assets.controllers.cached_values.clear_asset_category_cache",
+		"on_trash": "assets.controllers.cached_values.clear_asset_category_cache"
+	}
+}
 
 # Scheduled Tasks
 # ---------------
 
-# scheduler_events = {
-# 	"all": [
-# 		"assets.tasks.all"
-# 	],
-# 	"daily": [
-# 		"assets.tasks.daily"
-# 	],
-# 	"hourly": [
-# 		"assets.tasks.hourly"
-# 	],
-# 	"weekly": [
-# 		"assets.tasks.weekly"
-# 	],
-# 	"monthly": [
-# 		"assets.tasks.monthly"
-# 	],
-# }
+scheduler_events = {
+	"daily": [
+		"assets.asset.doctype.asset_maintenance_log_.asset_maintenance_log_.mark_overdue_maintenance"
+	]
+}
 
 # Testing
 # -------
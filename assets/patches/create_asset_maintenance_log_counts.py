@@ -0,0 +1,8 @@
+import frappe
+
+from assets.asset.doctype.asset_maintenance_log_count.asset_maintenance_log_count import rebuild_log_counts
+
+
+def execute():
+	frappe.reload_doc("asset", "doctype", "asset_maintenance_log_count")
+	rebuild_log_counts()
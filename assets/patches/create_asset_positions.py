@@ -0,0 +1,8 @@
+import frappe
+
+from assets.asset.doctype.asset_position.asset_position import rebuild_positions
+
+
+def execute():
+	frappe.reload_doc("asset", "doctype", "asset_position")
+	rebuild_positions()
@@ -0,0 +1,10 @@
+import frappe
+
+from assets.asset.doctype.location_bounding_box.location_bounding_box import rebuild_bounding_boxes
+
+
+def execute():
+	frappe.reload_doc("asset", "doctype", "location_bounding_box")
+	frappe.reload_doc("asset", "doctype", "location_grid_cell")
+
+	rebuild_bounding_boxes()
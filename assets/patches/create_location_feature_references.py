@@ -0,0 +1,30 @@
+import frappe
+
+from assets.asset.doctype.location_.location_ import get_feature_reference, get_own_features, set_features
+from assets.asset.doctype.location_feature_reference.location_feature_reference import (
+	set_feature_references,
+	update_location_totals,
+)
+from assets.controllers.bulk_operations import update_fields_with_case
+
+
+def execute():
+	frappe.reload_doc("asset", "doctype", "location_feature_reference")
+
+	locations = frappe.get_all("Location_", fields=["name", "location", "latitude", "longitude"])
+
+	# the features copied into ancestors are referenced from now on, so only each location's own are kept
+	update_fields_with_case(
+		"Location_",
+		["location"],
+		{
+			location.name: {"location": set_features(location.location, get_own_features(location.location))}
+			for location in locations if location.location
+		},
+		update_modified = False
+	)
+
+	set_feature_references([
+		get_feature_reference(location, get_own_features(location.location)) for location in locations
+	])
+	update_location_totals([location.name for location in locations])